@@ -0,0 +1,177 @@
+import argparse
+import json
+import shlex
+import sqlite3
+import sys
+from datetime import date as date_cls, datetime
+from itertools import islice
+import event_db
+import jalali_calendar
+from event_store import EventStore, WEEKDAYS, FUTURE_LIMIT
+
+# python agenda.py nearest | future [--limit N] | weekly | date 1405-01-15 [--limit N]
+# python agenda.py --json --calendar gregorian future --limit 5
+# python agenda.py --batch < queries.txt   (هر خط یک فرمان، مثل "future --limit 3")
+# بدون tkinter: برای cron و ترمینال، مستقیم و فقط‌خواندنی روی events.db
+
+CALENDARS = ("jalali", "gregorian")
+
+
+def format_day(day, calendar):
+    # شماره روز میلادی به رشته تاریخ در تقویم خواسته‌شده
+    if calendar == "gregorian":
+        return date_cls.fromordinal(day).isoformat()
+    return jalali_calendar.format_date(*jalali_calendar.get_calendar().to_jalali(day))
+
+
+def parse_day(text, calendar):
+    # رشته تاریخ YYYY-MM-DD در تقویم خواسته‌شده به شماره روز میلادی؛ برای تاریخ نامعتبر ValueError
+    if calendar == "gregorian":
+        return date_cls.fromisoformat(text).toordinal()
+    if not jalali_calendar.validate_jalali_date(text):
+        raise ValueError(f"تاریخ شمسی نامعتبر: {text}")
+    return jalali_calendar.get_calendar().from_jalali(*jalali_calendar.parse(text))
+
+
+def event_record(event, day, calendar):
+    # یک رویداد (یا وقوع آن در روز day) برای خروجی JSON
+    return {
+        "id": event.id,
+        "title": event.title,
+        "type": event.event_type,
+        "date": format_day(day, calendar) if day is not None else None,
+        "weekday": WEEKDAYS[jalali_calendar.weekday(day) if day is not None else event.recurring_day],
+        "time": event.time,
+        "end_time": event.end_time,
+        "recurring": event.is_recurring == 1,
+    }
+
+
+def event_line(record):
+    # همان قالب سطرهای برنامه گرافیکی: عنوان (نوع) - تاریخ (روز) - ساعت
+    if record["date"] is None:
+        date_text = f"تکراری ({record['weekday']})"
+    else:
+        date_text = f"{record['date']} ({record['weekday']})" + (" - تکراری" if record["recurring"] else "")
+    if not record["time"]:
+        time_text = "بدون زمان"
+    else:
+        time_text = f"{record['time']} تا {record['end_time']}" if record["end_time"] else record["time"]
+    return f"{record['title']} ({record['type']}) - {date_text} - {time_text}"
+
+
+def occurrence_records(occurrences, calendar):
+    return [event_record(occurrence.event, occurrence.date.toordinal(), calendar) for occurrence in occurrences]
+
+
+def weekly_records(week, calendar):
+    # خروجی EventStore.weekly_schedule: برای هر روز هفته، رویدادها با نوع 'recurring' یا 'single'
+    return [{"weekday": WEEKDAYS[index],
+             "events": [dict(event_record(event, event.day_num if kind == "single" else None, calendar),
+                             kind=kind) for event, kind in day]}
+            for index, day in enumerate(week)]
+
+
+def run_query(store, args, now):
+    # نتیجه یک فرمان به‌صورت داده قابل JSON
+    if args.command == "nearest":
+        return occurrence_records(islice(store.upcoming(now), 1), args.calendar)
+    if args.command == "future":
+        return occurrence_records(store.future_events(now, args.limit), args.calendar)
+    if args.command == "date":
+        start = datetime.fromordinal(parse_day(args.date, args.calendar))
+        return occurrence_records(islice(store.upcoming(start), args.limit), args.calendar)
+    return weekly_records(store.weekly_schedule(now), args.calendar)
+
+
+def print_result(args, result, out):
+    if args.json:
+        out.write(json.dumps(result, ensure_ascii=False) + "\n")
+        return
+    if args.command == "weekly":
+        for day in result:
+            out.write(f"{day['weekday']}:\n")
+            for record in day["events"]:
+                out.write(f"  {event_line(record)}\n")
+            if not day["events"]:
+                out.write("  بدون رویداد\n")
+        return
+    for record in result:
+        out.write(event_line(record) + "\n")
+    if not result:
+        out.write("هیچ رویدادی یافت نشد!\n")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="برنامه رویدادها در خط فرمان (بدون رابط گرافیکی)")
+    parser.add_argument("--db", default=event_db.DB_PATH, help="مسیر دیتابیس")
+    parser.add_argument("--json", action="store_true", help="خروجی JSON (در حالت batch یک خط برای هر فرمان)")
+    parser.add_argument("--calendar", choices=CALENDARS, default="jalali",
+                        help="تقویم تاریخ‌های ورودی و خروجی")
+    parser.add_argument("--batch", action="store_true", help="خواندن فرمان‌ها از stdin، هر خط یک فرمان")
+    add_commands(parser, required=False)
+    return parser
+
+
+def add_commands(parser, required=True):
+    commands = parser.add_subparsers(dest="command", required=required)
+    commands.add_parser("nearest", help="نزدیک‌ترین رویداد")
+    future = commands.add_parser("future", help="رویدادهای آینده")
+    future.add_argument("--limit", type=int, default=FUTURE_LIMIT)
+    commands.add_parser("weekly", help="جدول برنامه هفتگی")
+    search = commands.add_parser("date", help="نزدیک‌ترین رویداد از یک تاریخ")
+    search.add_argument("date", help="تاریخ YYYY-MM-DD")
+    search.add_argument("--limit", type=int, default=1)
+
+
+def run_batch(store, args, lines, out, now):
+    # هر خط با همان تنظیمات سراسری (--json، --calendar) اجرا می‌شود؛ خطای یک خط بقیه را متوقف نمی‌کند
+    parser = argparse.ArgumentParser(prog="batch", add_help=False, exit_on_error=False)
+    add_commands(parser)
+    failures = 0
+    for line in lines:
+        words = shlex.split(line, comments=True)
+        if not words:
+            continue
+        try:
+            command = parser.parse_args(words, namespace=argparse.Namespace(**vars(args)))
+            print_result(command, run_query(store, command, now), out)
+        except (argparse.ArgumentError, ValueError, SystemExit) as error:
+            failures += 1
+            message = str(error) or f"فرمان نامعتبر: {line.strip()}"
+            if args.json:
+                out.write(json.dumps({"error": message, "query": line.strip()}, ensure_ascii=False) + "\n")
+            else:
+                sys.stderr.write(f"{line.strip()}: {message}\n")
+        out.flush()
+    return failures
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if not args.batch and args.command is None:
+        parser.error("یک فرمان (nearest، future، weekly یا date) یا --batch لازم است")
+
+    now = datetime.now()
+    # جدول تقویم فقط برای چند سال اطراف امروز ساخته می‌شود؛ تاریخ‌های دورتر از مسیر jdatetime می‌گذرند
+    jalali_calendar.configure(now.year - 622, now.year - 620)
+    # فقط خواندن: اجرای دوره‌ای (cron) در دیتابیس چیزی نمی‌نویسد
+    try:
+        store = EventStore.open_readonly(args.db)
+    except (sqlite3.Error, RuntimeError) as error:
+        parser.error(f"{args.db}: {error}")
+    try:
+        if args.batch:
+            return 1 if run_batch(store, args, sys.stdin, sys.stdout, now) else 0
+        try:
+            print_result(args, run_query(store, args, now), sys.stdout)
+        except ValueError as error:
+            parser.error(str(error))
+        return 0
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,438 @@
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from itertools import islice
+from urllib.parse import quote
+
+import jalali_calendar
+import recurrence
+import workload
+from event_store import EventStore, FUTURE_LIMIT
+
+# python benchmark.py --sizes 10000 100000 1000000 [--json results.json] [--compare base.json]
+# زمان هر نما و هر نوشتن روی دیتابیس‌های مصنوعی (workload.py) بدون نیاز به نمایشگر اندازه‌گیری می‌شود؛
+# نتیجه با مشخصات اجرا (کامیت، نسخه‌ها، seed) در JSON ذخیره و با اجرای دیگری مقایسه می‌شود
+# در CI همین run روی دو اندازه کوچک اجرا و رشد زمان هر عملیات بررسی می‌شود: python -m pytest -m benchmark
+# (BENCHMARK_SIZES=10000,100000,1000000 برای همان اندازه‌های بالا، با pytest-benchmark اگر نصب باشد)
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+
+# سهم قاعده‌های هفتگی از رویدادهای مصنوعی
+RECURRING_SHARE = 0.05
+
+# تعداد سطر هر درج گروهی (add.bulk)
+BULK_SIZE = 1000
+
+# متن جستجوی متنی (یکی از درس‌های workload.SUBJECTS)
+SEARCH_TEXT = "ریاضی"
+
+# حالت‌های مقایسه نوشتن: (نام، pragmas، همه نوشتن‌ها در یک transaction)
+# حالت اول همان تنظیمات پیش‌فرض sqlite3 قبل از WAL است
+WRITE_MODES = [
+    ("delete+full", {"journal_mode": "delete", "synchronous": "full"}, False),
+    ("wal+normal", None, False),
+    ("wal+batched", None, True),
+]
+
+
+# برنامه گرافیکی که بنچمارک شروع سرد اجرا می‌کند
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "event_scheduler (9).py")
+
+# هر اجرا در یک پروسه تازه: زمان‌ها از شروع پروسه تا پایان importها، اولین نقاشی پنجره (paint)
+# و نمایش اولین نما (interactive)، به میلی‌ثانیه در یک خط JSON
+_STARTUP_SCRIPT = '''
+import json, sys, time
+start = time.perf_counter()
+import importlib.util
+spec = importlib.util.spec_from_file_location("event_scheduler_app", sys.argv[1])
+app_module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(app_module)
+imported = time.perf_counter()
+app_module.event_db.DB_PATH = sys.argv[2]
+root = app_module.tk.Tk()
+app = app_module.EventSchedulerApp(root)
+
+def poll():
+    if "interactive" not in app.startup_times:
+        root.after(5, poll)
+        return
+    times = dict(app.startup_times, imports=imported)
+    print(json.dumps({name: (value - start) * 1000 for name, value in times.items()}))
+    app.on_close()
+
+poll()
+root.mainloop()
+'''
+
+
+# سرویس HTTP که بنچمارک بار (--http) اجرا می‌کند، و آدرس‌هایی که هر مشتری به نوبت می‌خواند
+SERVER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "server.py")
+HTTP_PATHS = ["/nearest", "/events?limit=20", "/weekly", "/search?q=" + quote(SEARCH_TEXT)]
+
+
+def populate(store, count, now, seed=0):
+    recurring = int(count * RECURRING_SHARE)
+    workload.fill(store, count - recurring, recurring, seed, now.date())
+
+
+def measure(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def read_operations(store, now, size):
+    # خواندن‌هایی که دیتابیس را تغییر نمی‌دهند؛ هم run و هم آزمون pytest-benchmark (tests/test_benchmark.py) از آن‌ها استفاده می‌کنند
+    return {
+        "nearest": lambda: store.nearest_event(now),
+        "future": lambda: store.future_events(now),
+        "all": lambda: store.all_events(),
+        "all.page": lambda: store.all_pages().rows_at(size // 2, 40),
+        "weekly": lambda: store.weekly_schedule(now),
+        "tasks": lambda: store.future_tasks(now),
+        "search": lambda: store.search(SEARCH_TEXT),
+        "conflicts": lambda: store.conflicts(now, now.date().isoformat(), "12:00", "13:00"),
+        "conflicts.week": lambda: store.conflicts_in_range(now.date(), now.date() + timedelta(days=6)),
+        "free": lambda: store.free_slots(now, 14, 90, 8 * 60, 18 * 60),
+        "types": lambda: store.type_counts(),
+        # بسط قاعده‌ها در پایتون، بدون جدول occurrences
+        "nearest.expand": lambda: next(recurrence.expand_upcoming(store.conn, now), None),
+        "future.expand": lambda: list(islice(recurrence.expand_upcoming(store.conn, now), FUTURE_LIMIT)),
+    }
+
+
+def run(size, repeat, directory, seed=0):
+    # روی یک کپی از دیتابیس آماده، پس هر اجرا (و هر کامیت) از داده یکسان شروع می‌کند
+    path = os.path.join(directory, f"run_{size}.db")
+    _remove(path)
+    shutil.copyfile(prepared(directory, "events", size, seed), path)
+    store = EventStore.open(path)
+    now = datetime.now()
+
+    rng = random.Random(1)
+    added = []
+    results = {}
+    results["add"] = measure(lambda: added.append(
+        store.add_event("بنچمارک", "سایر", now.date().isoformat(), "12:00", "")), repeat)
+    results["update"] = measure(lambda: store.update_event(
+        rng.choice(added), "بنچمارک", "جلسه", now.date().isoformat(), "13:00", ""), repeat)
+    results["delete"] = measure(lambda: store.delete_event(added.pop()), repeat)
+    bulk = workload.Workload(seed + 1, now.date())
+    batches = [list(bulk.rows(BULK_SIZE - BULK_SIZE // 20, BULK_SIZE // 20)) for _ in range(repeat)]
+    last_id = store.conn.execute("SELECT max(id) FROM events").fetchone()[0]
+    results["add.bulk"] = measure(lambda: store.add_events(batches.pop()), repeat)
+    with store.transaction():
+        store.conn.execute("DELETE FROM events WHERE id > ?", (last_id,))
+    for name, func in read_operations(store, now, size).items():
+        results[name] = measure(func, repeat)
+
+    # همان خواندن‌ها با نمایه ستونی در حافظه، و هزینه اصلاح آن در هر نوشتن
+    results["snapshot.load"] = measure(store.enable_snapshot, 1)
+    results["nearest.snapshot"] = measure(lambda: store.nearest_event(now), repeat)
+    results["future.snapshot"] = measure(lambda: store.future_events(now), repeat)
+    results["weekly.snapshot"] = measure(lambda: store.weekly_schedule(now), repeat)
+    results["types.snapshot"] = measure(store.type_counts, repeat)
+    results["add.snapshot"] = measure(lambda: added.append(
+        store.add_event("بنچمارک", "سایر", now.date().isoformat(), "12:00", "")), repeat)
+    results["delete.snapshot"] = measure(lambda: store.delete_event(added.pop()), repeat)
+    # جلو بردن افق وقوع‌ها یک روز در هر تکرار (آخر از همه، چون افق از امروز جلو می‌افتد)
+    days = iter(range(1, repeat + 1))
+    results["refresh"] = measure(lambda: store.refresh_occurrences(now + timedelta(days=next(days))), repeat)
+    store.close()
+    return results
+
+
+def run_calendar(count, repeat):
+    # مقایسه تبدیل مستقیم با jdatetime و جدول jalali_calendar
+    import jdatetime
+
+    rng = random.Random(2)
+    base = datetime(2000, 1, 1).date()
+    dates = [(base + timedelta(days=rng.randrange(20000))).isoformat() for _ in range(count)]
+    jalali_calendar.get_calendar()
+
+    def with_jdatetime():
+        for value in dates:
+            jalali = jdatetime.date.fromgregorian(date=datetime.strptime(value, "%Y-%m-%d"))
+            jalali_str = jalali.strftime("%Y-%m-%d")
+            year, month, day = map(int, jalali_str.split("-"))
+            jdatetime.date(year, month, day).weekday()
+
+    def with_table():
+        for value in dates:
+            jalali_str = jalali_calendar.gregorian_to_jalali(value)
+            jalali_calendar.jalali_weekday(jalali_str)
+
+    return {"jdatetime": measure(with_jdatetime, repeat), "table": measure(with_table, repeat)}
+
+
+def run_writes(count, directory):
+    # تعداد add_event در ثانیه برای هر حالت WRITE_MODES
+    results = {}
+    today = datetime.now().date().isoformat()
+    for name, pragmas, grouped in WRITE_MODES:
+        path = os.path.join(directory, f"writes_{name.replace('+', '_')}.db")
+        _remove(path)
+        store = EventStore.open(path, pragmas)
+
+        def write():
+            for i in range(count):
+                store.add_event(f"نوشتن {i}", "سایر", today, "12:00", "")
+
+        start = time.perf_counter()
+        if grouped:
+            with store.transaction():
+                write()
+        else:
+            write()
+        results[name] = count / (time.perf_counter() - start)
+        store.close()
+    return results
+
+
+def _remove(path):
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+
+def prepared(directory, name, size, seed=0):
+    # دیتابیس مصنوعی با size رویداد برای امروز؛ اگر از اجرای قبلی در directory مانده باشد دوباره ساخته نمی‌شود
+    path = os.path.join(directory, f"{name}_{size}_{seed}_{datetime.now().date().isoformat()}.db")
+    if not os.path.exists(path):
+        building = path + ".tmp"
+        _remove(building)
+        store = EventStore.open(building)
+        populate(store, size, datetime.now(), seed)
+        store.checkpoint("TRUNCATE")
+        store.close()
+        os.replace(building, path)
+    return path
+
+
+def run_startup(size, repeat, directory):
+    # زمان شروع برنامه گرافیکی روی یک دیتابیس آماده (به نمایشگر نیاز دارد)
+    path = prepared(directory, "startup", size)
+    results = {"imports": [], "paint": [], "interactive": []}
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, "-c", _STARTUP_SCRIPT, APP_PATH, os.path.abspath(path)],
+                                cwd=os.path.dirname(APP_PATH), capture_output=True, text=True, check=True).stdout
+        times = json.loads(output.splitlines()[-1])
+        for name in results:
+            if name in times:
+                results[name].append(times[name])
+    return {name: timings for name, timings in results.items() if timings}
+
+
+async def _http_request(reader, writer, method, path, etag=None, body=None):
+    # یک درخواست روی اتصال keep-alive؛ (وضعیت، ETag)
+    lines = [f"{method} {path} HTTP/1.1", "Host: localhost"]
+    if etag is not None:
+        lines.append(f"If-None-Match: {etag}")
+    body = json.dumps(body, ensure_ascii=False).encode() if body is not None else b""
+    lines.append(f"Content-Length: {len(body)}")
+    writer.write(("\r\n".join(lines) + "\r\n\r\n").encode() + body)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    headers = {}
+    while (line := await reader.readline()) not in (b"\r\n", b""):
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    await reader.readexactly(int(headers.get("content-length", 0)))
+    return status, headers.get("etag")
+
+
+async def _http_load(host, port, mode, seconds, concurrency):
+    # concurrency مشتری همزمان، هر کدام با یک اتصال، تا seconds ثانیه؛ زمان هر درخواست به میلی‌ثانیه
+    # mode: get (بدون ETag)، get.304 (با ETag پاسخ قبلی)، post (افزودن رویداد از نویسنده تکی)
+    timings = []
+    deadline = time.perf_counter() + seconds
+    today = datetime.now().date().isoformat()
+
+    async def client(number):
+        reader, writer = await asyncio.open_connection(host, port)
+        etags = {}
+        try:
+            for path in HTTP_PATHS:
+                etags[path] = (await _http_request(reader, writer, "GET", path))[1]
+            count = number
+            while time.perf_counter() < deadline:
+                path = HTTP_PATHS[count % len(HTTP_PATHS)]
+                count += 1
+                start = time.perf_counter()
+                if mode == "post":
+                    await _http_request(reader, writer, "POST", "/events", body={
+                        "title": f"بار {number}", "event_type": "سایر", "time": "12:00",
+                        "date": jalali_calendar.gregorian_to_jalali(today)})
+                else:
+                    await _http_request(reader, writer, "GET", path, etags[path] if mode == "get.304" else None)
+                timings.append((time.perf_counter() - start) * 1000)
+        finally:
+            writer.close()
+
+    await asyncio.gather(*(client(number) for number in range(concurrency)))
+    return timings
+
+
+def run_http(size, seconds, concurrency, directory):
+    # تعداد درخواست در ثانیه و صدک 50 و 99 زمان پاسخ سرویس HTTP در یک پروسه جداگانه
+    path = prepared(directory, "http", size)
+    server = subprocess.Popen([sys.executable, SERVER_PATH, "--db", path, "--port", "0"],
+                              cwd=os.path.dirname(SERVER_PATH), stdout=subprocess.PIPE, text=True)
+    try:
+        host, port = server.stdout.readline().strip().removeprefix("http://").rsplit(":", 1)
+        results = {}
+        for mode in ("get", "get.304", "post"):
+            timings = asyncio.run(_http_load(host, int(port), mode, seconds, concurrency))
+            cuts = statistics.quantiles(timings, n=100)
+            results[mode] = (len(timings) / seconds, cuts[49], cuts[98])
+        return results
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def report(size, results):
+    if size != "":
+        print(f"\n{size:,} events", end="")
+    print()
+    print(f"{'operation':<18}{'median ms':>12}{'min ms':>12}{'max ms':>12}")
+    for name, timings in results.items():
+        print(f"{name:<18}{statistics.median(timings):>12.3f}{min(timings):>12.3f}{max(timings):>12.3f}")
+
+
+def summary(results):
+    # زمان‌های هر عملیات با میانه و کمینه و بیشینه برای فایل JSON
+    return {name: {"median": statistics.median(timings), "min": min(timings), "max": max(timings),
+                   "timings": timings}
+            for name, timings in results.items()}
+
+
+def environment(args):
+    # مشخصات اجرا برای مقایسه نتیجه‌های کامیت‌ها و ماشین‌های مختلف
+    directory = os.path.dirname(os.path.abspath(__file__))
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=directory, capture_output=True, text=True,
+                                check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=directory,
+                                    capture_output=True, text=True, check=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        commit, dirty = None, None
+    return {
+        "commit": commit,
+        "dirty": dirty,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "sizes": args.sizes,
+        "repeat": args.repeat,
+        "seed": args.seed,
+        "recurring_share": RECURRING_SHARE,
+    }
+
+
+def compare(base, results):
+    # نسبت میانه هر عملیات به اجرای پایه؛ کمتر از 1 یعنی سریع‌تر
+    print(f"\ncompared with {(base['environment']['commit'] or '?')[:10]} ({base['environment']['created']})")
+    print(f"{'operation':<18}{'base ms':>12}{'now ms':>12}{'ratio':>10}")
+    for size, operations in results.get("sizes", {}).items():
+        base_operations = base.get("sizes", {}).get(size)
+        if base_operations is None:
+            continue
+        print(f"{int(size):,} events")
+        for name, stat in operations.items():
+            if name in base_operations:
+                before = base_operations[name]["median"]
+                ratio = stat["median"] / before if before else float("inf")
+                print(f"{name:<18}{before:>12.3f}{stat['median']:>12.3f}{ratio:>10.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="بنچمارک عملیات EventStore")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0, help="seed داده مصنوعی (workload.py)")
+    parser.add_argument("--dir", help="پوشه نگهداری دیتابیس‌های مصنوعی (برای استفاده دوباره در اجراهای بعد)")
+    parser.add_argument("--json", help="ذخیره نتیجه‌ها در این فایل JSON")
+    parser.add_argument("--compare", help="مقایسه میانه‌ها با نتیجه JSON یک اجرای قبلی")
+    parser.add_argument("--calendar", type=int, default=100_000,
+                        help="تعداد تاریخ برای مقایسه تبدیل شمسی (0 یعنی اجرا نشود)")
+    parser.add_argument("--writes", type=int, default=1000,
+                        help="تعداد نوشتن برای مقایسه حالت‌های ژورنال (0 یعنی اجرا نشود)")
+    parser.add_argument("--startup", action="store_true",
+                        help="فقط زمان شروع برنامه گرافیکی برای هر اندازه (به نمایشگر نیاز دارد)")
+    parser.add_argument("--http", type=float, metavar="SECONDS",
+                        help="فقط آزمون بار سرویس HTTP برای هر اندازه، هر حالت به مدت SECONDS ثانیه")
+    parser.add_argument("--clients", type=int, default=16, help="تعداد مشتری همزمان در آزمون بار")
+    args = parser.parse_args()
+    # فایل پایه پیش از اجرای طولانی خوانده می‌شود تا مسیر اشتباه زود معلوم شود
+    base = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as source:
+            base = json.load(source)
+
+    if args.dir:
+        os.makedirs(args.dir, exist_ok=True)
+
+    results = {"environment": environment(args)}
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = args.dir or tmp
+        if args.http:
+            results["http"] = {}
+            for size in args.sizes:
+                print(f"\nHTTP load, {size:,} events, {args.clients} clients")
+                print(f"{'mode':<16}{'req/s':>12}{'p50 ms':>12}{'p99 ms':>12}")
+                modes = run_http(size, args.http, args.clients, directory)
+                results["http"][str(size)] = {mode: {"rps": rate, "p50": median, "p99": p99}
+                                              for mode, (rate, median, p99) in modes.items()}
+                for mode, (rate, median, p99) in modes.items():
+                    print(f"{mode:<16}{rate:>12.0f}{median:>12.3f}{p99:>12.3f}")
+        elif args.startup:
+            results["startup"] = {}
+            for size in args.sizes:
+                print(f"\nstartup, {size:,} events (ms from process start)", end="")
+                timings = run_startup(size, args.repeat, directory)
+                results["startup"][str(size)] = summary(timings)
+                report("", timings)
+        else:
+            if args.calendar:
+                print(f"\nJalali conversion + weekday for {args.calendar:,} dates", end="")
+                timings = run_calendar(args.calendar, args.repeat)
+                results["calendar"] = summary(timings)
+                report("", timings)
+            if args.writes:
+                print(f"\n{args.writes:,} single-event writes")
+                print(f"{'mode':<16}{'writes/s':>12}")
+                results["writes"] = run_writes(args.writes, directory)
+                for name, rate in results["writes"].items():
+                    print(f"{name:<16}{rate:>12.0f}")
+            results["sizes"] = {}
+            for size in args.sizes:
+                timings = run(size, args.repeat, directory, args.seed)
+                results["sizes"][str(size)] = summary(timings)
+                report(size, timings)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as out:
+            json.dump(results, out, ensure_ascii=False, indent=1)
+    if base is not None:
+        compare(base, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+from datetime import datetime
+import jalali_calendar
+
+
+def format_time(now):
+    return f"{now.hour:02d}:{now.minute:02d}:{now.second:02d}"
+
+
+class Clock:
+    # ساعت برنامه: تاریخ شمسی و روز هفته فقط با عوض شدن روز دوباره محاسبه می‌شوند
+    # و هر تیک با after درست در شروع ثانیه بعدی ساعت دیواری زمان‌بندی می‌شود تا برچسب عقب نیفتد
+    def __init__(self, root, on_tick, now=datetime.now):
+        self.root = root
+        self.on_tick = on_tick
+        self.now = now
+        self.day = None
+        self.jalali = None
+        self.weekday = None
+        self._job = None
+
+    def update(self, now):
+        # اگر روز عوض شده باشد (یا اولین بار) True برمی‌گرداند
+        day = now.toordinal()
+        if day == self.day:
+            return False
+        self.day = day
+        self.jalali = jalali_calendar.format_date(*jalali_calendar.get_calendar().to_jalali(day))
+        self.weekday = jalali_calendar.weekday(day)
+        return True
+
+    def start(self):
+        if self._job is None:
+            self._tick()
+
+    def stop(self):
+        if self._job is not None:
+            self.root.after_cancel(self._job)
+            self._job = None
+
+    def _tick(self):
+        now = self.now()
+        self.on_tick(now)
+        # تا شروع ثانیه بعد؛ زمان صرف‌شده در on_tick هم حساب می‌شود
+        delay = 1000 - self.now().microsecond // 1000
+        self._job = self.root.after(delay, self._tick)
@@ -0,0 +1,141 @@
+import heapq
+import json
+from collections import namedtuple
+from datetime import date as date_cls
+import event_db
+import jalali_calendar
+from recurrence import WEEK
+
+# دو رویداد هم‌پوشان در یک روز؛ first زودتر (یا هم‌زمان) شروع می‌شود
+Conflict = namedtuple("Conflict", ["date", "first", "second"])
+
+# فاصله آزاد در یک روز؛ start و end دقیقه از ابتدای روز (end انحصاری)
+FreeSlot = namedtuple("FreeSlot", ["date", "start", "end"])
+
+MINUTES_PER_DAY = 24 * 60
+
+
+def to_minute(time_str):
+    return int(time_str[0:2]) * 60 + int(time_str[3:5])
+
+
+def format_minute(minute):
+    return f"{minute // 60:02}:{minute % 60:02}"
+
+
+def time_interval(time, end_time=None):
+    # بازه [شروع، پایان) به دقیقه، همان ستون‌های minute و end_minute؛ رویداد بدون ساعت بازه ندارد
+    if not time:
+        return None
+    start = to_minute(time)
+    end = to_minute(end_time) if end_time else 0
+    return start, max(end, start + 1)
+
+
+def event_conflicts(conn, today, date=None, time=None, end_time=None, is_recurring=False,
+                    recurring_day=-1, end_date=None, exclude_id=None):
+    # رویدادهایی که با رویداد داده‌شده (با همان آرگومان‌های add_event) هم‌پوشانی دارند؛ today شماره روز میلادی
+    # برای قاعده هفتگی فقط وقوع‌های از امروز به بعد بررسی می‌شوند
+    interval = time_interval(time, end_time)
+    if interval is None:
+        return []
+    start, end = interval
+    if is_recurring:
+        last = date_cls.fromisoformat(end_date).toordinal() if end_date else None
+        if last is not None and last < today:
+            return []
+        rows = event_db.select_events(conn, event_db.QUERIES["conflicts.weekly"], (
+            recurring_day, today, last, last, end, start,
+            recurring_day, today, end, start))
+    else:
+        day = date_cls.fromisoformat(date).toordinal()
+        weekday = jalali_calendar.weekday(day)
+        rows = event_db.select_events(conn, event_db.QUERIES["conflicts.day"], (
+            weekday, day, end, start,
+            weekday, day, end, start))
+    return sorted((event for event in rows if event.id != exclude_id),
+                  key=lambda event: (event.day_num or 0, event.minute, event.id))
+
+
+def sweep(intervals):
+    # خط جاروب روی (شروع، پایان، مقدار) مرتب بر اساس شروع: بازه‌های باز در یک هیپ بر اساس پایان؛
+    # هر جفت هم‌پوشان یک بار برگردانده می‌شود — O(n log n + k)
+    active = []
+    for index, (start, end, value) in enumerate(intervals):
+        while active and active[0][0] <= start:
+            heapq.heappop(active)
+        for _, _, other in active:
+            yield other, value
+        heapq.heappush(active, (end, index, value))
+
+
+def occurrence_intervals(conn, first_day, last_day):
+    # بازه‌های وقوع‌های ساعت‌دار بین دو شماره روز میلادی (با هر دو سر) به‌صورت (شروع، پایان، (روز، رویداد))؛
+    # زمان‌ها دقیقه از ابتدای روز 0 هستند؛ داخل افق جدول occurrences با یک پیمایش ایندکس و بیرون از آن
+    # با باز کردن قاعده‌های هفتگی برای هر هفته. مرتب نیست
+    horizon_first, horizon_last = event_db.occurrence_horizon(conn)
+    if horizon_first <= first_day and last_day <= horizon_last:
+        # هر رویداد (مثلاً قاعده‌ای با چند وقوع در بازه) فقط یک بار خوانده می‌شود
+        occurrences = event_db.execute(conn, event_db.QUERIES["occurrences.range"], (first_day, last_day)).fetchall()
+        ids = list({event_id for event_id, _ in occurrences})
+        events = {event.id: event for event in event_db.select_events(
+            conn, event_db.QUERIES["occurrences.events"], (json.dumps(ids),))}
+        intervals = []
+        for event_id, day in occurrences:
+            event = events[event_id]
+            base = day * MINUTES_PER_DAY
+            intervals.append((base + event.minute, base + event.end_minute, (day, event)))
+        return intervals
+    intervals = []
+    for event in event_db.select_events(conn, event_db.QUERIES["conflicts.range.single"], (first_day, last_day)):
+        base = event.day_num * MINUTES_PER_DAY
+        intervals.append((base + event.minute, base + event.end_minute, (event.day_num, event)))
+    for event in event_db.select_events(conn, event_db.QUERIES["conflicts.range.recurring"], (first_day,)):
+        last = last_day if event.end_day_num is None else min(last_day, event.end_day_num)
+        first = first_day + (event.recurring_day - jalali_calendar.weekday(first_day)) % WEEK
+        for day in range(first, last + 1, WEEK):
+            base = day * MINUTES_PER_DAY
+            intervals.append((base + event.minute, base + event.end_minute, (day, event)))
+    return intervals
+
+
+def range_conflicts(conn, first_day, last_day):
+    # همه جفت‌های هم‌پوشان بین دو شماره روز میلادی (با هر دو سر)، به ترتیب زمان
+    intervals = occurrence_intervals(conn, first_day, last_day)
+    intervals.sort(key=lambda interval: (interval[0], interval[1], interval[2][1].id))
+    return [Conflict(date_cls.fromordinal(day), first, second)
+            for (day, first), (_, second) in sweep(intervals)]
+
+
+def free_slots(conn, first_day, last_day, duration, day_start=0, day_end=MINUTES_PER_DAY, weekdays=None,
+               exclude_types=(), not_before=None, limit=None):
+    # فاصله‌های آزاد دست‌کم duration دقیقه‌ای در ساعت‌های [day_start، day_end) هر روز، به ترتیب زمان
+    # weekdays مجموعه روزهای هفته شمسی مجاز (None یعنی همه)؛ رویدادهای نوع‌های exclude_types مانع نیستند
+    # not_before دقیقه مطلق (روز × 1440 + دقیقه) که قبل از آن جستجو نمی‌شود، مثلاً اکنون
+    busy = sorted((start, end) for start, end, (_, event) in occurrence_intervals(conn, first_day, last_day)
+                  if event.event_type not in exclude_types)
+    slots = []
+    index = 0
+    for day in range(first_day, last_day + 1):
+        if weekdays is not None and jalali_calendar.weekday(day) not in weekdays:
+            continue
+        base = day * MINUTES_PER_DAY
+        cursor, window_end = base + day_start, base + day_end
+        if not_before is not None:
+            cursor = max(cursor, not_before)
+        # جاروب روی بازه‌های مشغول مرتب: cursor ابتدای فاصله آزاد جاری است
+        while index < len(busy) and busy[index][1] <= cursor:
+            index += 1
+        scan = index
+        while cursor < window_end:
+            if scan < len(busy) and busy[scan][0] < window_end:
+                start, end = busy[scan]
+                scan += 1
+            else:
+                start = end = window_end
+            if start - cursor >= duration:
+                slots.append(FreeSlot(date_cls.fromordinal(day), cursor - base, start - base))
+                if limit is not None and len(slots) >= limit:
+                    return slots
+            cursor = max(cursor, end)
+    return slots
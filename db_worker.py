@@ -0,0 +1,99 @@
+import queue
+import threading
+import profiling
+
+
+class DBWorker:
+    # رشته جداگانه با اتصال خودش (برای خواندن نماها و نوشتن‌های نگهداری مثل جلو بردن افق وقوع‌ها):
+    # درخواست‌ها به ترتیب از صف اجرا می‌شوند و نتیجه با after در رشته Tk
+    # به callback می‌رسد. برای هر کلید فقط آخرین درخواست مهم است؛ درخواست قدیمی‌تر اگر هنوز شروع نشده
+    # اجرا نمی‌شود و اگر اجرا شده، نتیجه‌اش دور ریخته می‌شود
+    # تا وقتی درخواستی در راه است هر POLL_INTERVAL میلی‌ثانیه صف نتیجه‌ها خوانده می‌شود؛ در حالت بیکار تایمری نیست
+    POLL_INTERVAL = 15
+
+    def __init__(self, root, open_store):
+        self.root = root
+        self.requests = queue.Queue()
+        self.results = queue.Queue()
+        self.generations = {}  # کلید -> شماره آخرین درخواست
+        self.pending = {}  # کلید -> تعداد درخواست‌هایی که نتیجه‌شان هنوز به رشته Tk نرسیده
+        self._poll_job = None
+        self.thread = threading.Thread(target=self._run, args=(open_store,), name="db-worker", daemon=True)
+        self.thread.start()
+
+    def submit(self, key, func, callback):
+        # func(store) در رشته کارگر اجرا و callback(نتیجه) در رشته Tk صدا زده می‌شود
+        generation = self.generations.get(key, 0) + 1
+        self.generations[key] = generation
+        self.pending[key] = self.pending.get(key, 0) + 1
+        self.requests.put((key, generation, func, callback))
+        self._schedule_poll()
+
+    def cancel(self, key):
+        # نتیجه درخواست‌های در راه این کلید دور ریخته می‌شود
+        self.generations[key] = self.generations.get(key, 0) + 1
+
+    def busy(self, key):
+        return self.pending.get(key, 0) > 0
+
+    def stop(self, timeout=2):
+        self.requests.put(None)
+        self.thread.join(timeout)
+        if self._poll_job is not None:
+            self.root.after_cancel(self._poll_job)
+            self._poll_job = None
+
+    def _run(self, open_store):
+        # اگر اتصال باز نشود، هر درخواست به‌جای نتیجه همان خطا را به رشته Tk می‌رساند تا pending خالی شود و poll بایستد
+        try:
+            store, failure = open_store(), None
+        except Exception as error:
+            store, failure = None, error
+        try:
+            while True:
+                request = self.requests.get()
+                if request is None:
+                    break
+                key, generation, func, callback = request
+                if generation != self.generations.get(key):
+                    self.results.put((key, None, None, None, None))
+                    continue
+                if failure is not None:
+                    self.results.put((key, generation, callback, None, failure))
+                    continue
+                try:
+                    with profiling.timer("worker", key):
+                        result = func(store)
+                    self.results.put((key, generation, callback, result, None))
+                except Exception as error:
+                    self.results.put((key, generation, callback, None, error))
+        finally:
+            if store is not None:
+                store.close()
+
+    def _schedule_poll(self):
+        if self._poll_job is None:
+            self._poll_job = self.root.after(self.POLL_INTERVAL, self._poll)
+
+    def _poll(self):
+        self._poll_job = None
+        delivered = []
+        while True:
+            try:
+                key, generation, callback, result, error = self.results.get_nowait()
+            except queue.Empty:
+                break
+            self.pending[key] -= 1
+            if generation is not None and generation == self.generations.get(key):
+                delivered.append((callback, result, error))
+        if any(self.pending.values()):
+            self._schedule_poll()
+
+        errors = []
+        for callback, result, error in delivered:
+            if error is not None:
+                errors.append(error)
+            else:
+                callback(result)
+        if errors:
+            raise errors[0]
@@ -0,0 +1,549 @@
+import re
+import sqlite3
+import sys
+from collections import namedtuple
+from contextlib import contextmanager
+from pathlib import Path
+import profiling
+
+DB_PATH = "events.db"
+
+# تنظیمات پیش‌فرض هر اتصال؛ connect(pragmas=...) هر کدام را عوض می‌کند (None یعنی تنظیم نشود)
+# WAL خواندن همزمان با نوشتن را ممکن می‌کند و با synchronous=normal هر commit دیگر fsync نمی‌خواهد
+PRAGMAS = {
+    "journal_mode": "wal",
+    "synchronous": "normal",
+    "cache_size": -16000,  # مقدار منفی یعنی کیلوبایت
+    "mmap_size": 64 * 1024 * 1024,
+    "temp_store": "memory",
+    "busy_timeout": 5000,
+}
+
+# حالت checkpoint دوره‌ای (بدون انتظار برای خواننده‌ها) و هنگام بستن برنامه (خالی کردن فایل WAL)
+CHECKPOINT_INTERVAL = 5 * 60 * 1000
+
+
+def _minute_of(column):
+    # دقیقه از ابتدای روز برای رشته HH:MM؛ برای مقدار نامعتبر NULL
+    return (f"CASE WHEN {column} GLOB '[0-2][0-9]:[0-5][0-9]' "
+            f"THEN CAST(substr({column}, 1, 2) AS INTEGER) * 60 + CAST(substr({column}, 4, 2) AS INTEGER) END")
+
+
+# ستون‌های بازه زمانی (مهاجرت 5)؛ محاسبه‌شده‌ها VIRTUAL هستند تا با ALTER TABLE هم اضافه شوند
+INTERVAL_COLUMNS = (
+    "end_time TEXT",
+    # پایان بازه (انحصاری)؛ رویداد بدون ساعت پایان (یا با پایان نامعتبر) یک دقیقه طول می‌کشد
+    "end_minute INTEGER GENERATED ALWAYS AS "
+    f"(CASE WHEN minute IS NOT NULL THEN max(ifnull({_minute_of('end_time')}, 0), minute + 1) END) VIRTUAL",
+    # روز هفته شمسی (شنبه=0): روز قاعده برای تکراری، روز تاریخ برای یک‌باره
+    "weekday INTEGER GENERATED ALWAYS AS "
+    "(CASE WHEN is_recurring = 1 THEN recurring_day ELSE (day_num + 1) % 7 END) VIRTUAL",
+)
+
+EVENTS_TABLE = '''
+    CREATE TABLE IF NOT EXISTS events (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        title TEXT NOT NULL,
+        event_type TEXT NOT NULL,
+        date TEXT,
+        time TEXT,
+        description TEXT,
+        is_recurring INTEGER DEFAULT 0,
+        recurring_day INTEGER DEFAULT -1,
+        end_date TEXT,
+        day_num INTEGER GENERATED ALWAYS AS ({day_num}) STORED,
+        minute INTEGER GENERATED ALWAYS AS ({minute}) STORED,
+        end_day_num INTEGER GENERATED ALWAYS AS ({end_day_num}) STORED,
+        {interval_columns}
+    )
+'''.format(
+    # شماره روز میلادی (برابر date.toordinal) و دقیقه از ابتدای روز؛ برای مقدار نامعتبر NULL
+    day_num="CAST(julianday(date) - 1721424.5 AS INTEGER)",
+    minute=_minute_of("time"),
+    end_day_num="CAST(julianday(end_date) - 1721424.5 AS INTEGER)",
+    interval_columns=",\n        ".join(INTERVAL_COLUMNS),
+)
+
+# ستون‌های ذخیره‌شده جدول نسخه 3 (بدون ستون‌های محاسبه‌شده)؛ end_time در مهاجرت 5 اضافه شد
+EVENT_COLUMNS = ("id", "title", "event_type", "date", "time", "description",
+                 "is_recurring", "recurring_day", "end_date")
+
+
+def _migration_1(conn):
+    # جدول پایه + ستون‌های تکرار برای دیتابیس‌های نسخه ساده
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(events)")}
+    if not columns:
+        conn.execute(EVENTS_TABLE)
+    elif "is_recurring" not in columns:
+        # نسخه ساده date و time را NOT NULL تعریف کرده بود؛ جدول بازسازی می‌شود
+        conn.execute("ALTER TABLE events RENAME TO events_old")
+        conn.execute(EVENTS_TABLE)
+        conn.execute('''
+            INSERT INTO events (id, title, event_type, date, time, description)
+            SELECT id, title, event_type, date, time, description FROM events_old
+        ''')
+        conn.execute("DROP TABLE events_old")
+    conn.execute("UPDATE events SET is_recurring = 0 WHERE is_recurring IS NULL")
+
+    # ایندکس‌ها برای الگوهای واقعی پرس‌وجو
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_events_single
+        ON events (is_recurring DESC, date, time)
+    ''')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_events_recurring
+        ON events (is_recurring, recurring_day, end_date)
+    ''')
+
+
+def _migration_2(conn):
+    # ایندکس صفحه‌بندی keyset فهرست‌های مجازی؛ NULL با '' جایگزین می‌شود تا مقایسه سطری ممکن باشد
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_events_page
+        ON events (is_recurring, ifnull(date, ''), ifnull(time, ''))
+    ''')
+
+
+def _migration_3(conn):
+    # ستون‌های عددی day_num، minute و end_day_num کنار ستون‌های متنی؛ ستون محاسبه‌شده STORED
+    # را نمی‌توان با ALTER TABLE اضافه کرد، پس جدول بازسازی می‌شود و مقدارها برای سطرهای قبلی پر می‌شوند
+    columns = {row[1] for row in conn.execute("PRAGMA table_xinfo(events)")}
+    if "day_num" not in columns:
+        conn.execute("ALTER TABLE events RENAME TO events_old")
+        conn.execute(EVENTS_TABLE)
+        conn.execute(f'''
+            INSERT INTO events ({', '.join(EVENT_COLUMNS)})
+            SELECT {', '.join(EVENT_COLUMNS)} FROM events_old
+        ''')
+        conn.execute("DROP TABLE events_old")
+
+    # ایندکس‌های متنی با معادل عددی جایگزین می‌شوند
+    for name in ("idx_events_single", "idx_events_recurring", "idx_events_page"):
+        conn.execute(f"DROP INDEX IF EXISTS {name}")
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_events_day
+        ON events (is_recurring DESC, day_num, minute)
+    ''')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_events_rule
+        ON events (is_recurring, recurring_day, end_day_num)
+    ''')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_events_page
+        ON events (is_recurring, ifnull(day_num, 0), ifnull(minute, -1))
+    ''')
+
+
+def _migration_4(conn):
+    # جستجوی متن کامل روی عنوان و توضیحات؛ جدول FTS5 محتوای خودش را ندارد و با تریگرها همگام می‌ماند
+    # prefix='2 3' جستجوی پیشوندی کوتاه را بدون پیمایش همه واژه‌ها ممکن می‌کند
+    conn.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS events_fts
+        USING fts5(title, description, content='events', content_rowid='id', prefix='2 3')
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS events_fts_insert AFTER INSERT ON events BEGIN
+            INSERT INTO events_fts (rowid, title, description) VALUES (new.id, new.title, new.description);
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS events_fts_delete AFTER DELETE ON events BEGIN
+            INSERT INTO events_fts (events_fts, rowid, title, description)
+            VALUES ('delete', old.id, old.title, old.description);
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS events_fts_update AFTER UPDATE OF title, description ON events BEGIN
+            INSERT INTO events_fts (events_fts, rowid, title, description)
+            VALUES ('delete', old.id, old.title, old.description);
+            INSERT INTO events_fts (rowid, title, description) VALUES (new.id, new.title, new.description);
+        END
+    ''')
+    rebuild_search_index(conn)
+
+
+def _migration_5(conn):
+    # بازه زمانی رویدادها و ایندکس بازه‌ای برای پیدا کردن هم‌پوشانی‌ها
+    # جدولی که با EVENTS_TABLE تازه ساخته (یا در مهاجرت 3 بازسازی) شده این ستون‌ها را از قبل دارد
+    columns = {row[1] for row in conn.execute("PRAGMA table_xinfo(events)")}
+    if "end_time" not in columns:
+        for column in INTERVAL_COLUMNS:
+            conn.execute(f"ALTER TABLE events ADD COLUMN {column}")
+    # فقط رویدادهای ساعت‌دار؛ در هر روز هفته، قاعده‌ها جدا از یک‌باره‌ها و یک‌باره‌ها به ترتیب روز و شروع
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_events_slot
+        ON events (weekday, is_recurring, day_num, minute, end_minute)
+        WHERE minute IS NOT NULL
+    ''')
+
+
+# بازه روزهایی که وقوع قاعده‌های هفتگی در جدول occurrences ساخته می‌شوند: از یک هفته قبل تا HORIZON_WEEKS هفته بعد
+HORIZON_PAST_DAYS = 7
+HORIZON_WEEKS = 26
+
+# وقوع‌های یک سطر events: یک‌باره‌ها یک وقوع در هر تاریخی دارند و قاعده‌ها در هر هفته افق (occurrence_weeks) یکی
+_OCCURRENCE_INSERT = '''
+    INSERT INTO occurrences (event_id, day_num, minute)
+    SELECT new.id, new.day_num, new.minute WHERE new.is_recurring = 0 AND new.day_num IS NOT NULL;
+    INSERT INTO occurrences (event_id, day_num, minute)
+    SELECT new.id, day, new.minute FROM (
+        SELECT first_day + (new.recurring_day - (first_day + 1) % 7 + 7) % 7 + 7 * n AS day, last_day
+        FROM occurrence_horizon, occurrence_weeks
+    )
+    WHERE new.is_recurring = 1 AND new.recurring_day BETWEEN 0 AND 6
+          AND day <= last_day AND (new.end_day_num IS NULL OR day <= new.end_day_num);
+'''
+
+# ساخت وقوع‌های همه قاعده‌ها در روزهای [?، ?] (همان شرط‌های _OCCURRENCE_INSERT)
+_EXPAND_RULES = '''
+    INSERT INTO occurrences (event_id, day_num, minute)
+    SELECT id, day, minute FROM (
+        SELECT id, minute, end_day_num, ? + (recurring_day - (? + 1) % 7 + 7) % 7 + 7 * n AS day
+        FROM events, occurrence_weeks
+        WHERE is_recurring = 1 AND recurring_day BETWEEN 0 AND 6 AND (end_day_num IS NULL OR end_day_num >= ?)
+    )
+    WHERE day <= ? AND (end_day_num IS NULL OR day <= end_day_num)
+'''
+
+
+def _migration_6(conn):
+    # جدول وقوع‌ها: همه نماها یک‌باره‌ها و تکراری‌ها را با یک پیمایش ایندکس (day_num، minute) می‌خوانند
+    # تریگرها جدول را با events همگام نگه می‌دارند؛ قاعده‌ها فقط در افق occurrence_horizon باز می‌شوند
+    # که refresh_occurrences آن را جلو می‌برد. افق خالی (first_day > last_day) یعنی هنوز ساخته نشده
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS occurrences (
+            event_id INTEGER NOT NULL,
+            day_num INTEGER NOT NULL,
+            minute INTEGER
+        )
+    ''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_occurrences_start ON occurrences (day_num, minute, event_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_occurrences_event ON occurrences (event_id)")
+    conn.execute("CREATE TABLE IF NOT EXISTS occurrence_horizon (first_day INTEGER NOT NULL, last_day INTEGER NOT NULL)")
+    conn.execute("INSERT INTO occurrence_horizon (first_day, last_day) VALUES (0, -1)")
+    conn.execute("CREATE TABLE IF NOT EXISTS occurrence_weeks (n INTEGER PRIMARY KEY)")
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS events_occurrences_insert AFTER INSERT ON events BEGIN
+            {_OCCURRENCE_INSERT}
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS events_occurrences_delete AFTER DELETE ON events BEGIN
+            DELETE FROM occurrences WHERE event_id = old.id;
+        END
+    ''')
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS events_occurrences_update
+        AFTER UPDATE OF date, time, is_recurring, recurring_day, end_date ON events BEGIN
+            DELETE FROM occurrences WHERE event_id = old.id;
+            {_OCCURRENCE_INSERT}
+        END
+    ''')
+    conn.execute('''
+        INSERT INTO occurrences (event_id, day_num, minute)
+        SELECT id, day_num, minute FROM events WHERE is_recurring = 0 AND day_num IS NOT NULL
+    ''')
+
+
+def occurrence_horizon(conn):
+    # (اولین، آخرین) شماره روز میلادی که وقوع قاعده‌ها در جدول occurrences دارند
+    return conn.execute("SELECT first_day, last_day FROM occurrence_horizon").fetchone()
+
+
+def refresh_occurrences(conn, today):
+    # جلو بردن افق با گذشت زمان: وقوع‌های گذشته قاعده‌ها حذف و هفته‌های تازه ساخته می‌شوند
+    # (قاعده‌هایی که end_date آن‌ها گذشته وقوع تازه نمی‌گیرند)؛ اگر افق به‌روز باشد چیزی نوشته نمی‌شود
+    first_day, last_day = today - HORIZON_PAST_DAYS, today + HORIZON_WEEKS * 7
+    old_first, old_last = occurrence_horizon(conn)
+    if (old_first, old_last) == (first_day, last_day):
+        return False
+    with transaction(conn):
+        weeks = (last_day - first_day) // 7 + 1
+        conn.execute("DELETE FROM occurrence_weeks WHERE n >= ?", (weeks,))
+        conn.executemany("INSERT OR IGNORE INTO occurrence_weeks (n) VALUES (?)", ((n,) for n in range(weeks)))
+        rules = "event_id IN (SELECT id FROM events WHERE is_recurring = 1)"
+        if old_first > old_last or first_day < old_first:
+            # افق خالی یا ساعت سیستم عقب رفته: ساخت دوباره همه وقوع‌های قاعده‌ها
+            conn.execute(f"DELETE FROM occurrences WHERE {rules}")
+            start = first_day
+        else:
+            conn.execute(f"DELETE FROM occurrences WHERE (day_num < ? OR day_num > ?) AND {rules}",
+                         (first_day, last_day))
+            start = max(old_last + 1, first_day)
+        conn.execute("UPDATE occurrence_horizon SET first_day = ?, last_day = ?", (first_day, last_day))
+        if start <= last_day:
+            conn.execute(_EXPAND_RULES, (start, start, start, last_day))
+    return True
+
+
+def rebuild_search_index(conn):
+    # ساخت دوباره ایندکس جستجو از روی جدول events (برای دیتابیس‌های قبلی یا بعد از تغییر دستی جدول)
+    conn.execute("INSERT INTO events_fts (events_fts) VALUES ('rebuild')")
+
+
+# هر مهاجرت یک بار اجرا می‌شود؛ نسخه در PRAGMA user_version ذخیره می‌شود
+MIGRATIONS = [_migration_1, _migration_2, _migration_3, _migration_4, _migration_5, _migration_6]
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def get_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn):
+    version = get_version(conn)
+    if version > SCHEMA_VERSION:
+        raise RuntimeError(f"نسخه دیتابیس ({version}) از نسخه برنامه ({SCHEMA_VERSION}) جدیدتر است")
+    for number in range(version + 1, SCHEMA_VERSION + 1):
+        with transaction(conn):
+            MIGRATIONS[number - 1](conn)
+            conn.execute(f"PRAGMA user_version = {number}")
+    return SCHEMA_VERSION
+
+
+@contextmanager
+def transaction(conn):
+    # چند نوشتن در یک تراکنش و یک commit؛ داخل تراکنش دیگر به همان تراکنش بیرونی می‌پیوندد
+    if conn.in_transaction:
+        yield conn
+        return
+    conn.execute("BEGIN")
+    try:
+        yield conn
+    except BaseException:
+        conn.rollback()
+        raise
+    conn.commit()
+
+
+def checkpoint(conn, mode="PASSIVE"):
+    # انتقال صفحه‌های WAL به فایل اصلی؛ (busy، صفحه‌های WAL، صفحه‌های منتقل‌شده)
+    return conn.execute(f"PRAGMA wal_checkpoint({mode})").fetchone()
+
+
+def connect(path=DB_PATH, pragmas=None):
+    conn = sqlite3.connect(path)
+    for name, value in dict(PRAGMAS, **(pragmas or {})).items():
+        if value is not None:
+            conn.execute(f"PRAGMA {name} = {value}")
+    migrate(conn)
+    return conn
+
+
+def connect_readonly(path=DB_PATH, pragmas=None):
+    # اتصال فقط‌خواندنی (mode=ro) برای ابزارهای خط فرمان: بدون مهاجرت و بدون تغییر journal_mode؛
+    # دیتابیسی که هنوز به SCHEMA_VERSION نرسیده باید یک بار با برنامه (connect) باز شود
+    conn = sqlite3.connect(Path(path).resolve().as_uri() + "?mode=ro", uri=True)
+    try:
+        for name, value in dict(PRAGMAS, **(pragmas or {})).items():
+            if value is not None and name != "journal_mode":
+                conn.execute(f"PRAGMA {name} = {value}")
+        version = get_version(conn)
+        if version != SCHEMA_VERSION:
+            raise RuntimeError(f"نسخه دیتابیس ({version}) با نسخه برنامه ({SCHEMA_VERSION}) یکی نیست")
+    except BaseException:
+        conn.close()
+        raise
+    return conn
+
+
+# ستون‌های جدول events به ترتیب تعریف (همان ترتیب SELECT *)
+EVENT_FIELDS = ("id", "title", "event_type", "date", "time", "description", "is_recurring", "recurring_day",
+                "end_date", "day_num", "minute", "end_day_num", "end_time", "end_minute", "weekday")
+
+# یک سطر events با نام ستون‌ها؛ پرس‌وجوهای رویداد (با event_row) همیشه همه فیلدها را به همین ترتیب دارند
+# و ستونی که یک نما لازم ندارد NULL خوانده می‌شود
+Event = namedtuple("Event", EVENT_FIELDS)
+
+# طول پیش‌نمایش توضیحات در فهرست‌ها؛ متن کامل هنگام انتخاب یا ویرایش خوانده می‌شود
+DESCRIPTION_PREVIEW = 80
+
+
+def projection(description="full", table=None):
+    # فهرست ستون‌های SELECT به ترتیب EVENT_FIELDS؛ description یکی از full، preview (DESCRIPTION_PREVIEW
+    # نویسه اول) یا none (NULL، بدون خواندن ستون)
+    prefix = f"{table}." if table else ""
+    columns = []
+    for field in EVENT_FIELDS:
+        if field == "description" and description == "preview":
+            columns.append(f"substr({prefix}description, 1, {DESCRIPTION_PREVIEW}) AS description")
+        elif field == "description" and description == "none":
+            columns.append("NULL AS description")
+        else:
+            columns.append(prefix + field)
+    return ", ".join(columns)
+
+
+def event_row(cursor, row):
+    # row_factory برای پرس‌وجوهای رویداد
+    return Event._make(row)
+
+
+def execute(conn, sql, params=(), row_factory=None, name=None):
+    # conn.execute با row_factory اختیاری؛ با EVENT_PROFILE زمان کل پرس‌وجو (اجرا و خواندن سطرها) با name،
+    # نامش در QUERIES یا (برای SQL بی‌نام) خود متن SQL ثبت می‌شود
+    cursor = conn.cursor()
+    if row_factory is not None:
+        cursor.row_factory = row_factory
+    if profiling.profiler is None:
+        return cursor.execute(sql, params)
+    return profiling.TimedCursor(cursor, name or QUERY_NAMES.get(sql) or " ".join(sql.split()), sql, params)
+
+
+def select_events(conn, sql, params=(), name=None):
+    # اجرای یک پرس‌وجوی رویداد؛ سطرها از نوع Event هستند
+    return execute(conn, sql, params, event_row, name)
+
+
+# نماهای فهرستی فقط پیش‌نمایش توضیحات را می‌خوانند؛ جدول هفتگی و بررسی هم‌پوشانی اصلاً به آن نیاز ندارند
+FULL_COLUMNS = projection()
+LIST_COLUMNS = projection("preview")
+SLOT_COLUMNS = projection("none")
+# همان ستون‌ها با نام جدول، برای پرس‌وجوهایی که events را با جدول دیگری (جستجو، وقوع‌ها) join می‌کنند
+JOIN_LIST_COLUMNS = projection("preview", "events")
+JOIN_FULL_COLUMNS = projection("full", "events")
+
+# جستجوی متنی با پیش‌نمایش توضیحات (فهرست برنامه) یا متن کامل (سرویس HTTP)
+_SEARCH = '''
+        SELECT {columns} FROM events_fts JOIN events ON events.id = events_fts.rowid
+        WHERE events_fts MATCH ? AND (? IS NULL OR events.event_type = ?)
+        ORDER BY events_fts.rank
+        LIMIT ?
+    '''
+
+# پرس‌وجوهای نماها؛ نام‌ها در بررسی طرح اجرا استفاده می‌شوند
+QUERIES = {
+    "upcoming.single": f'''
+        SELECT {LIST_COLUMNS} FROM events
+        WHERE is_recurring = 0 AND day_num >= ? AND (day_num > ? OR minute IS NULL OR minute >= ?)
+        ORDER BY day_num, minute, id
+    ''',
+    "upcoming.recurring": f'''
+        SELECT {LIST_COLUMNS} FROM events
+        WHERE is_recurring = 1 AND recurring_day BETWEEN 0 AND 6 AND (end_day_num IS NULL OR end_day_num >= ?)
+        ORDER BY CASE WHEN recurring_day = ? AND minute < ? THEN 7 ELSE (recurring_day - ? + 7) % 7 END,
+                 ifnull(minute, -1), id
+    ''',
+    # خواندن یک رویداد (برای ویرایش و اعلان تغییر) و متن کامل توضیحاتش
+    "event": f"SELECT {FULL_COLUMNS} FROM events WHERE id = ?",
+    "event.description": "SELECT description FROM events WHERE id = ?",
+    "type_counts": "SELECT event_type, COUNT(*) FROM events GROUP BY event_type",
+    "load_events.all": f'''
+        SELECT {LIST_COLUMNS} FROM events
+        ORDER BY is_recurring DESC, day_num, minute
+    ''',
+    # اولین رویداد یک‌باره ساعت‌دار از یک روز (جستجوی برنامه ساده event_scheduler.py)
+    "nearest.timed": f'''
+        SELECT {FULL_COLUMNS} FROM events
+        WHERE is_recurring = 0 AND day_num >= ? AND minute IS NOT NULL
+        ORDER BY day_num, minute LIMIT 1
+    ''',
+    "future_tasks": f'''
+        SELECT {LIST_COLUMNS} FROM events
+        WHERE is_recurring = 0 AND day_num >= ? AND minute IS NULL
+        ORDER BY day_num
+    ''',
+    # یک پرس‌وجو برای کل جدول هفتگی؛ ستون آخر نوع است (0 تکراری، 1 یک‌باره)
+    # سطرها به ترتیب نهایی جدول می‌آیند: روز هفته، اول تکراری‌ها، بعد تاریخ و ساعت (همان weekly_sort_key)
+    "weekly": f'''
+        SELECT * FROM (
+            SELECT {SLOT_COLUMNS}, 0 AS kind FROM events
+            WHERE is_recurring = 1 AND recurring_day BETWEEN 0 AND 6 AND (end_day_num IS NULL OR end_day_num >= ?)
+            UNION ALL
+            SELECT {SLOT_COLUMNS}, 1 FROM events
+            WHERE is_recurring = 0 AND day_num BETWEEN ? AND ?
+        )
+        ORDER BY weekday, kind, ifnull(day_num, 0), ifnull(minute, -1), id
+    ''',
+    # رویدادهای ساعت‌داری که بازه‌شان [شروع، پایان) را قطع می‌کند، با ایندکس idx_events_slot
+    # (قاعده‌های تکراری تاریخ ندارند؛ day_num IS NULL جستجوی ایندکس را تا ستون minute ادامه می‌دهد)
+    # conflicts.day برای یک تاریخ مشخص، conflicts.weekly برای یک قاعده هفتگی از یک روز به بعد (تا پایان اختیاری)
+    "conflicts.day": f'''
+        SELECT {SLOT_COLUMNS} FROM events
+        WHERE minute IS NOT NULL AND weekday = ? AND is_recurring = 0 AND day_num = ?
+              AND minute < ? AND end_minute > ?
+        UNION ALL
+        SELECT {SLOT_COLUMNS} FROM events
+        WHERE minute IS NOT NULL AND weekday = ? AND is_recurring = 1 AND day_num IS NULL
+              AND (end_day_num IS NULL OR end_day_num >= ?) AND minute < ? AND end_minute > ?
+    ''',
+    "conflicts.weekly": f'''
+        SELECT {SLOT_COLUMNS} FROM events
+        WHERE minute IS NOT NULL AND weekday = ? AND is_recurring = 0 AND day_num >= ? AND (? IS NULL OR day_num <= ?)
+              AND minute < ? AND end_minute > ?
+        UNION ALL
+        SELECT {SLOT_COLUMNS} FROM events
+        WHERE minute IS NOT NULL AND weekday = ? AND is_recurring = 1 AND day_num IS NULL
+              AND (end_day_num IS NULL OR end_day_num >= ?) AND minute < ? AND end_minute > ?
+    ''',
+    # ورودی خط جاروب برای یک بازه تاریخ
+    "conflicts.range.single": f'''
+        SELECT {SLOT_COLUMNS} FROM events
+        WHERE is_recurring = 0 AND day_num BETWEEN ? AND ? AND minute IS NOT NULL
+        ORDER BY day_num, minute
+    ''',
+    "conflicts.range.recurring": f'''
+        SELECT {SLOT_COLUMNS} FROM events
+        WHERE is_recurring = 1 AND recurring_day BETWEEN 0 AND 6 AND (end_day_num IS NULL OR end_day_num >= ?)
+              AND minute IS NOT NULL
+    ''',
+    # وقوع‌های داخل افق به ترتیب زمان؛ ستون آخر روز وقوع است
+    "occurrences.upcoming": f'''
+        SELECT {JOIN_LIST_COLUMNS}, occurrences.day_num FROM occurrences JOIN events ON events.id = occurrences.event_id
+        WHERE occurrences.day_num BETWEEN ? AND ?
+              AND (occurrences.day_num > ? OR occurrences.minute IS NULL OR occurrences.minute >= ?)
+        ORDER BY occurrences.day_num, occurrences.minute, occurrences.event_id
+    ''',
+    # وقوع‌های ساعت‌دار یک بازه (event_id، روز) و سطر رویدادهایشان با یک فهرست JSON از idها
+    "occurrences.range": '''
+        SELECT event_id, day_num FROM occurrences
+        WHERE day_num BETWEEN ? AND ? AND minute IS NOT NULL
+    ''',
+    "occurrences.events": f'''
+        SELECT {SLOT_COLUMNS} FROM events WHERE id IN (SELECT value FROM json_each(?))
+    ''',
+    "search": _SEARCH.format(columns=JOIN_LIST_COLUMNS),
+    "search.full": _SEARCH.format(columns=JOIN_FULL_COLUMNS),
+}
+
+# نام هر پرس‌وجو از روی متن آن، برای پروفایل
+QUERY_NAMES = {sql: name for name, sql in QUERIES.items()}
+
+# پیمایش events مشکل است، چه روی جدول و چه روی یک ایندکس غیرپوشا (SCAN events USING INDEX هم همه سطرها را
+# یکی‌یکی از جدول می‌خواند)؛ فقط SEARCH و پیمایش ایندکس پوشا پذیرفته می‌شوند
+_FULL_SCAN = re.compile(r"\bSCAN (TABLE )?events\b(?! USING COVERING INDEX)")
+
+# پرس‌وجوهایی که عمداً همه سطرها را (به ترتیب ایندکس) می‌خوانند
+FULL_READS = frozenset({"load_events.all", "type_counts"})
+
+
+def check_query_plans(conn, queries=QUERIES, full_reads=FULL_READS):
+    # برای هر پرس‌وجو که کل جدول را پیمایش کند، طرح اجرای آن برگردانده می‌شود
+    problems = {}
+    for name, sql in queries.items():
+        if name in full_reads:
+            continue
+        params = (None,) * sql.count("?")
+        plan = [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params)]
+        if any(_FULL_SCAN.search(detail) for detail in plan):
+            problems[name] = plan
+    return problems
+
+
+if __name__ == "__main__":
+    # python event_db.py [events.db] [--rebuild-search] : مهاجرت و بررسی طرح اجرای پرس‌وجوها
+    paths = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    conn = connect(paths[0] if paths else DB_PATH)
+    if "--rebuild-search" in sys.argv:
+        rebuild_search_index(conn)
+        conn.commit()
+    # پرس‌وجوهای صفحه‌بندی نمای «همه» در event_store ساخته می‌شوند
+    from event_store import EventStore
+
+    queries = dict(QUERIES)
+    queries.update(EventStore(conn).all_pages().queries())
+    problems = check_query_plans(conn, queries)
+    for name, plan in problems.items():
+        print(f"{name}: {' | '.join(plan)}")
+    conn.close()
+    sys.exit(1 if problems else 0)
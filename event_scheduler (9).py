@@ -1,107 +1,143 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
-import sqlite3
-from datetime import datetime, timedelta
-import re
-import jdatetime
+from datetime import datetime
+from time import perf_counter
+import bisect
+import jalali_calendar
+import event_db
+import profiling
+from event_store import EventStore, ListSource, Occurrence, EVENT_TYPES, WEEKDAYS, RELOADED, is_future_task, weekly_slot, weekly_sort_key, validate_time, validate_end_time, FREE_SLOT_LIMIT
+from conflicts import to_minute, format_minute
+from virtual_tree import VirtualTreeview
+from clock import Clock, format_time
+from reminders import ReminderScheduler
+from db_worker import DBWorker
 
 class EventSchedulerApp:
-    def __init__(self, root):
+    # اگر پنجره تا این مدت (میلی‌ثانیه) نقاشی نشود (مثلاً کوچک‌شده باز شده باشد)، شروع بدون انتظار ادامه می‌یابد
+    STARTUP_FALLBACK = 500
+    
+    def __init__(self, root, snapshot=False):
         self.root = root
         self.root.title("برنامه‌ریز رویداد")
         self.root.geometry("1200x800")
-        
-        # اتصال به پایگاه داده
-        self.conn = sqlite3.connect("events.db")
-        self.create_table()
+        self.snapshot = snapshot
         
         # لیست دسته‌بندی رویدادها
-        self.event_types = ["امتحان", "تمرین", "کلاس", "جلسه", "تحقیق", "ارائه", "سایر"]
+        self.event_types = EVENT_TYPES
         
         # روزهای هفته
-        self.weekdays = ["شنبه", "یکشنبه", "دوشنبه", "سه‌شنبه", "چهارشنبه", "پنج‌شنبه", "جمعه"]
-        
-        # تاریخ و زمان فعلی سیستم
-        self.update_current_datetime()
+        self.weekdays = WEEKDAYS
         
-        # حالت نمایش: 0=نزدیک‌ترین، 1=آینده، 2=همه، 3=جدول هفتگی
+        # حالت نمایش: 0=نزدیک‌ترین، 1=آینده، 2=همه، 3=جدول هفتگی، 4=نتایج جستجوی متن
         self.display_mode = 0
-        
-        # رابط کاربری
+        self.list_mode = None
+        self.search_text = ""
+        self.search_type = None
+        
+        # زمان (perf_counter) مراحل شروع: paint اولین نقاشی پنجره، interactive نمایش اولین نما
+        self.startup_times = {}
+        self.started = False
+        self.reminders = None
+        
+        # داده نماهای کارها و جدول هفتگی؛ تا اولین بارگذاری (finish_startup) None می‌مانند
+        self.task_keys = None
+        self.week = None
+        # وقوعی که نمای «نزدیک‌ترین» نشان می‌دهد (هدف ویرایش و حذف در آن نما)
+        self.nearest = None
+        
+        # رابط کاربری؛ پنجره خالی اول نقاشی می‌شود و اتصال پایگاه داده، ساعت و نماها در start ساخته می‌شوند
         self.create_gui()
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.root.bind("<Expose>", self.on_first_expose)
+        self._startup_job = self.root.after(self.STARTUP_FALLBACK, self.start)
+    
+    def mark_startup(self, name):
+        self.startup_times.setdefault(name, perf_counter())
+    
+    def on_first_expose(self, event):
+        # نقاشی‌های در صف همین‌جا انجام می‌شوند تا پنجره پیش از کارهای کندتر start دیده شود
+        self.root.unbind("<Expose>")
+        self.root.update_idletasks()
+        self.mark_startup("paint")
+        self.start()
+    
+    def start(self):
+        if self.started:
+            return
+        self.started = True
+        self.root.after_cancel(self._startup_job)
+        
+        # اتصال به پایگاه داده
+        self.store = EventStore.open(event_db.DB_PATH)
+        if self.snapshot:
+            # نمایه ستونی در حافظه برای نصب‌های پرخواندن؛ باید پیش از شنونده‌های دیگر ساخته شود
+            self.store.enable_snapshot()
+        self.store.subscribe(self.on_event_changed)
+        
+        # پرس‌وجوهای سنگین نماها در رشته جداگانه با اتصال خودش اجرا می‌شوند تا پنجره قفل نشود
+        self.db = DBWorker(self.root, lambda: EventStore.open(event_db.DB_PATH, snapshot=self.store.snapshot))
         
-        # به‌روزرسانی تاریخ و ساعت
-        self.update_current_time()
+        # تاریخ و زمان فعلی سیستم و به‌روزرسانی ساعت
+        self.clock = Clock(self.root, self.update_current_time)
+        self.update_current_datetime()
+        self.clock.start()
+        
+        # checkpoint دوره‌ای فایل WAL و بستن مرتب پایگاه داده هنگام بستن پنجره
+        self._checkpoint_job = self.root.after(event_db.CHECKPOINT_INTERVAL, self.checkpoint)
         
-        # نمایش اولیه: نزدیک‌ترین رویداد
+        # نمایش اولیه: نزدیک‌ترین رویداد؛ بقیه بعد از رسیدن نتیجه آن (finish_startup)
         self.load_events()
+    
+    def finish_startup(self):
+        # بعد از نمایش اولین نما: یادآوری‌ها و نماهای دیگر در پس‌زمینه
+        if self.reminders is not None:
+            return
+        self.root.after_idle(self.mark_startup, "interactive")
+        
+        # یادآوری‌ها: فقط یک تایمر برای زودترین یادآوری، بعد از هر تغییر دوباره تنظیم می‌شود؛ وقوع‌ها در رشته کارگر خوانده می‌شوند
+        self.reminders = ReminderScheduler(self.store, self.show_reminders, self.root,
+                                           submit=lambda func, callback: self.db.submit("reminders", func, callback))
+        self.reminders.start()
         self.load_future_tasks()
         self.load_weekly_schedule()
     
-    def create_table(self):
-        cursor = self.conn.cursor()
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS events (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                title TEXT NOT NULL,
-                event_type TEXT NOT NULL,
-                date TEXT,
-                time TEXT,
-                description TEXT,
-                is_recurring INTEGER DEFAULT 0,
-                recurring_day INTEGER DEFAULT -1,
-                end_date TEXT
-            )
-        ''')
-        self.conn.commit()
-    
-    def update_current_datetime(self):
-        self.current_datetime = datetime.now()
-        self.current_jalali = jdatetime.datetime.fromgregorian(date=self.current_datetime)
+    def update_current_datetime(self, now=None):
+        # تاریخ شمسی و متن روز فقط با عوض شدن روز دوباره ساخته می‌شوند؛ در این حالت True برمی‌گردد
+        self.current_datetime = now or datetime.now()
+        if not self.clock.update(self.current_datetime):
+            return False
+        self.current_jalali = self.clock.jalali
+        self.current_day_text = (f"تاریخ و ساعت فعلی: {self.current_jalali.replace('-', '/')} ",
+                                 f" - {self.weekdays[self.clock.weekday]}")
+        return True
     
     def get_weekday_name(self, jalali_date_str):
-        year, month, day = map(int, jalali_date_str.split("-"))
-        jalali_date = jdatetime.date(year, month, day)
-        weekday_num = jalali_date.weekday()
-        return self.weekdays[weekday_num]
+        return self.weekdays[jalali_calendar.jalali_weekday(jalali_date_str)]
     
     def get_jalali_weekday_num(self, jalali_date_str):
-        year, month, day = map(int, jalali_date_str.split("-"))
-        jalali_date = jdatetime.date(year, month, day)
-        return jalali_date.weekday()
+        return jalali_calendar.jalali_weekday(jalali_date_str)
     
     def validate_jalali_date(self, date_str):
-        pattern = r"^\d{4}-\d{2}-\d{2}$"
-        if not re.match(pattern, date_str):
-            return False
-        try:
-            year, month, day = map(int, date_str.split("-"))
-            jdatetime.date(year, month, day)
-            return True
-        except ValueError:
-            return False
+        return jalali_calendar.validate_jalali_date(date_str)
     
     def validate_time(self, time_str):
-        if not time_str:
-            return True
-        pattern = r"^\d{2}:\d{2}$"
-        if not re.match(pattern, time_str):
-            return False
-        try:
-            datetime.strptime(time_str, "%H:%M")
-            return True
-        except ValueError:
-            return False
+        return validate_time(time_str)
+    
+    def get_time_text(self, event):
+        if not event.time:
+            return "بدون زمان"
+        return f"{event.time} تا {event.end_time}" if event.end_time else event.time
+    
+    def get_description_text(self, event):
+        # ستون توضیحات فهرست‌ها فقط پیش‌نمایش است (سطرهای اعلان تغییر متن کامل را دارند)
+        return (event.description or "")[:event_db.DESCRIPTION_PREVIEW]
     
     def jalali_to_gregorian(self, jalali_date):
-        year, month, day = map(int, jalali_date.split("-"))
-        gregorian_date = jdatetime.date(year, month, day).togregorian()
-        return gregorian_date.strftime("%Y-%m-%d")
+        return jalali_calendar.jalali_to_gregorian(jalali_date)
     
     def gregorian_to_jalali(self, gregorian_date):
-        gregorian = datetime.strptime(gregorian_date, "%Y-%m-%d")
-        jalali = jdatetime.date.fromgregorian(date=gregorian)
-        return jalali.strftime("%Y-%m-%d")
+        return jalali_calendar.gregorian_to_jalali(gregorian_date)
     
     def create_gui(self):
         # نمایش تاریخ و ساعت فعلی
@@ -147,11 +183,17 @@ class EventSchedulerApp:
         self.time_entry = ttk.Entry(add_frame, width=25)
         self.time_entry.grid(row=4, column=1, padx=5, pady=5)
         
-        ttk.Label(add_frame, text="توضیحات:").grid(row=5, column=0, padx=5, pady=5, sticky="w")
+        ttk.Label(add_frame, text="ساعت پایان (HH:MM، اختیاری):").grid(row=5, column=0, padx=5, pady=5, sticky="w")
+        self.end_time_entry = ttk.Entry(add_frame, width=25)
+        self.end_time_entry.grid(row=5, column=1, padx=5, pady=5)
+        
+        ttk.Label(add_frame, text="توضیحات:").grid(row=6, column=0, padx=5, pady=5, sticky="w")
         self.desc_entry = ttk.Entry(add_frame, width=25)
-        self.desc_entry.grid(row=5, column=1, padx=5, pady=5)
+        self.desc_entry.grid(row=6, column=1, padx=5, pady=5)
         
-        ttk.Button(add_frame, text="افزودن رویداد", command=self.add_event).grid(row=6, column=0, columnspan=2, pady=10)
+        ttk.Button(add_frame, text="افزودن رویداد", command=self.add_event).grid(row=7, column=0, columnspan=2, pady=10)
+        ttk.Button(add_frame, text="ورود از فایل (CSV / ICS)", command=self.import_events).grid(row=8, column=0, pady=5)
+        ttk.Button(add_frame, text="خروجی در فایل (CSV / ICS)", command=self.export_events).grid(row=8, column=1, pady=5)
         
         # دکمه‌های تغییر حالت نمایش
         mode_frame = ttk.Frame(self.root)
@@ -161,6 +203,8 @@ class EventSchedulerApp:
         ttk.Button(mode_frame, text="نمایش رویدادهای آینده", command=lambda: self.set_display_mode(1)).pack(side=tk.LEFT, padx=5)
         ttk.Button(mode_frame, text="نمایش همه رویدادها", command=lambda: self.set_display_mode(2)).pack(side=tk.LEFT, padx=5)
         ttk.Button(mode_frame, text="جدول برنامه هفتگی", command=lambda: self.set_display_mode(3)).pack(side=tk.LEFT, padx=5)
+        if profiling.enabled():
+            ttk.Button(mode_frame, text="پروفایل", command=self.open_profile_window).pack(side=tk.RIGHT, padx=5)
         
         # فریم برای نمایش رویدادها
         self.event_frame = ttk.LabelFrame(self.root, text="لیست رویدادها / نزدیک‌ترین رویداد")
@@ -179,6 +223,7 @@ class EventSchedulerApp:
         self.tree.heading("Time", text="ساعت")
         self.tree.heading("Description", text="توضیحات")
         self.tree.grid(row=1, column=0, padx=5, pady=5, sticky="nsew")
+        self.tree.bind("<<TreeviewSelect>>", lambda e: self.show_selected_description())
         
         # تنظیم عرض ستون‌ها
         self.tree.column("ID", width=50)
@@ -189,9 +234,11 @@ class EventSchedulerApp:
         self.tree.column("Description", width=200)
         
         # اسکرول‌بار
-        scrollbar = ttk.Scrollbar(self.event_frame, orient=tk.VERTICAL, command=self.tree.yview)
+        # اسکرول مجازی: فقط سطرهای قابل مشاهده ساخته می‌شوند؛ صفحه‌ها در رشته کارگر خوانده می‌شوند
+        scrollbar = ttk.Scrollbar(self.event_frame, orient=tk.VERTICAL)
         scrollbar.grid(row=1, column=1, sticky="ns")
-        self.tree.configure(yscrollcommand=scrollbar.set)
+        self.event_list = VirtualTreeview(self.tree, scrollbar, self.get_item_values, self.get_item_id,
+                                          submit=lambda func, callback: self.db.submit("page", lambda store: func(), callback))
         
         # دکمه‌های ویرایش و حذف
         button_frame = ttk.Frame(self.event_frame)
@@ -249,6 +296,17 @@ class EventSchedulerApp:
         
         ttk.Button(search_frame, text="جستجو", command=self.find_nearest_event).grid(row=1, column=0, columnspan=2, pady=5)
         
+        # جستجوی متن در عنوان و توضیحات (پیشوندی، به ترتیب امتیاز)
+        ttk.Label(search_frame, text="جستجوی متن:").grid(row=0, column=2, padx=5, pady=5)
+        self.search_text_entry = ttk.Entry(search_frame, width=30)
+        self.search_text_entry.grid(row=0, column=3, padx=5, pady=5)
+        self.search_text_entry.bind("<Return>", lambda e: self.search_events())
+        self.search_type_combo = ttk.Combobox(search_frame, values=["همه"] + self.event_types, width=10, state="readonly")
+        self.search_type_combo.grid(row=0, column=4, padx=5, pady=5)
+        self.search_type_combo.set("همه")
+        ttk.Button(search_frame, text="جستجوی متن", command=self.search_events).grid(row=1, column=2, columnspan=3, pady=5)
+        ttk.Button(search_frame, text="یافتن زمان آزاد", command=self.open_free_slot_window).grid(row=0, column=5, rowspan=2, padx=5, pady=5)
+        
         # تنظیم grid weights
         self.root.columnconfigure(0, weight=3)
         self.root.columnconfigure(1, weight=2)
@@ -260,11 +318,18 @@ class EventSchedulerApp:
         tasks_frame.rowconfigure(0, weight=1)
         add_frame.columnconfigure(1, weight=1)
     
-    def update_current_time(self):
-        self.update_current_datetime()
-        current_time_text = f"تاریخ و ساعت فعلی: {self.current_jalali.strftime('%Y/%m/%d %H:%M:%S')} - {self.get_weekday_name(self.current_jalali.strftime('%Y-%m-%d'))}"
-        self.current_time_label.config(text=current_time_text)
-        self.root.after(1000, self.update_current_time)
+    def update_current_time(self, now):
+        if self.update_current_datetime(now):
+            # روز عوض شده؛ افق وقوع‌ها در رشته کارگر جلو می‌رود (در پایگاه بزرگ کسری از ثانیه) و بعد از آن
+            # نماهای وابسته به امروز دوباره ساخته می‌شوند
+            self.db.submit("occurrences", lambda store: store.refresh_occurrences(now), self.on_day_changed)
+        prefix, suffix = self.current_day_text
+        self.current_time_label.config(text=prefix + format_time(now) + suffix)
+    
+    def on_day_changed(self, refreshed):
+        self.load_events()
+        self.load_future_tasks()
+        self.load_weekly_schedule()
     
     def set_display_mode(self, mode):
         self.display_mode = mode
@@ -287,6 +352,7 @@ class EventSchedulerApp:
         event_type = self.event_type_combo.get()
         jalali_date = self.date_entry.get().strip()
         time = self.time_entry.get().strip()
+        end_time = self.end_time_entry.get().strip()
         description = self.desc_entry.get().strip()
         is_recurring = self.recurring_var.get()
         recurring_day_str = self.recurring_day_combo.get()
@@ -317,24 +383,92 @@ class EventSchedulerApp:
         if time and not self.validate_time(time):
             messagebox.showerror("خطا", "فرمت ساعت نامعتبر است!")
             return
+        if not validate_end_time(time, end_time):
+            messagebox.showerror("خطا", "ساعت پایان باید بعد از ساعت شروع باشد!")
+            return
         
-        cursor = self.conn.cursor()
-        cursor.execute('''
-            INSERT INTO events (title, event_type, date, time, description, is_recurring, recurring_day, end_date)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (title, event_type, gregorian_date, time if time else None, description, int(is_recurring), recurring_day, gregorian_end_date))
-        self.conn.commit()
+        # بررسی هم‌پوشانی در رشته کارگر؛ ذخیره بعد از رسیدن نتیجه (و تأیید کاربر)
+        now = self.current_datetime
+        values = (title, event_type, gregorian_date, time, description, is_recurring, recurring_day,
+                  gregorian_end_date, end_time)
+        self.db.submit("conflicts", lambda store: store.conflicts(now, gregorian_date, time, end_time, is_recurring,
+                                                                  recurring_day, gregorian_end_date),
+                       lambda found: self.save_new_event(found, values))
+    
+    def save_new_event(self, found, values):
+        if found and not self.confirm_conflicts(found):
+            return
+        
+        self.store.add_event(*values)
         
         self.clear_entries()
-        self.load_events()
-        self.load_future_tasks()
-        self.load_weekly_schedule()
         messagebox.showinfo("موفقیت", "رویداد با موفقیت اضافه شد!")
     
+    def confirm_conflicts(self, found):
+        # هشدار هم‌پوشانی با رویدادهای دیگر؛ کاربر می‌تواند با این حال ذخیره کند
+        lines = []
+        for event in found[:10]:
+            date_text = f"تکراری ({self.weekdays[event.recurring_day]})" if event.is_recurring else self.gregorian_to_jalali(event.date)
+            lines.append(f"{event.title} ({event.event_type}) - {date_text} - {self.get_time_text(event)}")
+        if len(found) > len(lines):
+            lines.append("...")
+        return messagebox.askyesno("هم‌پوشانی زمانی",
+                                   f"این رویداد با {len(found)} رویداد دیگر هم‌زمان است:\n" + "\n".join(lines)
+                                   + "\n\nبا این حال ذخیره شود؟")
+    
+    def import_events(self):
+        # ماژول‌های ورود و خروج فایل فقط هنگام استفاده بار می‌شوند
+        from tkinter import filedialog
+        import importer
+        
+        path = filedialog.askopenfilename(title="ورود رویدادها",
+                                          filetypes=[("CSV / iCalendar", "*.csv *.ics"), ("CSV", "*.csv"), ("iCalendar", "*.ics")])
+        if not path:
+            return
+        
+        def show_progress(count):
+            self.nearest_label.config(text=f"در حال ورود رویدادها: {count}")
+            self.root.update_idletasks()
+        
+        # همه سطرها در یک تراکنش؛ نماها فقط یک بار در پایان (با اعلان RELOADED) دوباره ساخته می‌شوند
+        try:
+            report = importer.import_file(self.store, path, progress=show_progress)
+        except (OSError, ValueError) as error:
+            self.nearest_label.config(text="")
+            messagebox.showerror("خطا", f"ورود فایل ناموفق بود:\n{error}")
+            return
+        
+        message = f"{report.imported} رویداد وارد شد."
+        if report.errors:
+            lines = [f"خط {line}: {text}" for line, text in report.errors[:20]]
+            if len(report.errors) > len(lines):
+                lines.append("...")
+            messagebox.showwarning("نتیجه ورود", f"{message}\n{len(report.errors)} سطر نامعتبر:\n" + "\n".join(lines))
+        else:
+            messagebox.showinfo("نتیجه ورود", message)
+    
+    def export_events(self):
+        from tkinter import filedialog
+        import exporter
+        
+        path = filedialog.asksaveasfilename(title="خروجی رویدادها", defaultextension=".ics",
+                                            filetypes=[("iCalendar", "*.ics"), ("CSV", "*.csv")])
+        if not path:
+            return
+        fmt = "csv" if path.lower().endswith(".csv") else "ics"
+        try:
+            with open(path, "w", encoding="utf-8", newline="") as out:
+                count = exporter.export_events(self.store.conn, out, fmt)
+        except OSError as error:
+            messagebox.showerror("خطا", f"نوشتن فایل ناموفق بود:\n{error}")
+            return
+        messagebox.showinfo("موفقیت", f"{count} رویداد در فایل نوشته شد.")
+    
     def clear_entries(self):
         self.title_entry.delete(0, tk.END)
         self.date_entry.delete(0, tk.END)
         self.time_entry.delete(0, tk.END)
+        self.end_time_entry.delete(0, tk.END)
         self.desc_entry.delete(0, tk.END)
         self.end_date_entry.delete(0, tk.END)
         self.event_type_combo.set("سایر")
@@ -344,201 +478,241 @@ class EventSchedulerApp:
         self.end_date_entry.config(state="disabled")
     
     def load_events(self):
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-        self.nearest_label.config(text="")
-        
-        cursor = self.conn.cursor()
-        events = []
+        # اگر حالت نمایش عوض نشده باشد، جای اسکرول حفظ می‌شود
+        keep_position = self.list_mode == self.display_mode
+        self.list_mode = self.display_mode
+        now = self.current_datetime
         
+        # پرس‌وجو در رشته کارگر؛ با عوض شدن سریع حالت فقط نتیجه آخرین درخواست نمایش داده می‌شود
         if self.display_mode == 0:  # نزدیک‌ترین
-            nearest_event = self.get_nearest_event()
-            if nearest_event:
-                self.display_nearest_event(nearest_event)
-            else:
-                self.nearest_label.config(text="هیچ رویدادی در آینده یافت نشد!")
-            return
-        
+            # تا رسیدن نتیجه تازه ویرایش و حذف به وقوع قبلی (که شاید همین حالا حذف شده) نمی‌رسند
+            self.nearest = None
+            self.db.submit("events", lambda store: self.nearest_details(store, now), self.show_nearest_event)
         elif self.display_mode == 1:  # آینده
-            # رویدادهای یک‌باره
-            cursor.execute('''
-                SELECT * FROM events 
-                WHERE is_recurring = 0 AND date >= ? OR (date = ? AND (time >= ? OR time IS NULL))
-                ORDER BY date, time
-            ''', (self.current_datetime.strftime("%Y-%m-%d"),
-                  self.current_datetime.strftime("%Y-%m-%d"),
-                  self.current_datetime.strftime("%H:%M")))
-            single_events = cursor.fetchall()
-            
-            # رویدادهای تکراری در آینده
-            recurring_events = self.get_future_recurring_events()
-            
-            events = single_events + recurring_events
+            # وقوع‌های یک‌باره و تکراری در آینده به ترتیب زمان
+            self.db.submit("events", lambda store: store.future_events(now),
+                           lambda rows: self.show_event_list(ListSource(lambda: rows), keep_position))
         elif self.display_mode == 2:  # همه
-            cursor.execute('''
-                SELECT * FROM events ORDER BY 
-                CASE WHEN is_recurring = 1 THEN 0 ELSE 1 END, date, time
-            ''')
-            all_events = cursor.fetchall()
-            
-            # برای تکراری‌ها، فقط الگو نمایش بده
-            events = all_events
+            # برای تکراری‌ها، فقط الگو نمایش بده؛ شمارش سطرها و صفحه‌ها (keyset روی ایندکس) در رشته کارگر
+            self.db.submit("events", self.load_all_pages, lambda pages: self.show_event_list(pages, keep_position))
         elif self.display_mode == 3:  # جدول هفتگی
-            return  # جداگانه لود می‌شود
-        
-        for row in events:
-            if row[6] == 1:  # تکراری
-                jalali_date = f"هر {self.weekdays[row[7]]}"
-                date_with_day = f"تکراری ({self.weekdays[row[7]]})"
-            else:
-                jalali_date = self.gregorian_to_jalali(row[3]) if row[3] else ""
-                date_with_day = f"{jalali_date} ({self.get_weekday_name(jalali_date)})" if jalali_date else ""
-            display_time = row[4] if row[4] else "بدون زمان"
-            self.tree.insert("", tk.END, values=(row[0], row[1], row[2], date_with_day, display_time, row[5] or ""))
+            self.db.cancel("events")
+            self.nearest_label.config(text="")
+            self.event_list.clear()  # جداگانه لود می‌شود
+            self.finish_startup()
+        elif self.display_mode == 4:  # نتایج جستجوی متن
+            text, event_type = self.search_text, self.search_type
+            self.db.submit("events", lambda store: store.search(text, event_type),
+                           lambda rows: self.show_search_results(rows, keep_position))
+    
+    def load_all_pages(self, store):
+        # در رشته کارگر: منبع صفحه‌بندی روی اتصال همین رشته با شمارش بخش‌ها؛ بعد از این هم فقط در آن خوانده می‌شود
+        pages = store.all_pages()
+        pages.segment_counts()
+        return pages
+    
+    def nearest_details(self, store, start):
+        # در رشته کارگر: نزدیک‌ترین وقوع از start و متن کامل توضیحات آن
+        occurrence = store.nearest_event(start)
+        return occurrence, store.get_description(occurrence.event.id) if occurrence else None
+    
+    def show_nearest_event(self, details):
+        nearest_event, description = details
+        self.nearest = nearest_event
+        self.event_list.clear()
+        if nearest_event:
+            self.display_nearest_event(nearest_event, description)
+        else:
+            self.nearest_label.config(text="هیچ رویدادی در آینده یافت نشد!")
+        self.finish_startup()
+    
+    def show_event_list(self, source, keep_position):
+        self.nearest_label.config(text="")
+        self.event_list.set_source(source, keep_position)
+        self.finish_startup()
+    
+    def show_search_results(self, rows, keep_position):
+        self.show_event_list(ListSource(lambda: rows), keep_position)
+        if not rows:
+            self.nearest_label.config(text=f"نتیجه‌ای برای «{self.search_text}» یافت نشد!")
+    
+    def search_events(self):
+        text = self.search_text_entry.get().strip()
+        if not text:
+            messagebox.showerror("خطا", "لطفاً متن جستجو را وارد کنید!")
+            return
+        self.search_text = text
+        self.search_type = None if self.search_type_combo.get() == "همه" else self.search_type_combo.get()
+        # جستجوی تازه از ابتدای فهرست نتایج نمایش داده می‌شود
+        self.list_mode = None
+        self.set_display_mode(4)
     
     def get_nearest_event(self):
-        cursor = self.conn.cursor()
-        # یک‌باره
-        cursor.execute('''
-            SELECT * FROM events 
-            WHERE is_recurring = 0 AND (date > ? OR (date = ? AND time > ?))
-            ORDER BY date, time LIMIT 1
-        ''', (self.current_datetime.strftime("%Y-%m-%d"),
-              self.current_datetime.strftime("%Y-%m-%d"),
-              self.current_datetime.strftime("%H:%M")))
-        single = cursor.fetchone()
-        
-        # تکراری
-        cursor.execute('''
-            SELECT * FROM events 
-            WHERE is_recurring = 1 AND (end_date IS NULL OR end_date >= ?) 
-            AND recurring_day = ? 
-            ORDER BY recurring_day LIMIT 1
-        ''', (self.current_datetime.strftime("%Y-%m-%d"),
-              self.get_jalali_weekday_num(self.current_jalali.strftime("%Y-%m-%d"))))
-        recurring = cursor.fetchone()
-        
-        # مقایسه و انتخاب نزدیک‌ترین
-        candidates = [single] if single else []
-        if recurring:
-            candidates.append(recurring)
-        if not candidates:
-            return None
-        # ساده: اولین را برگردان
-        return candidates[0]
-    
-    def display_nearest_event(self, event):
-        if not event:
+        # همان وقوعی که نمایش داده شده؛ پرس‌وجو دوباره در رشته Tk اجرا نمی‌شود
+        return self.nearest
+    
+    def display_nearest_event(self, occurrence, description):
+        if not occurrence:
             return
-        if event[6] == 1:  # تکراری
-            day_name = self.weekdays[event[7]]
-            date_text = f"هر {day_name}"
-            time_text = f"{event[4]} " if event[4] else "بدون زمان "
-        else:
-            jalali_date = self.gregorian_to_jalali(event[3])
-            date_with_day = f"{jalali_date} ({self.get_weekday_name(jalali_date)})"
-            time_text = f"{event[4]} " if event[4] else "بدون زمان "
-            date_text = date_with_day
-        self.nearest_label.config(text=f"نزدیک‌ترین رویداد:\nعنوان: {event[1]}\nنوع: {event[2]}\nتاریخ: {date_text}\nساعت: {time_text}\nتوضیحات: {event[5] or 'بدون توضیحات'}")
-    
-    def get_future_recurring_events(self):
-        cursor = self.conn.cursor()
-        cursor.execute('''
-            SELECT * FROM events 
-            WHERE is_recurring = 1 AND (end_date IS NULL OR end_date >= ?)
-            ORDER BY recurring_day
-        ''', (self.current_datetime.strftime("%Y-%m-%d"),))
-        return cursor.fetchall()
+        event = occurrence.event
+        date_text = self.get_occurrence_date_text(occurrence)
+        time_text = self.get_time_text(event)
+        self.nearest_label.config(text=f"نزدیک‌ترین رویداد:\nعنوان: {event.title}\nنوع: {event.event_type}\nتاریخ: {date_text}\nساعت: {time_text}\nتوضیحات: {description or 'بدون توضیحات'}")
+    
+    def show_selected_description(self):
+        # متن کامل توضیحات سطر انتخاب‌شده فقط هنگام انتخاب خوانده می‌شود
+        selected = self.tree.selection()
+        if self.display_mode == 0 or len(selected) != 1:
+            return
+        event_id = self.tree.item(selected[0])["values"][0]
+        self.db.submit("description", lambda store: store.get_description(event_id), self.show_description)
+    
+    def show_description(self, description):
+        # نمای «نزدیک‌ترین» از همین برچسب استفاده می‌کند
+        if self.display_mode == 0:
+            return
+        self.nearest_label.config(text=f"توضیحات: {description}" if description else "")
+    
+    def show_reminders(self, occurrences):
+        lines = []
+        for occurrence in occurrences:
+            event = occurrence.event
+            lines.append(f"{event.title} ({event.event_type}) - {self.get_occurrence_date_text(occurrence)} - {self.get_time_text(event)}")
+        messagebox.showinfo("یادآوری", "\n".join(lines))
+    
+    def get_occurrence_date_text(self, occurrence):
+        jalali_date = jalali_calendar.format_date(*jalali_calendar.date_to_jalali(occurrence.date))
+        date_text = f"{jalali_date} ({self.weekdays[jalali_calendar.weekday(occurrence.date.toordinal())]})"
+        if occurrence.event.is_recurring == 1:
+            date_text += " - تکراری"
+        return date_text
     
     def load_future_tasks(self):
+        now = self.current_datetime
+        self.db.submit("tasks", lambda store: store.future_tasks(now), self.show_future_tasks)
+    
+    def show_future_tasks(self, tasks):
         for item in self.tasks_tree.get_children():
             self.tasks_tree.delete(item)
         
-        cursor = self.conn.cursor()
-        cursor.execute('''
-            SELECT * FROM events 
-            WHERE time IS NULL AND is_recurring = 0 AND date >= ?
-            ORDER BY date
-        ''', (self.current_datetime.strftime("%Y-%m-%d"),))
-        tasks = cursor.fetchall()
-        
-        for row in tasks:
-            jalali_date = self.gregorian_to_jalali(row[3])
-            date_with_day = f"{jalali_date} ({self.get_weekday_name(jalali_date)})"
-            self.tasks_tree.insert("", tk.END, values=(row[0], row[1], row[2], date_with_day, row[5] or ""))
+        # کلیدهای مرتب (تاریخ، شناسه) برای پیدا کردن جای درج در به‌روزرسانی افزایشی
+        self.task_keys = [(row.date, row.id) for row in tasks]
+        with profiling.timer("convert", "tasks"):
+            values = [self.get_task_values(row) for row in tasks]
+        with profiling.timer("render", "tasks"):
+            for row, row_values in zip(tasks, values):
+                self.tasks_tree.insert("", tk.END, iid=str(row.id), values=row_values)
+    
+    def get_task_values(self, row):
+        jalali_date = self.gregorian_to_jalali(row.date)
+        date_with_day = f"{jalali_date} ({self.get_weekday_name(jalali_date)})"
+        return (row.id, row.title, row.event_type, date_with_day, self.get_description_text(row))
+    
+    def patch_future_tasks(self, change):
+        iid = str(change.event_id)
+        if self.tasks_tree.exists(iid):
+            self.tasks_tree.delete(iid)
+            del self.task_keys[bisect.bisect_left(self.task_keys, (change.old.date, change.event_id))]
+        
+        row = change.new
+        if row is not None and is_future_task(row, self.current_datetime):
+            key = (row.date, row.id)
+            index = bisect.bisect_left(self.task_keys, key)
+            self.task_keys.insert(index, key)
+            self.tasks_tree.insert("", index, iid=iid, values=self.get_task_values(row))
     
     def load_weekly_schedule(self):
-        for item in self.schedule_tree.get_children():
-            self.schedule_tree.delete(item)
-        
-        # پاک کردن تگ‌ها
-        for tag in self.schedule_tree.get_tags():
-            self.schedule_tree.tag_configure(tag, foreground='black')
-        
-        # رویدادهای تکراری (الگو هفتگی)
-        cursor = self.conn.cursor()
-        cursor.execute('''
-            SELECT * FROM events 
-            WHERE is_recurring = 1 AND (end_date IS NULL OR end_date >= ?)
-        ''', (self.current_datetime.strftime("%Y-%m-%d"),))
-        recurring_events = cursor.fetchall()
-        
-        # رویدادهای یک‌باره در هفته جاری
-        current_greg_date = self.current_datetime.strftime("%Y-%m-%d")
-        start_of_week = (self.current_datetime - timedelta(days=self.current_datetime.weekday())).strftime("%Y-%m-%d")
-        end_of_week = (self.current_datetime + timedelta(days=6 - self.current_datetime.weekday())).strftime("%Y-%m-%d")
-        
-        cursor.execute('''
-            SELECT * FROM events 
-            WHERE is_recurring = 0 AND date >= ? AND date <= ?
-        ''', (start_of_week, end_of_week))
-        single_events_this_week = cursor.fetchall()
-        
-        # برای هر روز هفته
-        for day_idx, day_name in enumerate(self.weekdays):
-            day_events = []
-            
-            # رویدادهای تکراری برای این روز
-            for event in recurring_events:
-                if event[7] == day_idx:  # recurring_day
-                    event_text = f"{event[1]} ({event[2]}) - {event[4] or 'بدون زمان'}"
-                    day_events.append((event_text, 'recurring'))  # آبی
-            
-            # رویدادهای یک‌باره برای این روز (محاسبه روز هفته)
-            for event in single_events_this_week:
-                event_greg_date = event[3]
-                event_jalali = self.gregorian_to_jalali(event_greg_date)
-                event_weekday = self.get_jalali_weekday_num(event_jalali)
-                if event_weekday == day_idx:
-                    event_text = f"{event[1]} ({event[2]}) - {event[4] or 'بدون زمان'}"
-                    day_events.append((event_text, 'single'))  # قرمز
-            
-            # اضافه به جدول
-            if day_events:
-                # چند سطر اگر چند رویداد
-                for i, (text, event_type) in enumerate(day_events):
-                    if i == 0:
-                        self.schedule_tree.insert("", tk.END, values=('',) * day_idx + (text,) + ('',) * (6 - day_idx))
-                        iid = self.schedule_tree.get_children()[-1]
-                        if event_type == 'single':
-                            self.schedule_tree.set(iid, day_name, text)
-                            self.schedule_tree.item(iid, tags=('single',))
-                        else:
-                            self.schedule_tree.item(iid, tags=('recurring',))
-                    else:
-                        self.schedule_tree.insert("", tk.END, values=('',) * day_idx + (text,) + ('',) * (6 - day_idx))
-                        iid = self.schedule_tree.get_children()[-1]
-                        if event_type == 'single':
-                            self.schedule_tree.item(iid, tags=('single',))
-                        else:
-                            self.schedule_tree.item(iid, tags=('recurring',))
-            else:
-                self.schedule_tree.insert("", tk.END, values=('',) * day_idx + ('بدون رویداد',) + ('',) * (6 - day_idx))
+        # رویدادهای تکراری (الگو هفتگی) و یک‌باره‌های هفته جاری، به تفکیک روز
+        now = self.current_datetime
+        self.db.submit("weekly", lambda store: store.weekly_schedule(now), self.show_weekly_schedule)
+    
+    def show_weekly_schedule(self, week):
+        self.schedule_tree.delete(*self.schedule_tree.get_children())
+        
+        self.week = week
+        with profiling.timer("convert", "weekly"):
+            self.week_cells = [self.weekly_cells(day) for day in week]
+        self.week_items = []  # شناسه سطرهای جدول، به ترتیب
+        with profiling.timer("render", "weekly"):
+            self.render_weekly_rows(0)
         
         # رنگ‌بندی
         self.schedule_tree.tag_configure('recurring', foreground='blue', font=('Arial', 9, 'bold'))
         self.schedule_tree.tag_configure('single', foreground='red', font=('Arial', 9, 'bold'))
     
+    def weekly_cells(self, day):
+        # متن خانه‌های یک ستون روز به ترتیب سطر، با نوع هر خانه
+        if not day:
+            return [('بدون رویداد', None)]
+        return [(f"{event.title} ({event.event_type}) - {self.get_time_text(event)}", kind) for event, kind in day]
+    
+    def render_weekly_rows(self, first_row, last_row=None):
+        # سطر i جدول خانه i ام همه روزها را کنار هم دارد؛ سطرهای موجود با item به‌روز می‌شوند (شناسه‌ها ثابت می‌مانند)
+        # و سطرهای کم یا زیاد از انتهای جدول اضافه یا حذف می‌شوند
+        row_count = max(len(cells) for cells in self.week_cells)
+        if last_row is None or last_row > row_count:
+            last_row = row_count
+        for i in range(first_row, last_row):
+            row = [cells[i] if i < len(cells) else ('', None) for cells in self.week_cells]
+            kinds = {kind for _, kind in row if kind}
+            # برچسب رنگ فقط وقتی همه خانه‌های پر سطر از یک نوع باشند
+            tags = tuple(kinds) if len(kinds) == 1 else ()
+            values = [text for text, _ in row]
+            if i < len(self.week_items):
+                self.schedule_tree.item(self.week_items[i], values=values, tags=tags)
+            else:
+                self.week_items.append(self.schedule_tree.insert("", "end", values=values, tags=tags))
+        if len(self.week_items) > row_count:
+            self.schedule_tree.delete(*self.week_items[row_count:])
+            del self.week_items[row_count:]
+    
+    def patch_weekly_schedule(self, change):
+        changed_days = set()
+        for row in (change.old, change.new):
+            slot = weekly_slot(row, self.current_datetime) if row is not None else None
+            if slot is not None:
+                changed_days.add(slot[0])
+        if not changed_days:
+            return
+        
+        first_row = last_row = None
+        for day_idx in changed_days:
+            old_day = self.week[day_idx]
+            day = [entry for entry in old_day if entry[0].id != change.event_id]
+            slot = weekly_slot(change.new, self.current_datetime) if change.new is not None else None
+            if slot is not None and slot[0] == day_idx:
+                bisect.insort(day, (change.new, slot[1]), key=weekly_sort_key)
+            self.week[day_idx] = day
+            self.week_cells[day_idx] = self.weekly_cells(day)
+            # فقط از اولین خانه تغییرکرده به بعد در این ستون
+            changed = next((i for i, (a, b) in enumerate(zip(old_day, day)) if a is not b),
+                           min(len(old_day), len(day)))
+            first_row = changed if first_row is None else min(first_row, changed)
+            last_row = max(last_row or 0, len(old_day), len(day), 1)
+        self.render_weekly_rows(first_row, last_row)
+    
+    def on_event_changed(self, change):
+        # به‌جای بارگذاری دوباره هر سه نما، فقط سطرهای مربوط به این تغییر اصلاح می‌شوند
+        if change.kind == RELOADED:
+            self.load_events()
+            self.load_future_tasks()
+            self.load_weekly_schedule()
+            return
+        # اگر بارگذاری یک نما هنوز در راه است، نتیجه‌اش ممکن است قبل از این تغییر خوانده شده باشد؛ دوباره خوانده می‌شود
+        if self.display_mode == 2 and not self.db.busy("events"):
+            self.event_list.apply(change)
+        elif self.display_mode != 3:
+            self.load_events()  # نزدیک‌ترین، آینده و جستجو به قاعده‌های تکرار یا امتیاز بستگی دارند
+        # نمایی که هنوز بارگذاری نشده (پیش از finish_startup) اصلاح نمی‌شود؛ بارگذاری بعدی‌اش این تغییر را می‌خواند
+        if self.db.busy("tasks"):
+            self.load_future_tasks()
+        elif self.task_keys is not None:
+            self.patch_future_tasks(change)
+        if self.db.busy("weekly"):
+            self.load_weekly_schedule()
+        elif self.week is not None:
+            self.patch_weekly_schedule(change)
+    
     def edit_event(self):
         # مشابه قبل، اما با فیلدهای جدید
         selected_item = self.tree.selection()
@@ -550,7 +724,7 @@ class EventSchedulerApp:
             nearest = self.get_nearest_event()
             if not nearest:
                 return
-            event_id = nearest[0]
+            event_id = nearest.event.id
             item_values = self.get_item_values(nearest)
         else:
             item = self.tree.item(selected_item)
@@ -559,39 +733,54 @@ class EventSchedulerApp:
         
         self.open_edit_window(event_id, item_values)
     
+    def get_item_id(self, row):
+        # وقوع‌های یک رویداد تکراری شناسه یکسان دارند؛ تاریخ وقوع به iid اضافه می‌شود
+        if isinstance(row, Occurrence):
+            return f"{row.event.id}@{row.date.isoformat()}"
+        return str(row.id)
+    
     def get_item_values(self, row):
-        if row[6] == 1:
-            date_with_day = f"تکراری ({self.weekdays[row[7]]})"
-            time_text = row[4] if row[4] else "بدون زمان"
+        if isinstance(row, Occurrence):
+            event = row.event
+            time_text = self.get_time_text(event)
+            return (event.id, event.title, event.event_type, self.get_occurrence_date_text(row), time_text,
+                    self.get_description_text(event))
+        if row.is_recurring == 1:
+            date_with_day = f"تکراری ({self.weekdays[row.recurring_day]})"
+            time_text = self.get_time_text(row)
         else:
-            jalali_date = self.gregorian_to_jalali(row[3]) if row[3] else ""
+            jalali_date = self.gregorian_to_jalali(row.date) if row.date else ""
             date_with_day = f"{jalali_date} ({self.get_weekday_name(jalali_date)})" if jalali_date else ""
-            time_text = row[4] if row[4] else "بدون زمان"
-        return (row[0], row[1], row[2], date_with_day, time_text, row[5] or "")
+            time_text = self.get_time_text(row)
+        return (row.id, row.title, row.event_type, date_with_day, time_text, self.get_description_text(row))
     
     def open_edit_window(self, event_id, item_values):
-        # بارگیری رویداد از دیتابیس
-        cursor = self.conn.cursor()
-        cursor.execute("SELECT * FROM events WHERE id = ?", (event_id,))
-        event = cursor.fetchone()
+        # بارگیری رویداد از دیتابیس در رشته کارگر
+        self.db.submit("edit", lambda store: store.get_event(event_id), self.show_edit_window)
+    
+    def show_edit_window(self, event):
+        if event is None:
+            messagebox.showerror("خطا", "این رویداد دیگر وجود ندارد!")
+            return
+        event_id = event.id
         
         edit_window = tk.Toplevel(self.root)
         edit_window.title("ویرایش رویداد")
-        edit_window.geometry("450x450")
+        edit_window.geometry("450x490")
         
-        recurring_var = tk.BooleanVar(value=bool(event[6]))
+        recurring_var = tk.BooleanVar(value=bool(event.is_recurring))
         
         ttk.Checkbutton(edit_window, text="رویداد تکراری هفتگی", variable=recurring_var).grid(row=0, column=0, columnspan=2, pady=5)
         
         ttk.Label(edit_window, text="عنوان:").grid(row=1, column=0, padx=5, pady=5, sticky="w")
         title_entry = ttk.Entry(edit_window, width=30)
         title_entry.grid(row=1, column=1, padx=5, pady=5)
-        title_entry.insert(0, event[1])
+        title_entry.insert(0, event.title)
         
         ttk.Label(edit_window, text="نوع رویداد:").grid(row=2, column=0, padx=5, pady=5, sticky="w")
         event_type_combo = ttk.Combobox(edit_window, values=self.event_types, width=28)
         event_type_combo.grid(row=2, column=1, padx=5, pady=5)
-        event_type_combo.set(event[2])
+        event_type_combo.set(event.event_type)
         
         # فریم تاریخ
         date_frame = ttk.Frame(edit_window)
@@ -600,20 +789,20 @@ class EventSchedulerApp:
         ttk.Label(date_frame, text="تاریخ شمسی (YYYY-MM-DD):").pack(side=tk.LEFT, padx=5)
         date_entry = ttk.Entry(date_frame, width=15)
         date_entry.pack(side=tk.LEFT, padx=5)
-        if not event[6]:
-            date_entry.insert(0, self.gregorian_to_jalali(event[3]) if event[3] else "")
+        if not event.is_recurring:
+            date_entry.insert(0, self.gregorian_to_jalali(event.date) if event.date else "")
         
         recurring_day_combo = ttk.Combobox(date_frame, values=self.weekdays, width=10, state="readonly")
         recurring_day_combo.pack(side=tk.LEFT, padx=5)
-        if event[6]:
-            recurring_day_combo.set(self.weekdays[event[7]])
+        if event.is_recurring:
+            recurring_day_combo.set(self.weekdays[event.recurring_day])
             recurring_day_combo.config(state="readonly")
         
         ttk.Label(date_frame, text="تا تاریخ (اختیاری):").pack(side=tk.LEFT, padx=5)
         end_date_entry = ttk.Entry(date_frame, width=15)
         end_date_entry.pack(side=tk.LEFT, padx=5)
-        if event[6] and event[8]:
-            end_date_entry.insert(0, self.gregorian_to_jalali(event[8]))
+        if event.is_recurring and event.end_date:
+            end_date_entry.insert(0, self.gregorian_to_jalali(event.end_date))
         
         def toggle_recurring_edit():
             if recurring_var.get():
@@ -631,18 +820,24 @@ class EventSchedulerApp:
         ttk.Label(edit_window, text="ساعت (HH:MM، اختیاری):").grid(row=4, column=0, padx=5, pady=5, sticky="w")
         time_entry = ttk.Entry(edit_window, width=30)
         time_entry.grid(row=4, column=1, padx=5, pady=5)
-        time_entry.insert(0, event[4] or "")
+        time_entry.insert(0, event.time or "")
         
-        ttk.Label(edit_window, text="توضیحات:").grid(row=5, column=0, padx=5, pady=5, sticky="w")
+        ttk.Label(edit_window, text="ساعت پایان (HH:MM، اختیاری):").grid(row=5, column=0, padx=5, pady=5, sticky="w")
+        end_time_entry = ttk.Entry(edit_window, width=30)
+        end_time_entry.grid(row=5, column=1, padx=5, pady=5)
+        end_time_entry.insert(0, event.end_time or "")
+        
+        ttk.Label(edit_window, text="توضیحات:").grid(row=6, column=0, padx=5, pady=5, sticky="w")
         desc_entry = ttk.Entry(edit_window, width=30)
-        desc_entry.grid(row=5, column=1, padx=5, pady=5)
-        desc_entry.insert(0, event[5] or "")
+        desc_entry.grid(row=6, column=1, padx=5, pady=5)
+        desc_entry.insert(0, event.description or "")
         
         def save_changes():
             title = title_entry.get().strip()
             event_type = event_type_combo.get()
             jalali_date = date_entry.get().strip()
             time = time_entry.get().strip()
+            end_time = end_time_entry.get().strip()
             description = desc_entry.get().strip()
             is_recurring = recurring_var.get()
             
@@ -673,24 +868,178 @@ class EventSchedulerApp:
             if time and not self.validate_time(time):
                 messagebox.showerror("خطا", "فرمت ساعت نامعتبر!")
                 return
+            if not validate_end_time(time, end_time):
+                messagebox.showerror("خطا", "ساعت پایان باید بعد از ساعت شروع باشد!")
+                return
             
-            cursor = self.conn.cursor()
-            cursor.execute('''
-                UPDATE events 
-                SET title = ?, event_type = ?, date = ?, time = ?, description = ?, 
-                    is_recurring = ?, recurring_day = ?, end_date = ?
-                WHERE id = ?
-            ''', (title, event_type, greg_date, time if time else None, description, 
-                  int(is_recurring), recurring_day, greg_end, event_id))
-            self.conn.commit()
+            now = self.current_datetime
+            self.db.submit("conflicts", lambda store: store.conflicts(now, greg_date, time, end_time, is_recurring,
+                                                                      recurring_day, greg_end, exclude_id=event_id),
+                           lambda found: save_checked(found, (title, event_type, greg_date, time, description,
+                                                              is_recurring, recurring_day, greg_end, end_time)))
+        
+        def save_checked(found, values):
+            if not edit_window.winfo_exists():
+                return
+            if found and not self.confirm_conflicts(found):
+                return
+            
+            self.store.update_event(event_id, *values)
             
-            self.load_events()
-            self.load_future_tasks()
-            self.load_weekly_schedule()
             edit_window.destroy()
             messagebox.showinfo("موفقیت", "رویداد ویرایش شد!")
         
-        ttk.Button(edit_window, text="ذخیره تغییرات", command=save_changes).grid(row=6, column=0, columnspan=2, pady=10)
+        ttk.Button(edit_window, text="ذخیره تغییرات", command=save_changes).grid(row=7, column=0, columnspan=2, pady=10)
+    
+    def open_free_slot_window(self):
+        # زودترین فاصله‌های آزاد برای یک مدت مشخص در ساعت‌های کاری روزهای آینده
+        window = tk.Toplevel(self.root)
+        window.title("یافتن زمان آزاد")
+        window.geometry("520x560")
+        
+        ttk.Label(window, text="مدت (دقیقه):").grid(row=0, column=0, padx=5, pady=5, sticky="w")
+        duration_entry = ttk.Entry(window, width=10)
+        duration_entry.grid(row=0, column=1, padx=5, pady=5, sticky="w")
+        duration_entry.insert(0, "90")
+        
+        ttk.Label(window, text="ساعت کاری (HH:MM تا HH:MM):").grid(row=1, column=0, padx=5, pady=5, sticky="w")
+        hours_frame = ttk.Frame(window)
+        hours_frame.grid(row=1, column=1, padx=5, pady=5, sticky="w")
+        day_start_entry = ttk.Entry(hours_frame, width=7)
+        day_start_entry.pack(side=tk.LEFT)
+        day_start_entry.insert(0, "08:00")
+        ttk.Label(hours_frame, text="تا").pack(side=tk.LEFT, padx=5)
+        day_end_entry = ttk.Entry(hours_frame, width=7)
+        day_end_entry.pack(side=tk.LEFT)
+        day_end_entry.insert(0, "18:00")
+        
+        ttk.Label(window, text="تعداد روز از امروز:").grid(row=2, column=0, padx=5, pady=5, sticky="w")
+        days_entry = ttk.Entry(window, width=10)
+        days_entry.grid(row=2, column=1, padx=5, pady=5, sticky="w")
+        days_entry.insert(0, "14")
+        
+        # روزهای مجاز هفته؛ جمعه به‌طور پیش‌فرض کنار گذاشته می‌شود
+        weekday_frame = ttk.Frame(window)
+        weekday_frame.grid(row=3, column=0, columnspan=2, padx=5, pady=5)
+        weekday_vars = [tk.BooleanVar(value=day != 6) for day in range(len(self.weekdays))]
+        for day, name in enumerate(self.weekdays):
+            ttk.Checkbutton(weekday_frame, text=name, variable=weekday_vars[day]).pack(side=tk.LEFT)
+        
+        ttk.Label(window, text="نادیده گرفتن نوع‌ها:").grid(row=4, column=0, padx=5, pady=5, sticky="nw")
+        types_list = tk.Listbox(window, selectmode=tk.MULTIPLE, height=len(self.event_types), exportselection=False)
+        for event_type in self.event_types:
+            types_list.insert(tk.END, event_type)
+        types_list.grid(row=4, column=1, padx=5, pady=5, sticky="w")
+        
+        slots_tree = ttk.Treeview(window, columns=("Date", "Start", "End"), show="headings", height=8)
+        slots_tree.heading("Date", text="تاریخ")
+        slots_tree.heading("Start", text="از")
+        slots_tree.heading("End", text="تا")
+        slots_tree.column("Start", width=80)
+        slots_tree.column("End", width=80)
+        slots_tree.grid(row=6, column=0, columnspan=2, padx=5, pady=5, sticky="nsew")
+        
+        found = []
+        
+        def show_slots(slots):
+            if not window.winfo_exists():
+                return
+            found[:] = slots
+            slots_tree.delete(*slots_tree.get_children())
+            for index, slot in enumerate(slots):
+                jalali_date = jalali_calendar.format_date(*jalali_calendar.date_to_jalali(slot.date))
+                date_text = f"{jalali_date} ({self.weekdays[jalali_calendar.weekday(slot.date.toordinal())]})"
+                slots_tree.insert("", "end", iid=str(index),
+                                  values=(date_text, format_minute(slot.start), format_minute(slot.end)))
+            if not slots:
+                messagebox.showinfo("نتیجه", "زمان آزادی با این شرایط پیدا نشد!", parent=window)
+        
+        def find_slots():
+            day_start, day_end = day_start_entry.get().strip(), day_end_entry.get().strip()
+            if not day_start or not day_end or not self.validate_time(day_start) or not self.validate_time(day_end) \
+                    or day_end <= day_start:
+                messagebox.showerror("خطا", "ساعت کاری نامعتبر است!", parent=window)
+                return
+            if not duration_entry.get().strip().isdigit() or not days_entry.get().strip().isdigit():
+                messagebox.showerror("خطا", "مدت و تعداد روز باید عدد باشند!", parent=window)
+                return
+            duration, days = int(duration_entry.get()), int(days_entry.get())
+            weekdays = {day for day, var in enumerate(weekday_vars) if var.get()}
+            exclude_types = tuple(self.event_types[index] for index in types_list.curselection())
+            now = self.current_datetime
+            self.db.submit("free", lambda store: store.free_slots(
+                now, days, max(duration, 1), to_minute(day_start), to_minute(day_end), weekdays, exclude_types,
+                limit=FREE_SLOT_LIMIT), show_slots)
+        
+        def use_slot():
+            # زمان آزاد انتخاب‌شده (با همان مدت) در فرم افزودن رویداد
+            selected = slots_tree.selection()
+            if not selected:
+                messagebox.showerror("خطا", "یک زمان آزاد را انتخاب کنید!", parent=window)
+                return
+            slot = found[int(selected[0])]
+            duration = int(duration_entry.get()) if duration_entry.get().strip().isdigit() else slot.end - slot.start
+            self.recurring_var.set(False)
+            self.toggle_recurring()
+            self.date_entry.delete(0, tk.END)
+            self.date_entry.insert(0, jalali_calendar.format_date(*jalali_calendar.date_to_jalali(slot.date)))
+            self.time_entry.delete(0, tk.END)
+            self.time_entry.insert(0, format_minute(slot.start))
+            self.end_time_entry.delete(0, tk.END)
+            self.end_time_entry.insert(0, format_minute(min(slot.start + duration, slot.end, 23 * 60 + 59)))
+            window.destroy()
+        
+        buttons = ttk.Frame(window)
+        buttons.grid(row=5, column=0, columnspan=2, pady=5)
+        ttk.Button(buttons, text="جستجو", command=find_slots).pack(side=tk.LEFT, padx=5)
+        ttk.Button(buttons, text="استفاده در فرم افزودن", command=use_slot).pack(side=tk.LEFT, padx=5)
+        
+        window.columnconfigure(1, weight=1)
+        window.rowconfigure(6, weight=1)
+    
+    def open_profile_window(self):
+        # کندترین عملیات‌ها (بیشترین زمان کل) از زمان شروع یا آخرین صفر کردن؛ هر ثانیه به‌روز می‌شود
+        window = tk.Toplevel(self.root)
+        window.title("پروفایل")
+        window.geometry("900x500")
+        
+        columns = ("category", "name", "count", "total_ms", "mean_ms", "p99_ms", "max_ms", "rows")
+        stats_tree = ttk.Treeview(window, columns=columns, show="headings")
+        for column, text, width in zip(columns, ("دسته", "نام", "تعداد", "کل (ms)", "میانگین", "p99", "بیشینه", "سطرها"),
+                                       (70, 330, 60, 90, 80, 70, 80, 70)):
+            stats_tree.heading(column, text=text)
+            stats_tree.column(column, width=width)
+        stats_tree.grid(row=0, column=0, padx=5, pady=5, sticky="nsew")
+        
+        def refresh():
+            if not window.winfo_exists():
+                return
+            stats_tree.delete(*stats_tree.get_children())
+            for stat in profiling.profiler.snapshot():
+                stats_tree.insert("", "end", values=[stat[column] for column in columns])
+            window.after(1000, refresh)
+        
+        def save():
+            from tkinter import filedialog
+            
+            path = filedialog.asksaveasfilename(title="ذخیره پروفایل", defaultextension=".jsonl",
+                                                filetypes=[("JSON lines", "*.jsonl")], parent=window)
+            if not path:
+                return
+            try:
+                with open(path, "w", encoding="utf-8") as out:
+                    profiling.profiler.export(out)
+            except OSError as error:
+                messagebox.showerror("خطا", f"نوشتن فایل ناموفق بود:\n{error}", parent=window)
+        
+        buttons = ttk.Frame(window)
+        buttons.grid(row=1, column=0, pady=5)
+        ttk.Button(buttons, text="صفر کردن", command=profiling.profiler.reset).pack(side=tk.LEFT, padx=5)
+        ttk.Button(buttons, text="ذخیره (JSON lines)", command=save).pack(side=tk.LEFT, padx=5)
+        
+        window.columnconfigure(0, weight=1)
+        window.rowconfigure(0, weight=1)
+        refresh()
     
     def delete_event(self):
         selected_item = self.tree.selection()
@@ -702,18 +1051,13 @@ class EventSchedulerApp:
             nearest = self.get_nearest_event()
             if not nearest:
                 return
-            event_id = nearest[0]
+            event_id = nearest.event.id
         else:
             item = self.tree.item(selected_item)
             event_id = item["values"][0]
         
         if messagebox.askyesno("تأیید", "آیا مطمئن هستید؟"):
-            cursor = self.conn.cursor()
-            cursor.execute("DELETE FROM events WHERE id = ?", (event_id,))
-            self.conn.commit()
-            self.load_events()
-            self.load_future_tasks()
-            self.load_weekly_schedule()
+            self.store.delete_event(event_id)
             messagebox.showinfo("موفقیت", "رویداد حذف شد!")
     
     def find_nearest_event(self):
@@ -725,27 +1069,47 @@ class EventSchedulerApp:
         gregorian_search_date = self.jalali_to_gregorian(jalali_search_date)
         search_datetime = datetime.strptime(gregorian_search_date, "%Y-%m-%d")
         
-        cursor = self.conn.cursor()
-        cursor.execute('''
-            SELECT * FROM events 
-            WHERE is_recurring = 0 AND date >= ? 
-            ORDER BY date, time LIMIT 1
-        ''', (search_datetime.strftime("%Y-%m-%d"),))
-        nearest = cursor.fetchone()
-        
+        # اولین وقوع از ابتدای آن روز، در رشته کارگر
+        self.db.submit("find", lambda store: self.nearest_details(store, search_datetime), self.show_found_event)
+    
+    def show_found_event(self, details):
+        nearest, description = details
         if nearest:
-            jalali_date = self.gregorian_to_jalali(nearest[3])
-            date_with_day = f"{jalali_date} ({self.get_weekday_name(jalali_date)})"
-            time_text = f"{nearest[4]} " if nearest[4] else "بدون زمان "
+            event = nearest.event
+            date_with_day = self.get_occurrence_date_text(nearest)
+            time_text = self.get_time_text(event)
             messagebox.showinfo("نزدیک‌ترین رویداد", 
-                               f"عنوان: {nearest[1]}\nنوع: {nearest[2]}\nتاریخ: {date_with_day}\nساعت: {time_text}\nتوضیحات: {nearest[5] or 'بدون توضیحات'}")
+                               f"عنوان: {event.title}\nنوع: {event.event_type}\nتاریخ: {date_with_day}\nساعت: {time_text}\nتوضیحات: {description or 'بدون توضیحات'}")
         else:
             messagebox.showinfo("نتیجه", "هیچ رویدادی یافت نشد!")
     
-    def __del__(self):
-        self.conn.close()
+    def checkpoint(self):
+        # انتقال صفحه‌های WAL به فایل اصلی تا فایل WAL بی‌اندازه بزرگ نشود
+        self.store.checkpoint()
+        self._checkpoint_job = self.root.after(event_db.CHECKPOINT_INTERVAL, self.checkpoint)
+    
+    def on_close(self):
+        # توقف تایمرها و رشته کارگر، خالی کردن کامل WAL و بستن اتصال پیش از بستن پنجره
+        if not self.started:
+            self.root.after_cancel(self._startup_job)
+            self.root.destroy()
+            return
+        self.root.after_cancel(self._checkpoint_job)
+        self.clock.stop()
+        if self.reminders is not None:
+            self.reminders.stop()
+        self.db.stop()
+        self.store.checkpoint("TRUNCATE")
+        self.store.close()
+        self.root.destroy()
 
 if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="برنامه‌ریز رویداد")
+    parser.add_argument("--snapshot", action="store_true",
+                        help="نگهداری نمایه ستونی رویدادها در حافظه (برای نصب‌های پرخواندن)")
+    args = parser.parse_args()
     root = tk.Tk()
-    app = EventSchedulerApp(root)
+    app = EventSchedulerApp(root, args.snapshot)
     root.mainloop()
\ No newline at end of file
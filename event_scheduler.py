@@ -1,8 +1,8 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
-import sqlite3
 from datetime import datetime
 import re
+import event_db
 
 class EventSchedulerApp:
     def __init__(self, root):
@@ -11,8 +11,7 @@ class EventSchedulerApp:
         self.root.geometry("800x600")
         
         # اتصال به پایگاه داده
-        self.conn = sqlite3.connect("events.db")
-        self.create_table()
+        self.conn = event_db.connect(event_db.DB_PATH)
         
         # لیست دسته‌بندی رویدادها
         self.event_types = ["امتحان", "تمرین", "کلاس", "جلسه", "تحقیق", "ارائه", "سایر"]
@@ -20,20 +19,6 @@ class EventSchedulerApp:
         # رابط کاربری
         self.create_gui()
         
-    def create_table(self):
-        cursor = self.conn.cursor()
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS events (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                title TEXT NOT NULL,
-                event_type TEXT NOT NULL,
-                date TEXT NOT NULL,
-                time TEXT NOT NULL,
-                description TEXT
-            )
-        ''')
-        self.conn.commit()
-    
     def validate_date(self, date_str):
         pattern = r"^\d{4}-\d{2}-\d{2}$"
         if not re.match(pattern, date_str):
@@ -154,7 +139,7 @@ class EventSchedulerApp:
             self.tree.delete(item)
         
         cursor = self.conn.cursor()
-        cursor.execute("SELECT * FROM events")
+        cursor.execute("SELECT id, title, event_type, date, time, description FROM events WHERE is_recurring = 0 ORDER BY day_num, minute")
         for row in cursor.fetchall():
             self.tree.insert("", tk.END, values=row)
     
@@ -252,27 +237,12 @@ class EventSchedulerApp:
             messagebox.showerror("خطا", "فرمت تاریخ نامعتبر است! از فرمت YYYY-MM-DD استفاده کنید.")
             return
         
-        search_datetime = datetime.strptime(search_date, "%Y-%m-%d")
-        cursor = self.conn.cursor()
-        cursor.execute("SELECT * FROM events WHERE date >= ?", (search_date,))
-        events = cursor.fetchall()
-        
-        if not events:
-            messagebox.showinfo("نتیجه", "هیچ رویدادی در آینده یافت نشد!")
-            return
-        
-        nearest_event = None
-        min_diff = float("inf")
-        
-        for event in events:
-            event_datetime = datetime.strptime(f"{event[3]} {event[4]}", "%Y-%m-%d %H:%M")
-            diff = (event_datetime - search_datetime).total_seconds()
-            if diff >= 0 and diff < min_diff:
-                min_diff = diff
-                nearest_event = event
-        
+        # اولین رویداد زمان‌دار از ابتدای روز جستجو، مستقیم از ایندکس (day_num, minute)
+        search_day = datetime.strptime(search_date, "%Y-%m-%d").toordinal()
+        nearest_event = event_db.select_events(self.conn, event_db.QUERIES["nearest.timed"], (search_day,)).fetchone()
+
         if nearest_event:
-            messagebox.showinfo("نزدیک‌ترین رویداد", f"عنوان: {nearest_event[1]}\nنوع: {nearest_event[2]}\nتاریخ: {nearest_event[3]}\nساعت: {nearest_event[4]}\nتوضیحات: {nearest_event[5] or 'بدون توضیحات'}")
+            messagebox.showinfo("نزدیک‌ترین رویداد", f"عنوان: {nearest_event.title}\nنوع: {nearest_event.event_type}\nتاریخ: {nearest_event.date}\nساعت: {nearest_event.time}\nتوضیحات: {nearest_event.description or 'بدون توضیحات'}")
         else:
             messagebox.showinfo("نتیجه", "هیچ رویدادی در آینده یافت نشد!")
     
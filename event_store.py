@@ -0,0 +1,520 @@
+import bisect
+import re
+from collections import namedtuple
+from contextlib import contextmanager
+from datetime import datetime
+from itertools import islice
+import event_db
+import jalali_calendar
+import recurrence
+import conflicts
+from conflicts import MINUTES_PER_DAY
+from event_db import Event
+from recurrence import Occurrence, WEEK
+
+# لیست دسته‌بندی رویدادها
+EVENT_TYPES = ["امتحان", "تمرین", "کلاس", "جلسه", "تحقیق", "ارائه", "سایر"]
+
+# روزهای هفته
+WEEKDAYS = ["شنبه", "یکشنبه", "دوشنبه", "سه‌شنبه", "چهارشنبه", "پنج‌شنبه", "جمعه"]
+
+
+# تعداد وقوع‌هایی که نمای «آینده» نشان می‌دهد
+FUTURE_LIMIT = 1000
+
+# کلید صفحه‌بندی keyset؛ id همیشه به انتهای کلید اضافه می‌شود
+PAGE_KEY = ("ifnull(day_num, 0)", "ifnull(minute, -1)")
+
+# انواع پرس‌وجوی هر بخش PageSource: شمارش، صفحه اول و آخر، صفحه بعد، از و قبل از یک کلید، پرش با OFFSET
+# (از ابتدای بخش یا از یک لنگر) و شرط بخش برای یک سطر
+PAGE_QUERIES = ("count", "first", "last", "after", "from", "before", "skip", "skip.after", "locate")
+
+
+# حداکثر تعداد نتیجه جستجوی متنی
+SEARCH_LIMIT = 500
+
+# حداکثر تعداد فاصله آزاد در پنجره یافتن زمان آزاد
+FREE_SLOT_LIMIT = 50
+
+# تعداد سطر در هر executemany درج گروهی
+BATCH_SIZE = 1000
+
+# ستون نوع در پرس‌وجوی weekly به برچسب جدول هفتگی
+WEEKLY_KINDS = ('recurring', 'single')
+
+_TIME_PATTERN = re.compile(r"^\d{2}:\d{2}$")
+
+
+# تغییر یک رویداد؛ old و new سطر قبل و بعد از تغییر هستند (برای درج old و برای حذف new برابر None)
+# RELOADED یعنی تغییر گروهی (مثلاً ورود از فایل)؛ event_id و old و new برابر None و همه نماها دوباره ساخته می‌شوند
+EventChange = namedtuple("EventChange", ["kind", "event_id", "old", "new"])
+INSERTED, UPDATED, DELETED, RELOADED = "inserted", "updated", "deleted", "reloaded"
+
+
+def validate_time(time_str):
+    # ساعت خالی یعنی رویداد بدون زمان
+    if not time_str:
+        return True
+    if not _TIME_PATTERN.match(time_str):
+        return False
+    try:
+        datetime.strptime(time_str, "%H:%M")
+        return True
+    except ValueError:
+        return False
+
+
+def validate_end_time(time_str, end_time_str):
+    # ساعت پایان اختیاری است، ولی فقط برای رویداد ساعت‌دار و بعد از ساعت شروع در همان روز
+    if not end_time_str:
+        return True
+    if not time_str or not validate_time(time_str) or not validate_time(end_time_str):
+        return False
+    return end_time_str > time_str
+
+
+def search_query(text):
+    # عبارت MATCH برای FTS5: همه واژه‌ها با هم (AND) و هر واژه دوحرفی یا بلندتر به‌صورت پیشوند؛
+    # پیشوند تک‌حرفی تقریباً همه سطرها را برمی‌گرداند و فقط واژه کامل جستجو می‌شود. نقل‌قول‌ها خنثی می‌شوند
+    return " ".join('"' + word.replace('"', '""') + ('"*' if len(word) > 1 else '"') for word in text.split())
+
+
+def week_range(now):
+    # شماره روز میلادی اول و آخر هفته جاری (دوشنبه تا یکشنبه)
+    start_of_week = now.toordinal() - now.weekday()
+    return start_of_week, start_of_week + 6
+
+
+def weekly_slot(event, now):
+    # روز و نوع رویداد در جدول هفتگی، یا None اگر در هفته جاری نباشد (همان شرط‌های weekly.*)
+    if event.is_recurring == 1:
+        if 0 <= event.recurring_day < 7 and (event.end_day_num is None or event.end_day_num >= now.toordinal()):
+            return event.recurring_day, 'recurring'
+        return None
+    start_of_week, end_of_week = week_range(now)
+    if event.day_num is not None and start_of_week <= event.day_num <= end_of_week:
+        return jalali_calendar.weekday(event.day_num), 'single'
+    return None
+
+
+def weekly_sort_key(entry):
+    # در هر روز: اول تکراری‌ها، بعد یک‌باره‌ها؛ هر کدام به ترتیب تاریخ و ساعت
+    event, kind = entry
+    return (kind != 'recurring', event.day_num or 0, -1 if event.minute is None else event.minute, event.id)
+
+
+def is_future_task(event, now):
+    # همان شرط future_tasks
+    return (event.is_recurring == 0 and event.minute is None and event.day_num is not None
+            and event.day_num >= now.toordinal())
+
+
+class EventStore:
+    # هسته بدون رابط گرافیکی: ذخیره، پرس‌وجو و منطق تکرار رویدادها
+    def __init__(self, conn, snapshot=None):
+        self.conn = conn
+        self.listeners = []
+        self._changes = None  # اعلان‌های تراکنش باز
+        # نمایه ستونی اختیاری در حافظه؛ اتصال‌های فقط‌خواندنی (رشته کارگر) نمایه اتصال اصلی را به اشتراک می‌گیرند
+        self.snapshot = snapshot
+
+    @classmethod
+    def open(cls, path=event_db.DB_PATH, pragmas=None, snapshot=None):
+        store = cls(event_db.connect(path, pragmas), snapshot)
+        store.refresh_occurrences(datetime.now())
+        return store
+
+    @classmethod
+    def open_readonly(cls, path=event_db.DB_PATH, pragmas=None):
+        # برای ابزارهای خط فرمان (agenda): بدون مهاجرت و بدون جلو بردن افق occurrences؛
+        # اگر افق کهنه باشد upcoming وقوع‌ها را با بسط قاعده‌ها می‌سازد
+        return cls(event_db.connect_readonly(path, pragmas))
+
+    def enable_snapshot(self):
+        # ساخت نمایه ستونی (snapshot.EventSnapshot) که با اعلان‌های همین store اصلاح می‌شود؛
+        # اول فهرست شنونده‌ها قرار می‌گیرد تا شنونده‌های دیگر نمایه به‌روز را ببینند
+        from snapshot import EventSnapshot
+
+        if self.snapshot is None:
+            self.snapshot = EventSnapshot(self.conn)
+            self.listeners.insert(0, self.snapshot.apply)
+        return self.snapshot
+
+    def close(self):
+        self.conn.close()
+
+    def refresh_occurrences(self, now):
+        # جلو بردن افق جدول occurrences تا امروز؛ هنگام باز کردن و با عوض شدن روز صدا زده می‌شود
+        return event_db.refresh_occurrences(self.conn, now.toordinal())
+
+    def checkpoint(self, mode="PASSIVE"):
+        return event_db.checkpoint(self.conn, mode)
+
+    def subscribe(self, listener):
+        # listener بعد از هر درج، ویرایش یا حذف با یک EventChange صدا زده می‌شود
+        self.listeners.append(listener)
+
+    def unsubscribe(self, listener):
+        self.listeners.remove(listener)
+
+    def _notify(self, change):
+        # داخل transaction اعلان‌ها تا commit نگه داشته می‌شوند (و با rollback دور ریخته می‌شوند)
+        if self._changes is not None:
+            self._changes.append(change)
+            return
+        for listener in self.listeners:
+            listener(change)
+
+    @contextmanager
+    def transaction(self):
+        # چند نوشتن با یک commit (و یک fsync)؛ تراکنش‌های تو در تو به تراکنش بیرونی می‌پیوندند
+        if self._changes is not None:
+            yield self
+            return
+        self._changes = []
+        try:
+            with event_db.transaction(self.conn):
+                yield self
+            changes = self._changes
+        finally:
+            self._changes = None
+        for change in changes:
+            self._notify(change)
+
+    def add_event(self, title, event_type, date=None, time=None, description="",
+                  is_recurring=False, recurring_day=-1, end_date=None, end_time=None):
+        with self.transaction():
+            cursor = self.conn.execute('''
+                INSERT INTO events (title, event_type, date, time, description, is_recurring, recurring_day, end_date,
+                                    end_time)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (title, event_type, date, time or None, description, int(is_recurring), recurring_day, end_date,
+                  end_time or None))
+            self._notify(EventChange(INSERTED, cursor.lastrowid, None, self.get_event(cursor.lastrowid)))
+        return cursor.lastrowid
+
+    def add_events(self, rows, batch_size=BATCH_SIZE, progress=None):
+        # درج گروهی از یک iterator از سطرهای (title, event_type, date, time, description,
+        # is_recurring, recurring_day, end_date, end_time) در یک تراکنش؛ در پایان فقط یک اعلان RELOADED
+        count = 0
+        rows = iter(rows)
+        with self.transaction():
+            while True:
+                batch = list(islice(rows, batch_size))
+                if not batch:
+                    break
+                self.conn.executemany('''
+                    INSERT INTO events (title, event_type, date, time, description, is_recurring, recurring_day,
+                                        end_date, end_time)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', batch)
+                count += len(batch)
+                if progress is not None:
+                    progress(count)
+            if count:
+                self._notify(EventChange(RELOADED, None, None, None))
+        return count
+
+    def update_event(self, event_id, title, event_type, date=None, time=None, description="",
+                     is_recurring=False, recurring_day=-1, end_date=None, end_time=None):
+        with self.transaction():
+            old = self.get_event(event_id)
+            self.conn.execute('''
+                UPDATE events
+                SET title = ?, event_type = ?, date = ?, time = ?, description = ?,
+                    is_recurring = ?, recurring_day = ?, end_date = ?, end_time = ?
+                WHERE id = ?
+            ''', (title, event_type, date, time or None, description,
+                  int(is_recurring), recurring_day, end_date, end_time or None, event_id))
+            self._notify(EventChange(UPDATED, event_id, old, self.get_event(event_id)))
+
+    def delete_event(self, event_id):
+        with self.transaction():
+            old = self.get_event(event_id)
+            self.conn.execute("DELETE FROM events WHERE id = ?", (event_id,))
+            self._notify(EventChange(DELETED, event_id, old, None))
+
+    def get_event(self, event_id):
+        return event_db.select_events(self.conn, event_db.QUERIES["event"], (event_id,)).fetchone()
+
+    def get_description(self, event_id):
+        # متن کامل توضیحات؛ فهرست‌ها فقط پیش‌نمایش آن را دارند
+        row = event_db.execute(self.conn, event_db.QUERIES["event.description"], (event_id,)).fetchone()
+        return row[0] if row is not None else None
+
+    def upcoming(self, now):
+        # جریان تنبل وقوع‌های آینده (یک‌باره و تکراری) به ترتیب زمان
+        if self.snapshot is not None:
+            return self.snapshot.upcoming(self.conn, now)
+        return recurrence.upcoming(self.conn, now)
+
+    def nearest_event(self, now):
+        return next(self.upcoming(now), None)
+
+    def future_events(self, now, limit=FUTURE_LIMIT):
+        return list(islice(self.upcoming(now), limit))
+
+    def all_events(self):
+        return event_db.select_events(self.conn, event_db.QUERIES["load_events.all"]).fetchall()
+
+    def future_tasks(self, now):
+        return event_db.select_events(self.conn, event_db.QUERIES["future_tasks"], (now.toordinal(),)).fetchall()
+
+    def weekly_schedule(self, now):
+        # برای هر روز هفته شمسی، فهرست (رویداد، نوع) با نوع 'recurring' یا 'single'
+        # یک پیمایش روی نتیجه مرتب پرس‌وجو؛ هر سطر مستقیم به انتهای فهرست روز خودش اضافه می‌شود
+        if self.snapshot is not None:
+            return self.snapshot.weekly_schedule(self.conn, now, week_range(now))
+        days = [[] for _ in range(WEEK)]
+        for row in event_db.execute(self.conn, event_db.QUERIES["weekly"], (now.toordinal(),) + week_range(now)):
+            event = Event._make(row[:-1])
+            days[event.weekday].append((event, WEEKLY_KINDS[row[-1]]))
+        return days
+
+    def type_counts(self):
+        # تعداد رویدادهای هر نوع
+        if self.snapshot is not None:
+            return self.snapshot.type_counts()
+        return dict(event_db.execute(self.conn, event_db.QUERIES["type_counts"]))
+
+    def conflicts(self, now, date=None, time=None, end_time=None, is_recurring=False, recurring_day=-1,
+                  end_date=None, exclude_id=None):
+        # رویدادهای هم‌پوشان با رویدادی که قرار است افزوده یا (با exclude_id) ویرایش شود
+        return conflicts.event_conflicts(self.conn, now.toordinal(), date, time, end_time, is_recurring,
+                                         recurring_day, end_date, exclude_id)
+
+    def conflicts_in_range(self, first_date, last_date):
+        # همه جفت‌های هم‌پوشان بین دو تاریخ میلادی (date)، با خط جاروب
+        return conflicts.range_conflicts(self.conn, first_date.toordinal(), last_date.toordinal())
+
+    def free_slots(self, now, days, duration, day_start=0, day_end=MINUTES_PER_DAY, weekdays=None,
+                   exclude_types=(), limit=None):
+        # فاصله‌های آزاد دست‌کم duration دقیقه‌ای از اکنون تا days روز بعد (با امروز)، در ساعت‌های کاری
+        # [day_start، day_end) به دقیقه؛ اولین عنصر زودترین زمان آزاد است
+        today = now.toordinal()
+        return conflicts.free_slots(self.conn, today, today + days - 1, duration, day_start, day_end, weekdays,
+                                    exclude_types, today * MINUTES_PER_DAY + recurrence.minute_of_day(now),
+                                    limit)
+
+    def search(self, text, event_type=None, limit=SEARCH_LIMIT, full=False):
+        # رویدادهایی که همه واژه‌ها (یا پیشوندشان) در عنوان یا توضیحاتشان هست، به ترتیب امتیاز bm25
+        # سطرها پیش‌نمایش توضیحات را دارند، مگر با full (وقتی سطر ممکن است دوباره ذخیره شود)
+        query = search_query(text)
+        if not query:
+            return []
+        return event_db.select_events(self.conn, event_db.QUERIES["search.full" if full else "search"],
+                                      (query, event_type, event_type, limit)).fetchall()
+
+    def all_pages(self):
+        # همان ترتیب load_events.all: اول تکراری‌ها، بعد یک‌باره‌ها
+        return PageSource(self.conn, [
+            ("is_recurring = 1", ()),
+            ("is_recurring = 0", ()),
+        ], name="all")
+
+
+class PageSource:
+    # صفحه‌بندی keyset روی چند بخش پشت‌سرهم از جدول events
+    # مکان‌نما (شماره بخش، کلید) است؛ کلید None یعنی ابتدای بخش
+    # OFFSET فقط برای پیدا کردن کلید مقصد پرش‌های دور و روی ستون‌های ایندکس استفاده می‌شود
+    # name پیشوند نام پرس‌وجوها ({name}.{نوع}.{شماره بخش}) در queries است
+    def __init__(self, conn, segments, key=PAGE_KEY, counts=None, name="pages"):
+        self.conn = conn
+        self.segments = segments
+        self.key = key
+        self.name = name
+        order = ", ".join(key + ("id",))
+        self._select = (f"SELECT {event_db.LIST_COLUMNS}, {', '.join(key)} FROM events "
+                        f"WHERE {{where}}{{after}} ORDER BY {{order}} LIMIT ?")
+        self._order = order
+        self._order_desc = ", ".join(f"{expr} DESC" for expr in key + ("id",))
+        self._counts = list(counts) if counts is not None else None
+        self._anchors = {}
+        # یک Event به‌صورت سطر موقت با همان نام ستون‌ها، برای محاسبه کلید و شرط بخش در SQL
+        self._values = ", ".join(f"? AS {column}" for column in event_db.EVENT_FIELDS)
+
+    def invalidate(self):
+        self._counts = None
+        self._anchors = {}
+
+    def _sql(self, kind, segment):
+        # متن SQL یک نوع پرس‌وجو (PAGE_QUERIES) برای یک بخش
+        where = self.segments[segment][0]
+        if kind == "count":
+            return f"SELECT COUNT(*) FROM events WHERE {where}"
+        if kind == "locate":
+            return f"SELECT {', '.join(self.key)}, id FROM (SELECT {self._values}) AS candidate WHERE {where}"
+        if kind in ("skip", "skip.after"):
+            after = self._bound(True) if kind == "skip.after" else ""
+            return (f"SELECT {', '.join(self.key)}, id FROM events WHERE {where}{after} "
+                    f"ORDER BY {self._order} LIMIT 1 OFFSET ?")
+        forward = kind != "last" and kind != "before"
+        after = self._bound(forward, kind == "from") if kind in ("after", "from", "before") else ""
+        return self._select.format(where=where, after=after, order=self._order if forward else self._order_desc)
+
+    def queries(self):
+        # همه پرس‌وجوهای این منبع با نامشان، برای event_db.check_query_plans
+        return {f"{self.name}.{kind}.{segment}": self._sql(kind, segment)
+                for segment in range(len(self.segments)) for kind in PAGE_QUERIES}
+
+    def _execute(self, kind, segment, params):
+        # با همان نام queries، تا پروفایل (EVENT_PROFILE) صفحه‌بندی را هم ثبت کند
+        return event_db.execute(self.conn, self._sql(kind, segment), params, name=f"{self.name}.{kind}.{segment}")
+
+    def segment_counts(self):
+        if self._counts is None:
+            self._counts = [self._execute("count", segment, params).fetchone()[0]
+                            for segment, (where, params) in enumerate(self.segments)]
+        return self._counts
+
+    def count(self):
+        return sum(self.segment_counts())
+
+    def locate(self, event):
+        # مکان‌نمای یک سطر (شاید حذف‌شده) در این فهرست، یا None اگر در هیچ بخشی نباشد
+        if event is None:
+            return None
+        for segment, (where, params) in enumerate(self.segments):
+            key = self._execute("locate", segment, tuple(event) + params).fetchone()
+            if key is not None:
+                return segment, key
+        return None
+
+    def apply(self, change):
+        # شمارش بخش‌ها به‌صورت افزایشی اصلاح می‌شود؛ مکان‌نمای قبل و بعد تغییر برگردانده می‌شود
+        if change.kind == RELOADED:
+            self.invalidate()
+            return None
+        old, new = self.locate(change.old), self.locate(change.new)
+        if self._counts is not None:
+            if old is not None:
+                self._counts[old[0]] -= 1
+            if new is not None:
+                self._counts[new[0]] += 1
+        if old is not None or new is not None:
+            self._anchors = {}
+        return old, new
+
+    def _bound(self, forward, inclusive=False):
+        # شرط «بعد از» یا «قبل از» کلید (با پارامترهای _bound_params)؛ ستون اول برای جستجو در ایندکس جدا شده است
+        first, rest = self.key[0], self.key[1:] + ("id",)
+        op = ">" if forward else "<"
+        rest_op = op + "=" if inclusive else op
+        return f" AND {first} {op}= ? AND ({first} {op} ? OR ({', '.join(rest)}) {rest_op} ({', '.join('?' * len(rest))}))"
+
+    def _bound_params(self, key):
+        return (key[0], key[0]) + tuple(key[1:])
+
+    def _query(self, segment, key, limit, forward, inclusive=False):
+        params = self.segments[segment][1]
+        if key is None:
+            kind = "first" if forward else "last"
+        else:
+            kind = "from" if inclusive else "after" if forward else "before"
+            params += self._bound_params(key)
+        size = len(self.key)
+        rows = []
+        for row in self._execute(kind, segment, params + (limit,)):
+            event = Event._make(row[:-size])
+            rows.append(((segment, row[-size:] + (event.id,)), event))
+        return rows
+
+    def fetch_after(self, cursor, limit):
+        # حداکثر limit سطر بعد از مکان‌نما؛ cursor برابر None یعنی ابتدای فهرست
+        segment, key = cursor if cursor is not None else (0, None)
+        rows = []
+        while segment < len(self.segments) and len(rows) < limit:
+            rows += self._query(segment, key, limit - len(rows), True)
+            segment, key = segment + 1, None
+        return rows
+
+    def fetch_from(self, cursor, limit):
+        # مانند fetch_after ولی خود سطر مکان‌نما (اگر هنوز وجود داشته باشد) هم شامل می‌شود
+        segment, key = cursor
+        rows = self._query(segment, key, limit, True, inclusive=True)
+        if len(rows) < limit:
+            rows += self.fetch_after((segment + 1, None), limit - len(rows))
+        return rows
+
+    def fetch_before(self, cursor, limit):
+        # حداکثر limit سطر قبل از مکان‌نما به ترتیب صعودی؛ cursor برابر None یعنی انتهای فهرست
+        segment, key = cursor if cursor is not None else (len(self.segments) - 1, None)
+        rows = []
+        while segment >= 0 and len(rows) < limit:
+            rows += self._query(segment, key, limit - len(rows), False)
+            segment, key = segment - 1, None
+        rows.reverse()
+        return rows
+
+    def rows_at(self, index, limit):
+        # سطرها از شماره سراسری index؛ پرش از نزدیک‌ترین لنگر شناخته‌شده شروع می‌شود
+        counts = self.segment_counts()
+        total = sum(counts)
+        if index >= total:
+            return []
+        if index + limit >= total:
+            return self.fetch_before(None, total - index)
+        segment = 0
+        while index >= counts[segment]:
+            index -= counts[segment]
+            segment += 1
+        return self.fetch_after((segment, self._key_before(segment, index)), limit)
+
+    def _key_before(self, segment, index):
+        # کلید سطر index-1 بخش؛ فاصله از لنگر قبلی فقط روی ستون‌های ایندکس طی می‌شود
+        if index == 0:
+            return None
+        positions, keys = self._anchors.setdefault(segment, ([], {}))
+        target = index - 1
+        found = bisect.bisect_right(positions, target)
+        start = positions[found - 1] if found else -1
+        if start == target:
+            return keys[target]
+        params = self.segments[segment][1]
+        if found:
+            kind, params = "skip.after", params + self._bound_params(keys[start])
+        else:
+            kind = "skip"
+        key = self._execute(kind, segment, params + (target - start - 1,)).fetchone()
+        bisect.insort(positions, target)
+        keys[target] = key
+        return key
+
+
+class ListSource:
+    # منبع فهرست مجازی روی فهرستی که load در حافظه می‌سازد؛ مکان‌نما شماره سطر در فهرست است
+    def __init__(self, load):
+        self.load = load
+        self._rows = None
+
+    def invalidate(self):
+        self._rows = None
+
+    def _loaded(self):
+        if self._rows is None:
+            self._rows = self.load()
+        return self._rows
+
+    def count(self):
+        return len(self._loaded())
+
+    def apply(self, change):
+        # جای تغییر در فهرست از قبل معلوم نیست؛ فهرست دوباره ساخته می‌شود
+        self.invalidate()
+        return None
+
+    def rows_at(self, index, limit):
+        rows = self._loaded()
+        return list(enumerate(rows[index:index + limit], start=index))
+
+    def fetch_after(self, cursor, limit):
+        return self.rows_at(0 if cursor is None else cursor + 1, limit)
+
+    def fetch_from(self, cursor, limit):
+        return self.rows_at(cursor, limit)
+
+    def fetch_before(self, cursor, limit):
+        end = self.count() if cursor is None else cursor
+        start = max(0, end - limit)
+        return self.rows_at(start, end - start)
+
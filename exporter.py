@@ -0,0 +1,157 @@
+import argparse
+import csv
+import os
+import sys
+from datetime import date as date_cls, datetime, timedelta, timezone
+import event_db
+import jalali_calendar
+from event_store import WEEKDAYS
+from importer import CSV_FIELDS, ICS_WEEKDAYS
+
+# python exporter.py backup.ics | backup.csv | - [--format ics|csv] [--db events.db]
+# جدول events با یک cursor و در دسته‌های ثابت خوانده و خروجی به‌صورت افزایشی نوشته می‌شود؛ حافظه به تعداد سطرها بستگی ندارد
+
+BATCH_SIZE = 1000
+
+EXPORT_COLUMNS = "id, title, event_type, date, time, description, is_recurring, recurring_day, end_date, end_time"
+
+ICS_DAYS = {number: code for code, number in ICS_WEEKDAYS.items()}
+
+
+def iter_events(conn, batch_size=BATCH_SIZE):
+    # پیمایش به ترتیب کلید اصلی (بدون مرتب‌سازی)؛ fetchmany فقط یک دسته را در حافظه نگه می‌دارد
+    cursor = conn.execute(f"SELECT {EXPORT_COLUMNS} FROM events ORDER BY id")
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            return
+        yield rows
+
+
+def exportable(row):
+    # سطر ناقص (تکراری بدون روز معتبر یا یک‌باره بدون تاریخ) در خروجی نمی‌آید
+    return row[7] is not None and 0 <= row[7] < 7 if row[6] else bool(row[3])
+
+
+def _jalali(gregorian_date):
+    return jalali_calendar.gregorian_to_jalali(gregorian_date) if gregorian_date else ""
+
+
+def write_csv(batches, out):
+    # همان قالب ورودی importer.read_csv، پس خروجی دوباره قابل ورود است
+    writer = csv.writer(out)
+    writer.writerow(CSV_FIELDS)
+    count = 0
+    for rows in batches:
+        rows = [row for row in rows if exportable(row)]
+        writer.writerows(
+            (title, event_type, "" if is_recurring else _jalali(date), time or "", description or "",
+             WEEKDAYS[recurring_day] if is_recurring else "", _jalali(end_date) if is_recurring else "",
+             end_time or "")
+            for _, title, event_type, date, time, description, is_recurring, recurring_day, end_date, end_time in rows)
+        count += len(rows)
+    return count
+
+
+def ics_escape(value):
+    return (value.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,")
+            .replace("\r\n", "\\n").replace("\n", "\\n"))
+
+
+def ics_fold(line):
+    # شکستن خط‌های بلندتر از 75 بایت (RFC 5545)، بدون بریدن یک کاراکتر چندبایتی
+    if len(line.encode("utf-8")) <= 75:
+        return line + "\r\n"
+    parts = []
+    current, size = [], 0
+    for char in line:
+        length = len(char.encode("utf-8"))
+        if size + length > 75:
+            parts.append("".join(current))
+            current, size = [" "], 1
+        current.append(char)
+        size += length
+    parts.append("".join(current))
+    return "\r\n".join(parts) + "\r\n"
+
+
+def _ics_start(day, time, name="DTSTART"):
+    # زمان محلی شناور؛ رویداد بدون زمان یک رویداد تمام‌روز است
+    if time:
+        return f"{name}:{day:%Y%m%d}T{time[0:2]}{time[3:5]}00"
+    return f"{name};VALUE=DATE:{day:%Y%m%d}"
+
+
+def _first_weekly(recurring_day, end_date, today):
+    # قاعده هفتگی تاریخ شروع ندارد؛ DTSTART اولین وقوع از امروز (یا از هفته آخر، اگر قاعده تمام شده باشد)
+    start = today
+    if end_date and date_cls.fromisoformat(end_date) < today:
+        start = date_cls.fromisoformat(end_date) - timedelta(days=6)
+    return start + timedelta(days=(recurring_day - jalali_calendar.weekday(start.toordinal())) % 7)
+
+
+def ics_event(row, stamp, today):
+    event_id, title, event_type, date, time, description, is_recurring, recurring_day, end_date, end_time = row
+    lines = ["BEGIN:VEVENT", f"UID:event-{event_id}@my-planner", f"DTSTAMP:{stamp}"]
+    start = _first_weekly(recurring_day, end_date, today) if is_recurring else date_cls.fromisoformat(date)
+    lines.append(_ics_start(start, time))
+    if time and end_time:
+        lines.append(_ics_start(start, end_time, "DTEND"))
+    if is_recurring:
+        rule = f"RRULE:FREQ=WEEKLY;BYDAY={ICS_DAYS[recurring_day]}"
+        if end_date:
+            # UNTIL هم‌نوع DTSTART است
+            rule += f";UNTIL={end_date.replace('-', '')}" + ("T235959" if time else "")
+        lines.append(rule)
+    lines.append(f"SUMMARY:{ics_escape(title)}")
+    lines.append(f"CATEGORIES:{ics_escape(event_type)}")
+    if description:
+        lines.append(f"DESCRIPTION:{ics_escape(description)}")
+    lines.append("END:VEVENT")
+    return "".join(ics_fold(line) for line in lines)
+
+
+def write_ics(batches, out, now=None):
+    now = now or datetime.now()
+    stamp = now.astimezone(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    out.write("BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//my-planner//event scheduler//FA\r\n")
+    count = 0
+    for rows in batches:
+        rows = [row for row in rows if exportable(row)]
+        out.write("".join(ics_event(row, stamp, now.date()) for row in rows))
+        count += len(rows)
+    out.write("END:VCALENDAR\r\n")
+    return count
+
+
+WRITERS = {"csv": write_csv, "ics": write_ics}
+
+
+def export_events(conn, out, fmt, batch_size=BATCH_SIZE):
+    return WRITERS[fmt](iter_events(conn, batch_size), out)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="خروجی CSV یا iCalendar از رویدادها")
+    parser.add_argument("output", help="مسیر فایل خروجی یا - برای stdout")
+    parser.add_argument("--format", choices=sorted(WRITERS), help="پیش‌فرض از پسوند فایل")
+    parser.add_argument("--db", default=event_db.DB_PATH)
+    parser.add_argument("--batch", type=int, default=BATCH_SIZE)
+    args = parser.parse_args()
+
+    fmt = args.format or os.path.splitext(args.output)[1].lstrip(".").lower()
+    if fmt not in WRITERS:
+        parser.error("قالب خروجی را با --format مشخص کنید")
+    # فقط خواندن: خروجی گرفتن دیتابیس را مهاجرت نمی‌دهد و چیزی در آن نمی‌نویسد
+    conn = event_db.connect_readonly(args.db)
+    if args.output == "-":
+        sys.stdout.reconfigure(encoding="utf-8", newline="")
+        export_events(conn, sys.stdout, fmt, args.batch)
+    else:
+        with open(args.output, "w", encoding="utf-8", newline="") as out:
+            export_events(conn, out, fmt, args.batch)
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
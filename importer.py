@@ -0,0 +1,207 @@
+import csv
+import os
+import re
+import sys
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone
+import event_db
+import jalali_calendar
+from event_store import EventStore, EVENT_TYPES, WEEKDAYS, validate_time, validate_end_time
+
+# python importer.py calendar.csv|calendar.ics [events.db]
+# فایل به‌صورت جریانی خوانده می‌شود و سطرهای معتبر در یک تراکنش با executemany گروهی درج می‌شوند
+
+# ستون‌های CSV (سطر اول)؛ تاریخ‌ها شمسی YYYY-MM-DD
+# recurring_day خالی یعنی رویداد یک‌باره، وگرنه نام روز یا شماره آن (شنبه=0)؛ end_time اختیاری (HH:MM)
+CSV_FIELDS = ["title", "event_type", "date", "time", "description", "recurring_day", "end_date", "end_time"]
+
+# نتیجه ورود: تعداد سطرهای درج‌شده و فهرست (شماره خط، پیام خطا)
+ImportReport = namedtuple("ImportReport", ["imported", "errors"])
+
+# روزهای BYDAY در iCalendar به شماره روز هفته شمسی
+ICS_WEEKDAYS = {"SA": 0, "SU": 1, "MO": 2, "TU": 3, "WE": 4, "TH": 5, "FR": 6}
+
+_ICS_ESCAPE = re.compile(r"\\(.)")
+_ICS_ESCAPES = {"n": "\n", "N": "\n"}
+
+
+def parse_record(record):
+    # همان قاعده‌های فرم افزودن رویداد؛ برای سطر نامعتبر ValueError با پیام فارسی
+    if record.get("error"):
+        raise ValueError(record["error"])
+    title = (record.get("title") or "").strip()
+    event_type = (record.get("event_type") or "").strip()
+    jalali_date = (record.get("date") or "").strip()
+    time = (record.get("time") or "").strip()
+    description = (record.get("description") or "").strip()
+    recurring_day_str = (record.get("recurring_day") or "").strip()
+    end_jalali_date = (record.get("end_date") or "").strip()
+    end_time = (record.get("end_time") or "").strip()
+
+    if not title or not event_type:
+        raise ValueError("عنوان و نوع لازم است!")
+
+    if recurring_day_str:
+        if recurring_day_str in WEEKDAYS:
+            recurring_day = WEEKDAYS.index(recurring_day_str)
+        elif recurring_day_str.isdigit() and int(recurring_day_str) < 7:
+            recurring_day = int(recurring_day_str)
+        else:
+            raise ValueError(f"روز تکرار نامعتبر است: {recurring_day_str}")
+        if end_jalali_date and not jalali_calendar.validate_jalali_date(end_jalali_date):
+            raise ValueError("فرمت تاریخ پایان نامعتبر است!")
+        gregorian_end_date = jalali_calendar.jalali_to_gregorian(end_jalali_date) if end_jalali_date else None
+        gregorian_date = None  # برای تکراری، تاریخ شروع لازم نیست
+    else:
+        if not jalali_date or not jalali_calendar.validate_jalali_date(jalali_date):
+            raise ValueError("فرمت تاریخ نامعتبر است!")
+        gregorian_date = jalali_calendar.jalali_to_gregorian(jalali_date)
+        recurring_day = -1
+        gregorian_end_date = None
+
+    if not validate_time(time):
+        raise ValueError("فرمت ساعت نامعتبر است!")
+    if not validate_end_time(time, end_time):
+        raise ValueError("ساعت پایان باید بعد از ساعت شروع باشد!")
+
+    return (title, event_type, gregorian_date, time or None, description,
+            int(bool(recurring_day_str)), recurring_day, gregorian_end_date, end_time or None)
+
+
+def read_csv(lines):
+    # (شماره خط، رکورد) برای هر سطر داده
+    reader = csv.DictReader(lines)
+    if not reader.fieldnames or "title" not in reader.fieldnames:
+        raise ValueError(f"سطر اول CSV باید نام ستون‌ها باشد: {', '.join(CSV_FIELDS)}")
+    try:
+        for record in reader:
+            yield reader.line_num, record
+    except csv.Error as error:
+        raise ValueError(f"خط {reader.line_num}: {error}") from error
+
+
+def _unfold(lines):
+    # خط‌های ادامه (شروع با فاصله یا tab) به خط قبل می‌چسبند؛ شماره خط اول نگه داشته می‌شود
+    current, number = None, 0
+    for line_number, line in enumerate(lines, 1):
+        line = line.rstrip("\r\n")
+        if line[:1] in (" ", "\t") and current is not None:
+            current += line[1:]
+            continue
+        if current:
+            yield number, current
+        current, number = line, line_number
+    if current:
+        yield number, current
+
+
+def _ics_text(value):
+    return _ICS_ESCAPE.sub(lambda match: _ICS_ESCAPES.get(match.group(1), match.group(1)), value)
+
+
+def _ics_datetime(value):
+    # مقدار DATE یا DATE-TIME؛ زمان UTC (با Z) به وقت محلی برگردانده می‌شود و TZID نادیده گرفته می‌شود
+    moment = datetime(int(value[0:4]), int(value[4:6]), int(value[6:8]))
+    if len(value) == 8:
+        return moment, False
+    if value[8] != "T":
+        raise ValueError(value)
+    moment = moment.replace(hour=int(value[9:11]), minute=int(value[11:13]))
+    if value.endswith("Z"):
+        moment = moment.replace(tzinfo=timezone.utc).astimezone().replace(tzinfo=None)
+    return moment, True
+
+
+def _ics_records(props):
+    # یک VEVENT به یک یا چند رکورد با همان ستون‌های CSV (برای هر روز BYDAY یک رکورد)
+    categories = _ics_text(props.get("CATEGORIES", "")).split(",")
+    record = {
+        "title": _ics_text(props.get("SUMMARY", "")),
+        "event_type": categories[0] if categories[0] in EVENT_TYPES else "سایر",
+        "description": _ics_text(props.get("DESCRIPTION", "")),
+    }
+    try:
+        start, timed = _ics_datetime(props.get("DTSTART", ""))
+    except ValueError:
+        return [dict(record, error=f"DTSTART نامعتبر است: {props.get('DTSTART', '')}")]
+    record["time"] = start.strftime("%H:%M") if timed else ""
+    record["date"] = jalali_calendar.format_date(*jalali_calendar.date_to_jalali(start.date()))
+    try:
+        end = _ics_datetime(props["DTEND"])[0] if timed and "DTEND" in props else None
+    except ValueError:
+        end = None
+    if end is not None and end.date() == start.date() and end > start:
+        # پایان در روز دیگر (یا نامعتبر) نادیده گرفته می‌شود؛ بازه‌ها در یک روز هستند
+        record["end_time"] = end.strftime("%H:%M")
+    if "RRULE" not in props:
+        return [record]
+
+    rule = dict(part.partition("=")[::2] for part in props["RRULE"].upper().split(";"))
+    days = [ICS_WEEKDAYS.get(day) for day in rule["BYDAY"].split(",")] if rule.get("BYDAY") else \
+        [jalali_calendar.weekday(start.toordinal())]
+    if rule.get("FREQ") != "WEEKLY" or rule.get("INTERVAL", "1") != "1" or None in days \
+            or ("COUNT" in rule and len(days) > 1):
+        # فقط تکرار هفتگی ساده در جدول events قابل نگه‌داری است
+        return [dict(record, error=f"قاعده تکرار پشتیبانی نمی‌شود: {props['RRULE']}")]
+    end = None
+    try:
+        if "UNTIL" in rule:
+            end = _ics_datetime(rule["UNTIL"])[0].date()
+        elif "COUNT" in rule:
+            end = start.date() + timedelta(days=7 * (int(rule["COUNT"]) - 1))
+    except ValueError:
+        return [dict(record, error=f"پایان تکرار نامعتبر است: {props['RRULE']}")]
+    end_date = jalali_calendar.format_date(*jalali_calendar.date_to_jalali(end)) if end else ""
+    return [dict(record, recurring_day=str(day), end_date=end_date) for day in days]
+
+
+def read_ics(lines):
+    # (شماره خط BEGIN:VEVENT، رکورد) برای هر رویداد؛ ویژگی‌ها با پارامترهایشان (مثل TZID) ساده می‌شوند
+    props = None
+    start_line = 0
+    for number, line in _unfold(lines):
+        name, _, value = line.partition(":")
+        name = name.split(";", 1)[0].upper()
+        if name == "BEGIN" and value.upper() == "VEVENT":
+            props, start_line = {}, number
+        elif name == "END" and value.upper() == "VEVENT" and props is not None:
+            for record in _ics_records(props):
+                yield start_line, record
+            props = None
+        elif props is not None:
+            props[name] = value
+
+
+def import_records(store, records, progress=None):
+    errors = []
+
+    def rows():
+        for line, record in records:
+            try:
+                yield parse_record(record)
+            except ValueError as error:
+                errors.append((line, str(error)))
+
+    imported = store.add_events(rows(), progress=progress)
+    return ImportReport(imported, errors)
+
+
+READERS = {".csv": read_csv, ".ics": read_ics}
+
+
+def import_file(store, path, progress=None):
+    reader = READERS.get(os.path.splitext(path)[1].lower())
+    if reader is None:
+        raise ValueError(f"نوع فایل پشتیبانی نمی‌شود: {path}")
+    with open(path, encoding="utf-8-sig", newline="") as file:
+        return import_records(store, reader(file), progress)
+
+
+if __name__ == "__main__":
+    store = EventStore.open(sys.argv[2] if len(sys.argv) > 2 else event_db.DB_PATH)
+    report = import_file(store, sys.argv[1], progress=lambda count: print(f"{count} ...", file=sys.stderr))
+    for line, message in report.errors:
+        print(f"{sys.argv[1]}:{line}: {message}")
+    print(f"imported {report.imported}, errors {len(report.errors)}")
+    store.close()
+    sys.exit(1 if report.errors else 0)
@@ -0,0 +1,127 @@
+import re
+from array import array
+from datetime import date as date_cls
+from functools import lru_cache
+
+# بازه پیش‌فرض جدول (سال‌های شمسی)؛ تاریخ‌های بیرون از آن از مسیر jdatetime با کش LRU می‌گذرند
+FIRST_YEAR = 1300
+LAST_YEAR = 1500
+
+_DATE_PATTERN = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+
+
+class JalaliCalendar:
+    # جدول فشرده روزها: برای هر شماره روز میلادی (date.toordinal) سال/ماه/روز شمسی در یک عدد
+    # تبدیل در هر دو جهت و روز هفته O(1) است
+    def __init__(self, first_year=FIRST_YEAR, last_year=LAST_YEAR):
+        import jdatetime
+
+        self.first_year = first_year
+        self.last_year = last_year
+        # شماره روز میلادی اول فروردین هر سال، به‌علاوه سال بعد از آخرین سال
+        self._year_starts = array("i", (jdatetime.date(year, 1, 1).togregorian().toordinal()
+                                        for year in range(first_year, last_year + 2)))
+        self._first_ordinal = self._year_starts[0]
+        self._days = array("i")
+        for index, year in enumerate(range(first_year, last_year + 1)):
+            length = self._year_starts[index + 1] - self._year_starts[index]
+            for month in range(1, 13):
+                for day in range(1, _month_length(month, length) + 1):
+                    self._days.append(year << 9 | month << 5 | day)
+
+    def to_jalali(self, ordinal):
+        index = ordinal - self._first_ordinal
+        if 0 <= index < len(self._days):
+            packed = self._days[index]
+            return packed >> 9, (packed >> 5) & 15, packed & 31
+        return _fallback_to_jalali(ordinal)
+
+    def from_jalali(self, year, month, day):
+        # برای تاریخ نامعتبر ValueError می‌دهد (مثل jdatetime.date)
+        if not self.first_year <= year <= self.last_year:
+            return _fallback_from_jalali(year, month, day)
+        start = self._year_starts[year - self.first_year]
+        length = self._year_starts[year - self.first_year + 1] - start
+        if not 1 <= month <= 12 or not 1 <= day <= _month_length(month, length):
+            raise ValueError(f"تاریخ شمسی نامعتبر: {year}-{month}-{day}")
+        offset = (month - 1) * 31 if month <= 7 else 186 + (month - 7) * 30
+        return start + offset + day - 1
+
+
+def _month_length(month, year_length):
+    if month <= 6:
+        return 31
+    if month <= 11:
+        return 30
+    return year_length - 336
+
+
+@lru_cache(maxsize=4096)
+def _fallback_to_jalali(ordinal):
+    import jdatetime
+    jalali = jdatetime.date.fromgregorian(date=date_cls.fromordinal(ordinal))
+    return jalali.year, jalali.month, jalali.day
+
+
+@lru_cache(maxsize=4096)
+def _fallback_from_jalali(year, month, day):
+    import jdatetime
+    return jdatetime.date(year, month, day).togregorian().toordinal()
+
+
+_calendar = None
+
+
+def get_calendar():
+    # جدول پیش‌فرض در اولین استفاده ساخته می‌شود
+    global _calendar
+    if _calendar is None:
+        _calendar = JalaliCalendar()
+    return _calendar
+
+
+def configure(first_year=FIRST_YEAR, last_year=LAST_YEAR):
+    # ساخت دوباره جدول پیش‌فرض با بازه سال دیگر
+    global _calendar
+    _calendar = JalaliCalendar(first_year, last_year)
+    return _calendar
+
+
+def weekday(ordinal):
+    # روز هفته شمسی (شنبه=0) برای شماره روز میلادی
+    return (ordinal + 1) % 7
+
+
+def parse(date_str):
+    return int(date_str[0:4]), int(date_str[5:7]), int(date_str[8:10])
+
+
+def format_date(year, month, day, separator="-"):
+    return f"{year:04d}{separator}{month:02d}{separator}{day:02d}"
+
+
+def gregorian_to_jalali(gregorian_date):
+    year, month, day = get_calendar().to_jalali(date_cls.fromisoformat(gregorian_date).toordinal())
+    return format_date(year, month, day)
+
+
+def jalali_to_gregorian(jalali_date):
+    return date_cls.fromordinal(get_calendar().from_jalali(*parse(jalali_date))).isoformat()
+
+
+def jalali_weekday(jalali_date):
+    return weekday(get_calendar().from_jalali(*parse(jalali_date)))
+
+
+def date_to_jalali(gregorian_date):
+    return get_calendar().to_jalali(gregorian_date.toordinal())
+
+
+def validate_jalali_date(date_str):
+    if not _DATE_PATTERN.match(date_str):
+        return False
+    try:
+        get_calendar().from_jalali(*parse(date_str))
+        return True
+    except ValueError:
+        return False
@@ -0,0 +1,207 @@
+import atexit
+import json
+import os
+import threading
+from bisect import bisect_left
+from contextlib import nullcontext
+from time import perf_counter
+
+# EVENT_PROFILE=1 اندازه‌گیری‌ها را در حافظه جمع می‌کند (برای پنجره پروفایل یا export)؛ هر مقدار دیگری
+# (به‌جز 0) مسیر فایلی است که هنگام خروج پروسه خلاصه‌ها به‌صورت JSON lines در آن نوشته می‌شود
+# بدون این متغیر timer یک context manager خالی مشترک برمی‌گرداند و چیزی اندازه‌گیری نمی‌شود
+ENV_VAR = "EVENT_PROFILE"
+
+# دسته‌ها: sql پرس‌وجوهای event_db.execute با نامشان در QUERIES، صفحه‌بندی ({نما}.{نوع}.{بخش}) یا snapshot
+# (اجرا تا خواندن آخرین سطر)، worker کارهای DBWorker،
+# convert ساختن متن سطرها (تبدیل تاریخ شمسی و قالب‌بندی)، render درج و به‌روزرسانی سطرهای Treeview
+
+# مرز بالای سطل‌های هیستوگرام به میلی‌ثانیه؛ سطل آخر بی‌کران است
+BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+_OFF = nullcontext()
+
+
+class Stat:
+    # شمارنده و هیستوگرام یک عملیات نام‌دار
+    def __init__(self, category, name):
+        self.category = category
+        self.name = name
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.rows = 0
+        self.buckets = [0] * (len(BUCKETS) + 1)
+
+    def add(self, elapsed, rows):
+        self.count += 1
+        self.total += elapsed
+        self.max = max(self.max, elapsed)
+        self.rows += rows
+        self.buckets[bisect_left(BUCKETS, elapsed)] += 1
+
+    def percentile(self, fraction):
+        # مرز بالای سطلی که این صدک در آن است (برای سطل آخر، بیشینه)
+        rank = fraction * self.count
+        seen = 0
+        for index, count in enumerate(self.buckets):
+            seen += count
+            if seen >= rank and count:
+                return BUCKETS[index] if index < len(BUCKETS) else self.max
+        return self.max
+
+    def to_dict(self):
+        return {
+            "category": self.category,
+            "name": self.name,
+            "count": self.count,
+            "total_ms": round(self.total, 3),
+            "mean_ms": round(self.total / self.count, 3) if self.count else 0.0,
+            "p50_ms": self.percentile(0.5),
+            "p99_ms": self.percentile(0.99),
+            "max_ms": round(self.max, 3),
+            "rows": self.rows,
+            "buckets": dict(zip([str(bound) for bound in BUCKETS] + ["inf"], self.buckets)),
+        }
+
+
+class Profiler:
+    # رشته کارگر و رشته Tk هر دو اندازه ثبت می‌کنند، پس افزودن با قفل است
+    def __init__(self):
+        self.stats = {}
+        self._lock = threading.Lock()
+
+    def record(self, category, name, elapsed, rows=0):
+        with self._lock:
+            stat = self.stats.get((category, name))
+            if stat is None:
+                stat = self.stats[(category, name)] = Stat(category, name)
+            stat.add(elapsed, rows)
+
+    def snapshot(self):
+        # خلاصه همه عملیات‌ها، کندترین (بیشترین زمان کل) اول
+        with self._lock:
+            stats = [stat.to_dict() for stat in self.stats.values()]
+        return sorted(stats, key=lambda stat: stat["total_ms"], reverse=True)
+
+    def reset(self):
+        with self._lock:
+            self.stats.clear()
+
+    def export(self, out):
+        # یک خط JSON برای هر عملیات
+        for stat in self.snapshot():
+            out.write(json.dumps(stat, ensure_ascii=False) + "\n")
+
+
+class _Timer:
+    __slots__ = ("category", "name", "start")
+
+    def __init__(self, category, name):
+        self.category = category
+        self.name = name
+
+    def __enter__(self):
+        self.start = perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        profiler.record(self.category, self.name, (perf_counter() - self.start) * 1000)
+
+
+class TimedCursor:
+    # cursor پرس‌وجویی که خواندنش تنبل است (مثل جریان upcoming)؛ زمان اجرا و همه fetchها جمع و
+    # با تمام شدن سطرها، بسته شدن یا دور ریخته شدن cursor یک بار ثبت می‌شود
+    def __init__(self, cursor, name, sql, params):
+        self.cursor = cursor
+        self.name = name
+        self.rows = 0
+        self.done = True  # پرس‌وجویی که اجرایش خطا داده ثبت نمی‌شود
+        start = perf_counter()
+        cursor.execute(sql, params)
+        self.elapsed = perf_counter() - start
+        self.done = False
+
+    def __getattr__(self, name):
+        return getattr(self.cursor, name)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        start = perf_counter()
+        try:
+            row = next(self.cursor)
+        except StopIteration:
+            self.elapsed += perf_counter() - start
+            self._finish()
+            raise
+        self.elapsed += perf_counter() - start
+        self.rows += 1
+        return row
+
+    def fetchone(self):
+        start = perf_counter()
+        row = self.cursor.fetchone()
+        self.elapsed += perf_counter() - start
+        if row is None:
+            self._finish()
+        else:
+            self.rows += 1
+        return row
+
+    def fetchmany(self, size=None):
+        start = perf_counter()
+        rows = self.cursor.fetchmany(size) if size is not None else self.cursor.fetchmany()
+        self.elapsed += perf_counter() - start
+        self.rows += len(rows)
+        if not rows:
+            self._finish()
+        return rows
+
+    def fetchall(self):
+        start = perf_counter()
+        rows = self.cursor.fetchall()
+        self.elapsed += perf_counter() - start
+        self.rows += len(rows)
+        self._finish()
+        return rows
+
+    def close(self):
+        self._finish()
+        self.cursor.close()
+
+    def _finish(self):
+        # هنگام بسته شدن مفسر ممکن است profiler دیگر نباشد
+        if not self.done and profiler is not None:
+            self.done = True
+            profiler.record("sql", self.name, self.elapsed * 1000, self.rows)
+
+    def __del__(self):
+        self._finish()
+
+
+def _setting():
+    value = os.environ.get(ENV_VAR, "")
+    return None if value in ("", "0") else value
+
+
+def enabled():
+    return profiler is not None
+
+
+def timer(category, name):
+    # with profiling.timer("render", "weekly"): ...
+    if profiler is None:
+        return _OFF
+    return _Timer(category, name)
+
+
+def _export_at_exit(path):
+    with open(path, "w", encoding="utf-8") as out:
+        profiler.export(out)
+
+
+_value = _setting()
+profiler = Profiler() if _value is not None else None
+if _value is not None and _value != "1":
+    atexit.register(_export_at_exit, _value)
@@ -0,0 +1,84 @@
+import heapq
+from collections import namedtuple
+from datetime import date as date_cls, datetime, time as time_cls
+import event_db
+import jalali_calendar
+
+# یک وقوع مشخص از یک رویداد (event_db.Event)؛ date از نوع date میلادی و time رشته HH:MM یا None
+Occurrence = namedtuple("Occurrence", ["date", "time", "event"])
+
+WEEK = 7
+
+
+def jalali_weekday(gregorian_date):
+    # شماره روز هفته شمسی (شنبه=0) برای یک date میلادی
+    return jalali_calendar.weekday(gregorian_date.toordinal())
+
+
+def minute_of_day(now):
+    return now.hour * 60 + now.minute
+
+
+def occurrence_key(occurrence):
+    # رویدادهای بدون زمان در ابتدای روز قرار می‌گیرند (مثل NULL در ORDER BY)؛ وقوع‌های هم‌زمان به ترتیب id،
+    # پس ترتیب جریان upcoming در هر سه مسیر (جدول occurrences، بسط قاعده‌ها، نمایه ستونی) یکی و کامل است
+    return occurrence.date, occurrence.time or "", occurrence.event.id
+
+
+def first_weekly_offset(event, now):
+    # فاصله (به روز) اولین وقوع یک قاعده هفتگی از امروز؛ همان عبارت ORDER BY در upcoming.recurring
+    offset = (event.recurring_day - jalali_weekday(now)) % 7
+    if offset == 0 and event.minute is not None and event.minute < minute_of_day(now):
+        offset = 7
+    return offset
+
+
+def single_occurrences(rows):
+    for event in rows:
+        yield Occurrence(date_cls.fromordinal(event.day_num), event.time, event)
+
+
+def weekly_occurrences(rows, now):
+    # قاعده‌ها از SQL به ترتیب (فاصله اولین وقوع، ساعت، id) می‌آیند و هفته اول به همین ترتیب بسط داده می‌شود؛
+    # از هفته دوم قاعده‌های امروز که ساعتشان گذشته (فاصله 7) در ترتیب ساعت همان روز قرار می‌گیرند،
+    # پس بسط همه قاعده‌ها بدون هیپ و به‌صورت تنبل مرتب است؛ قاعده‌های تمام‌شده کنار گذاشته می‌شوند
+    today = now.toordinal()
+    rules = []
+    for event in rows:
+        offset = first_weekly_offset(event, now)
+        rules.append((today + offset % WEEK, event.end_day_num, event))
+        if offset < WEEK and (event.end_day_num is None or today + offset <= event.end_day_num):
+            yield Occurrence(date_cls.fromordinal(today + offset), event.time, event)
+    rules.sort(key=lambda rule: (rule[0], -1 if rule[2].minute is None else rule[2].minute, rule[2].id))
+
+    week = WEEK
+    while rules:
+        rules = [rule for rule in rules if rule[1] is None or rule[0] + week <= rule[1]]
+        for first, end, event in rules:
+            yield Occurrence(date_cls.fromordinal(first + week), event.time, event)
+        week += WEEK
+
+
+def upcoming(conn, now):
+    # جریان مرتب وقوع‌های آینده: تا پایان افق با یک پیمایش ایندکس جدول occurrences و بعد از آن با بسط قاعده‌ها
+    today = now.toordinal()
+    first_day, last_day = event_db.occurrence_horizon(conn)
+    if first_day <= today <= last_day:
+        rows = event_db.execute(conn, event_db.QUERIES["occurrences.upcoming"],
+                                (today, last_day, today, minute_of_day(now)))
+        for row in rows:
+            event = event_db.Event._make(row[:-1])
+            yield Occurrence(date_cls.fromordinal(row[-1]), event.time, event)
+        now = datetime.combine(date_cls.fromordinal(last_day + 1), time_cls())
+    yield from expand_upcoming(conn, now)
+
+
+def expand_upcoming(conn, now):
+    # بدون جدول occurrences: ادغام سطرهای یک‌باره (به ترتیب ایندکس) با بسط قاعده‌های هفتگی
+    today = now.toordinal()
+    current_minute = minute_of_day(now)
+    weekday = jalali_weekday(now)
+    singles = event_db.select_events(conn, event_db.QUERIES["upcoming.single"], (today, today, current_minute))
+    rules = event_db.select_events(conn, event_db.QUERIES["upcoming.recurring"],
+                                   (today, weekday, current_minute, weekday))
+    return heapq.merge(single_occurrences(singles), weekly_occurrences(rules, now), key=occurrence_key)
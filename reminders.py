@@ -0,0 +1,221 @@
+import heapq
+import itertools
+import math
+from collections import deque
+from datetime import datetime, timedelta
+from recurrence import occurrence_key
+
+# فاصله یادآوری تا شروع رویداد برای هر نوع؛ نوع‌های دیگر DEFAULT_LEAD
+LEAD_TIMES = {
+    "امتحان": timedelta(days=1),
+    "ارائه": timedelta(hours=2),
+    "جلسه": timedelta(minutes=30),
+    "کلاس": timedelta(minutes=15),
+}
+DEFAULT_LEAD = timedelta(minutes=10)
+
+# سقف فاصله تایمر؛ بعد از خواب سیستم یا تغییر ساعت، صف دوباره بررسی می‌شود
+MAX_DELAY = 60 * 60 * 1000
+
+# تعداد وقوع‌هایی که هر بار از جریان upcoming خوانده می‌شود
+CHUNK_SIZE = 100
+
+
+def occurrence_start(occurrence):
+    # رویداد بدون زمان از ابتدای روز شروع می‌شود (مثل ترتیب جریان upcoming)
+    minute = occurrence.event.minute or 0
+    return datetime.fromordinal(occurrence.date.toordinal()) + timedelta(minutes=minute)
+
+
+def read_chunk(store, start, last=None, size=CHUNK_SIZE):
+    # حداکثر size وقوع از جریان upcoming(start) که کلیدشان (occurrence_key) بعد از last است؛ جریان همین‌جا
+    # بسته می‌شود. یک SELECT نیمه‌خوانده تراکنش خواندن اتصال را باز نگه می‌دارد: نوشته‌های اتصال‌های دیگر
+    # دیده نمی‌شوند و نوشتن بعدی همان اتصال با database is locked شکست می‌خورد
+    stream = store.upcoming(start)
+    try:
+        if last is not None:
+            return list(itertools.islice(
+                itertools.dropwhile(lambda occurrence: occurrence_key(occurrence) <= last, stream), size))
+        return list(itertools.islice(stream, size))
+    finally:
+        stream.close()
+
+
+class ReminderScheduler:
+    # صف یادآوری‌ها روی جریان وقوع‌های آینده: یک هیپ کمینه بر اساس زمان سررسید
+    # و همیشه فقط یک تایمر after برای زودترین یادآوری؛ بعد از هر تغییر داده صف دوباره ساخته می‌شود
+    # timer هر شیء با after/after_cancel است (root در برنامه، ManualClock در حالت بدون رابط)
+    # وقوع‌ها دسته‌دسته (read_chunk) با کلید keyset آخرین وقوع خوانده‌شده خوانده می‌شوند و مکان‌نمایی باز نمی‌ماند
+    # submit(func، callback) اگر داده شود func(store) را جای دیگر (رشته کارگر) اجرا و callback(نتیجه) را صدا می‌زند؛
+    # بدون آن دسته‌ها همین‌جا از store خوانده می‌شوند
+    def __init__(self, store, on_reminder, timer, lead_times=None, default_lead=DEFAULT_LEAD, now=datetime.now,
+                 submit=None):
+        self.store = store
+        self.on_reminder = on_reminder
+        self.timer = timer
+        self.now = now
+        self.submit = submit or self._submit
+        self.lead_times = dict(LEAD_TIMES, **(lead_times or {}))
+        self.default_lead = default_lead
+        self.max_lead = max([default_lead] + list(self.lead_times.values()))
+        self.heap = []  # [(سررسید، شماره، وقوع)]
+        self.fired = {}  # (id، تاریخ، ساعت) -> شروع وقوع؛ برای تکرار نشدن یادآوری بعد از ساخت دوباره صف
+        self._buffer = deque()  # وقوع‌های خوانده‌شده‌ای که هنوز به هیپ نرفته‌اند
+        self._from = None  # زمان ساخت صف؛ جریان هیچ دسته‌ای زودتر از آن شروع نمی‌شود
+        self._last = None  # آخرین وقوع خوانده‌شده (کلید دسته بعدی)
+        self._exhausted = True
+        self._loading = False
+        self._advancing = False
+        self._generation = 0  # نتیجه دسته‌هایی که قبل از ساخت دوباره صف درخواست شده‌اند دور ریخته می‌شود
+        self._job = None
+        self._counter = itertools.count()
+        self._running = False
+
+    def lead(self, event):
+        return self.lead_times.get(event.event_type, self.default_lead)
+
+    def start(self):
+        if not self._running:
+            self._running = True
+            self.store.subscribe(self.on_event_changed)
+        self.reschedule()
+
+    def stop(self):
+        if self._running:
+            self._running = False
+            self.store.unsubscribe(self.on_event_changed)
+        self._cancel()
+        self._generation += 1
+        self._buffer.clear()
+        self._loading = False
+
+    def on_event_changed(self, change):
+        self.reschedule()
+
+    def reschedule(self):
+        now = self.now()
+        # جریان upcoming رویدادهای بدون ساعت امروز را هم دارد (شروعشان ابتدای روز است)، پس یادآوری‌های امروز تا پایان روز نگه داشته می‌شوند
+        today = datetime.fromordinal(now.toordinal())
+        self.fired = {key: start for key, start in self.fired.items() if start >= today}
+        self._cancel()
+        self._generation += 1
+        self.heap = []
+        self._buffer.clear()
+        self._from = now
+        self._last = None
+        self._exhausted = False
+        self._loading = False
+        self._advance()
+
+    def _submit(self, func, callback):
+        callback(func(self.store))
+
+    def _load(self):
+        # دسته بعدی از جایی که دسته قبلی تمام شد: جریان از شروع آخرین وقوع خوانده‌شده (نه زودتر از ساخت صف)
+        # باز می‌شود و وقوع‌های تا کلید آن کنار گذاشته می‌شوند
+        start, last = self._from, None
+        if self._last is not None:
+            start, last = max(self._from, occurrence_start(self._last)), occurrence_key(self._last)
+        generation, size = self._generation, CHUNK_SIZE
+        self._loading = True
+        self.submit(lambda store: read_chunk(store, start, last, size),
+                    lambda chunk: self._loaded(generation, chunk, size))
+
+    def _loaded(self, generation, chunk, size):
+        if generation != self._generation:
+            return
+        self._loading = False
+        self._exhausted = len(chunk) < size
+        if chunk:
+            self._last = chunk[-1]
+        self._buffer.extend(chunk)
+        if not self._advancing:
+            self._advance()
+
+    def _advance(self):
+        # پر کردن هیپ و تنظیم تایمر؛ اگر دسته‌ای در راه باشد (submit ناهمگام) کار بعد از رسیدن آن ادامه می‌یابد
+        self._advancing = True
+        try:
+            while not self._fill():
+                self._load()
+                if self._loading:
+                    return
+        finally:
+            self._advancing = False
+        self._arm(self.now())
+
+    def _fill(self):
+        # وقوع‌ها به ترتیب شروع خوانده می‌شوند تا وقتی شروع بعدی از سررسید سر هیپ به‌علاوه بیشترین فاصله دیرتر شود؛
+        # پس هیچ وقوع خوانده‌نشده‌ای زودتر از سر هیپ سررسید نمی‌شود و جریان تکراری‌ها تنبل می‌ماند
+        # اگر وقوع‌های خوانده‌شده پیش از این مرز تمام شوند (و جریان تمام نشده باشد) False برمی‌گرداند
+        while self._buffer:
+            occurrence = self._buffer[0]
+            start = occurrence_start(occurrence)
+            if self.heap and start - self.max_lead > self.heap[0][0]:
+                return True
+            heapq.heappush(self.heap, (start - self.lead(occurrence.event), next(self._counter), occurrence))
+            self._buffer.popleft()
+        return self._exhausted
+
+    def _fire(self):
+        self._job = None
+        now = self.now()
+        due = []
+        while self.heap and self.heap[0][0] <= now:
+            occurrence = heapq.heappop(self.heap)[2]
+            self._fill()
+            key = (occurrence.event.id, occurrence.date, occurrence.time)
+            if key not in self.fired:
+                self.fired[key] = occurrence_start(occurrence)
+                due.append(occurrence)
+        if due:
+            self.on_reminder(due)
+        if not self._loading:
+            self._advance()
+
+    def _cancel(self):
+        if self._job is not None:
+            self.timer.after_cancel(self._job)
+            self._job = None
+
+    def _arm(self, now):
+        self._cancel()
+        if self.heap:
+            delay = math.ceil((self.heap[0][0] - now) / timedelta(milliseconds=1))
+            self._job = self.timer.after(min(MAX_DELAY, max(0, delay)), self._fire)
+
+    def pending(self):
+        # زمان سررسید یادآوری بعدی، یا None
+        return self.heap[0][0] if self.heap else None
+
+
+class ManualClock:
+    # ساعت و تایمر ساختگی برای اجرای بدون رابط گرافیکی؛ زمان فقط با advance جلو می‌رود
+    def __init__(self, now):
+        self.current = now
+        self.jobs = {}
+        self._ids = itertools.count(1)
+
+    def now(self):
+        return self.current
+
+    def after(self, ms, callback):
+        job = next(self._ids)
+        self.jobs[job] = (self.current + timedelta(milliseconds=ms), callback)
+        return job
+
+    def after_cancel(self, job):
+        self.jobs.pop(job, None)
+
+    def advance(self, delta):
+        # اجرای تایمرهایی که تا پایان بازه سررسید می‌شوند، به ترتیب زمان
+        end = self.current + delta
+        while self.jobs:
+            job = min(self.jobs, key=lambda key: (self.jobs[key][0], key))
+            when, callback = self.jobs[job]
+            if when > end:
+                break
+            del self.jobs[job]
+            self.current = max(self.current, when)
+            callback()
+        self.current = end
@@ -0,0 +1,371 @@
+import argparse
+import asyncio
+import json
+import os
+import queue
+import threading
+from datetime import datetime
+from http import HTTPStatus
+from itertools import islice
+from urllib.parse import parse_qs, urlsplit
+import event_db
+import jalali_calendar
+from agenda import CALENDARS, occurrence_records, parse_day, weekly_records
+from event_store import EventStore, WEEKDAYS, FUTURE_LIMIT, SEARCH_LIMIT
+from importer import parse_record
+
+# python server.py [--db events.db] [--host 127.0.0.1] [--port 8080] [--readers 4]
+#
+# GET    /events?limit=100&from=1405-01-01   وقوع‌های آینده (از اکنون یا از ابتدای روز from)
+# GET    /nearest                            نزدیک‌ترین وقوع
+# GET    /weekly                             جدول هفتگی
+# GET    /search?q=...&type=...&limit=...     جستجوی متنی (رویدادها با توضیحات کامل، مثل GET /events/<id>)
+# GET    /events/<id>                        یک رویداد
+# POST   /events                             افزودن؛ بدنه JSON با ستون‌های CSV ورود (importer.CSV_FIELDS)
+# PUT    /events/<id>                        ویرایش با همان بدنه
+# DELETE /events/<id>                        حذف
+#
+# پارامتر calendar=jalali|gregorian تقویم تاریخ‌های وقوع‌ها را تعیین می‌کند؛ خود رویدادها (و بدنه‌ها) مثل
+# فایل CSV تاریخ شمسی دارند، پس پاسخ GET /events/<id> دوباره به‌عنوان بدنه PUT قابل ارسال است
+
+# تعداد اتصال‌های خواندنی؛ همه نوشتن‌ها از یک اتصال و به ترتیب انجام می‌شوند
+READ_POOL_SIZE = 4
+
+# تعداد پیش‌فرض وقوع‌ها در GET /events (بیشینه FUTURE_LIMIT)
+LIST_LIMIT = 100
+
+# بیشینه اندازه بدنه درخواست (بایت)
+MAX_BODY = 64 * 1024
+
+# تعداد پاسخ‌های نگه‌داشته‌شده (آدرس -> ETag و بدنه) برای پاسخ دوباره بدون پرس‌وجو
+CACHE_SIZE = 256
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _settle(future, result, error):
+    # اگر مشتری قطع شده باشد future لغو شده و نتیجه دور ریخته می‌شود
+    if future.done():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
+
+
+class StorePool:
+    # چند رشته، هر کدام با EventStore خودش، که کارها را از یک صف مشترک برمی‌دارند (مثل DBWorker؛
+    # نتیجه به‌جای after در رشته Tk به یک future در حلقه asyncio می‌رسد)
+    # اندازه 1 یعنی اجرای پشت‌سرهم همه کارها روی یک اتصال
+    def __init__(self, open_store, size, name):
+        self.requests = queue.Queue()
+        self.threads = [threading.Thread(target=self._run, args=(open_store,), name=f"{name}-{index}", daemon=True)
+                        for index in range(size)]
+        for thread in self.threads:
+            thread.start()
+
+    def run(self, func):
+        # func(store) در یکی از رشته‌ها اجرا می‌شود؛ نتیجه با await
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.requests.put((loop, future, func))
+        return future
+
+    def stop(self, timeout=2):
+        for _ in self.threads:
+            self.requests.put(None)
+        for thread in self.threads:
+            thread.join(timeout)
+
+    def _run(self, open_store):
+        store = open_store()
+        try:
+            while True:
+                request = self.requests.get()
+                if request is None:
+                    break
+                loop, future, func = request
+                try:
+                    result, error = func(store), None
+                except Exception as exception:
+                    result, error = None, exception
+                loop.call_soon_threadsafe(_settle, future, result, error)
+        finally:
+            store.close()
+
+
+def event_json(event):
+    # یک رویداد با ستون‌های CSV ورود و خروج (تاریخ‌ها شمسی)
+    recurring = event.is_recurring == 1
+    return {
+        "id": event.id,
+        "title": event.title,
+        "event_type": event.event_type,
+        "date": jalali_calendar.gregorian_to_jalali(event.date) if event.date and not recurring else "",
+        "time": event.time or "",
+        "description": event.description or "",
+        "recurring_day": WEEKDAYS[event.recurring_day] if recurring and 0 <= event.recurring_day < 7 else "",
+        "end_date": jalali_calendar.gregorian_to_jalali(event.end_date) if event.end_date and recurring else "",
+        "end_time": event.end_time or "",
+    }
+
+
+def parse_body(body):
+    # بدنه JSON به سطر آماده add_event/update_event، با همان قاعده‌های ورود از فایل
+    try:
+        record = json.loads(body or b"null")
+    except ValueError as error:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, f"بدنه JSON نامعتبر است: {error}") from error
+    if not isinstance(record, dict):
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "بدنه باید یک شیء JSON باشد")
+    try:
+        return parse_record({name: "" if value is None else str(value) for name, value in record.items()})
+    except ValueError as error:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, str(error)) from error
+
+
+def _int_param(query, name, default, maximum):
+    value = query.get(name)
+    if value is None:
+        return default
+    if not value.isdigit() or not 0 < int(value) <= maximum:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, f"{name} باید عددی بین 1 و {maximum} باشد")
+    return int(value)
+
+
+def _event_id(text):
+    if not text.isdigit():
+        raise HTTPError(HTTPStatus.NOT_FOUND, "رویداد پیدا نشد")
+    return int(text)
+
+
+def _add(row):
+    def add(store):
+        return store.get_event(store.add_event(*row))
+    return add
+
+
+def _update(event_id, row):
+    def update(store):
+        with store.transaction():
+            if store.get_event(event_id) is None:
+                return None
+            store.update_event(event_id, *row)
+        return store.get_event(event_id)
+    return update
+
+
+def _delete(event_id):
+    def delete(store):
+        with store.transaction():
+            if store.get_event(event_id) is None:
+                return False
+            store.delete_event(event_id)
+        return True
+    return delete
+
+
+class EventServer:
+    # پاسخ‌های GET با ETag = (نمونه سرور، PRAGMA data_version، زمان برای نماهای وابسته به اکنون)؛
+    # data_version با هر commit از هر اتصال دیگری (نویسنده همین سرور یا برنامه گرافیکی) عوض می‌شود،
+    # پس پاسخ 304 و پاسخ از cache بدون رفتن به استخر خواننده‌ها داده می‌شوند
+    def __init__(self, path=event_db.DB_PATH, readers=READ_POOL_SIZE):
+        # مهاجرت و به‌روزرسانی افق وقوع‌ها یک بار و قبل از باز شدن اتصال‌های استخر
+        EventStore.open(path).close()
+        self.watch = event_db.connect(path)
+        self.instance = os.urandom(4).hex()
+        self.today = datetime.now().toordinal()
+        self.cache = {}
+        self.writer = StorePool(lambda: EventStore.open(path), 1, "db-writer")
+        self.readers = StorePool(lambda: EventStore.open(path), readers, "db-reader")
+
+    def close(self):
+        self.readers.stop()
+        self.writer.stop()
+        self.watch.close()
+
+    def version(self):
+        return self.watch.execute("PRAGMA data_version").fetchone()[0]
+
+    def read_route(self, parts, query, now):
+        # (مهر زمانی، func(store)) برای یک آدرس GET؛ نتیجه None یعنی 404
+        calendar = query.get("calendar", "jalali")
+        if calendar not in CALENDARS:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, f"calendar باید یکی از {', '.join(CALENDARS)} باشد")
+        minute = now.strftime("%Y%m%d%H%M")
+        if parts == ["events"]:
+            limit = _int_param(query, "limit", LIST_LIMIT, FUTURE_LIMIT)
+            start = now
+            if "from" in query:
+                try:
+                    start = datetime.fromordinal(parse_day(query["from"], calendar))
+                except ValueError as error:
+                    raise HTTPError(HTTPStatus.BAD_REQUEST, str(error)) from error
+                minute = ""
+            return minute, lambda store: occurrence_records(islice(store.upcoming(start), limit), calendar)
+        if parts == ["nearest"]:
+            return minute, lambda store: occurrence_records(islice(store.upcoming(now), 1), calendar)
+        if parts == ["weekly"]:
+            return str(now.toordinal()), lambda store: weekly_records(store.weekly_schedule(now), calendar)
+        if parts == ["search"]:
+            text, event_type = query.get("q", ""), query.get("type")
+            limit = _int_param(query, "limit", SEARCH_LIMIT, SEARCH_LIMIT)
+            # توضیحات کامل، نه پیش‌نمایش فهرست برنامه: هر نتیجه هم مثل GET /events/<id> بدنه معتبر PUT است
+            return "", lambda store: [event_json(event) for event in store.search(text, event_type, limit, full=True)]
+        if len(parts) == 2 and parts[0] == "events":
+            event_id = _event_id(parts[1])
+
+            def get(store):
+                event = store.get_event(event_id)
+                return event_json(event) if event is not None else None
+            return "", get
+        raise HTTPError(HTTPStatus.NOT_FOUND, "آدرس پیدا نشد")
+
+    async def respond(self, method, target, headers, body):
+        # (وضعیت، بدنه، ETag) برای یک درخواست
+        url = urlsplit(target)
+        parts = [part for part in url.path.split("/") if part]
+        query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        now = datetime.now()
+        if now.toordinal() != self.today:
+            self.today = now.toordinal()
+            await self.writer.run(lambda store: store.refresh_occurrences(now))
+
+        if method == "GET":
+            stamp, func = self.read_route(parts, query, now)
+            etag = f'"{self.instance}-{self.version()}-{stamp}"'
+            if etag in (tag.strip().removeprefix("W/") for tag in headers.get("if-none-match", "").split(",")):
+                return HTTPStatus.NOT_MODIFIED, None, etag
+            cached = self.cache.get(target)
+            if cached is not None and cached[0] == etag:
+                return HTTPStatus.OK, cached[1], etag
+            result = await self.readers.run(func)
+            if result is None:
+                raise HTTPError(HTTPStatus.NOT_FOUND, "رویداد پیدا نشد")
+            payload = json.dumps(result, ensure_ascii=False).encode()
+            if len(self.cache) >= CACHE_SIZE:
+                self.cache.clear()
+            self.cache[target] = etag, payload
+            return HTTPStatus.OK, payload, etag
+
+        if parts == ["events"] and method == "POST":
+            event = await self.writer.run(_add(parse_body(body)))
+            return HTTPStatus.CREATED, json.dumps(event_json(event), ensure_ascii=False).encode(), None
+        if len(parts) == 2 and parts[0] == "events" and method in ("PUT", "DELETE"):
+            event_id = _event_id(parts[1])
+            if method == "PUT":
+                event = await self.writer.run(_update(event_id, parse_body(body)))
+                if event is None:
+                    raise HTTPError(HTTPStatus.NOT_FOUND, "رویداد پیدا نشد")
+                return HTTPStatus.OK, json.dumps(event_json(event), ensure_ascii=False).encode(), None
+            if not await self.writer.run(_delete(event_id)):
+                raise HTTPError(HTTPStatus.NOT_FOUND, "رویداد پیدا نشد")
+            return HTTPStatus.NO_CONTENT, None, None
+        raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED, f"{method} برای این آدرس پشتیبانی نمی‌شود")
+
+    async def handle(self, reader, writer):
+        # یک اتصال HTTP/1.1 با keep-alive؛ درخواست‌های هر اتصال به ترتیب پاسخ داده می‌شوند
+        try:
+            while True:
+                try:
+                    request = await read_request(reader)
+                except HTTPError as error:
+                    await send(writer, error.status, _error_body(error), None, close=True)
+                    break
+                if request is None:
+                    break
+                method, target, headers, body = request
+                try:
+                    status, payload, etag = await self.respond(method, target, headers, body)
+                except HTTPError as error:
+                    status, payload, etag = error.status, _error_body(error), None
+                except Exception as error:
+                    status, payload, etag = (HTTPStatus.INTERNAL_SERVER_ERROR,
+                                             _error_body(HTTPError(HTTPStatus.INTERNAL_SERVER_ERROR, repr(error))),
+                                             None)
+                close = headers.get("connection", "").lower() == "close"
+                await send(writer, status, payload, etag, close)
+                if close:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+def _error_body(error):
+    return json.dumps({"error": str(error)}, ensure_ascii=False).encode()
+
+
+async def read_request(reader):
+    # (متد، آدرس، سرآیندها با نام کوچک، بدنه) یا None وقتی مشتری اتصال را بسته است
+    line = await reader.readline()
+    if not line:
+        return None
+    try:
+        method, target, _ = line.decode("latin-1").split()
+    except ValueError:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "خط درخواست نامعتبر است") from None
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    length = headers.get("content-length", "0")
+    if not length.isdigit():
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "Content-Length نامعتبر است")
+    if int(length) > MAX_BODY:
+        raise HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "بدنه درخواست بیش از حد بزرگ است")
+    body = await reader.readexactly(int(length)) if int(length) else b""
+    return method.upper(), target, headers, body
+
+
+async def send(writer, status, payload, etag, close=False):
+    lines = [f"HTTP/1.1 {status.value} {status.phrase}"]
+    if payload is not None:
+        lines.append("Content-Type: application/json; charset=utf-8")
+    lines.append(f"Content-Length: {len(payload) if payload is not None else 0}")
+    if etag is not None:
+        lines.append(f"ETag: {etag}")
+        lines.append("Cache-Control: no-cache")
+    if close:
+        lines.append("Connection: close")
+    writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + (payload or b""))
+    await writer.drain()
+
+
+async def serve(path, host, port, readers, ready=None):
+    # ready(host, port) بعد از باز شدن سوکت صدا زده می‌شود (port=0 یعنی پورت آزاد دلخواه)
+    events = EventServer(path, readers)
+    server = await asyncio.start_server(events.handle, host, port)
+    try:
+        if ready is not None:
+            ready(*server.sockets[0].getsockname()[:2])
+        async with server:
+            await server.serve_forever()
+    finally:
+        events.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="سرویس HTTP/JSON محلی روی دیتابیس رویدادها")
+    parser.add_argument("--db", default=event_db.DB_PATH, help="مسیر دیتابیس")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080, help="0 یعنی یک پورت آزاد")
+    parser.add_argument("--readers", type=int, default=READ_POOL_SIZE, help="تعداد اتصال‌های خواندنی")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.db, args.host, args.port, args.readers,
+                          lambda host, port: print(f"http://{host}:{port}", flush=True)))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
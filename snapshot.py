@@ -0,0 +1,249 @@
+import bisect
+import heapq
+import json
+import threading
+from array import array
+from collections import Counter, namedtuple
+from datetime import date as date_cls
+from itertools import chain, islice
+import event_db
+import jalali_calendar
+from conflicts import MINUTES_PER_DAY
+from event_store import RELOADED
+from recurrence import Occurrence, WEEK, minute_of_day
+
+# کلید مرتب‌سازی هر سطر: شماره روز (یا روز هفته برای قاعده‌ها) * SLOT + دقیقه شروع + 1؛
+# رویداد بدون ساعت مقدار 0 دارد تا مثل NULL در ORDER BY اول روز بیاید
+SLOT = MINUTES_PER_DAY + 1
+
+# پایان قاعده‌هایی که end_date ندارند
+NO_END = date_cls.max.toordinal() + 1
+
+# اندازه بیشینه هر دسته خواندن سطرها با id؛ دسته اول یک سطر است تا نزدیک‌ترین رویداد فقط یک جستجو بخواهد
+HYDRATE_BATCH = 1000
+
+# ستون‌های فشرده: یک‌باره‌ها به ترتیب (key، id)، قاعده‌های هفتگی به ترتیب (روز هفته، ساعت، id)،
+# و کد نوع سطرهایی که در هیچ‌کدام نیستند (فقط برای شمارش نوع‌ها)
+Columns = namedtuple("Columns", ["single_keys", "single_ids", "single_types",
+                                 "rule_keys", "rule_ids", "rule_ends", "rule_types", "other_types"])
+
+_LOAD_QUERIES = {
+    "single": '''
+        SELECT day_num * ? + ifnull(minute + 1, 0) AS key, id, event_type FROM events
+        WHERE is_recurring = 0 AND day_num IS NOT NULL
+        ORDER BY key, id
+    ''',
+    "rule": '''
+        SELECT recurring_day * ? + ifnull(minute + 1, 0) AS key, id, event_type, ifnull(end_day_num, ?) FROM events
+        WHERE is_recurring = 1 AND recurring_day BETWEEN 0 AND 6
+        ORDER BY key, id
+    ''',
+    # بقیه سطرها (همان گروه other در event_key)؛ سه بخش جدا تا هر کدام روی ایندکس جستجو شود، نه پیمایش کل جدول
+    "other": '''
+        SELECT event_type FROM events WHERE is_recurring = 0 AND day_num IS NULL
+        UNION ALL
+        SELECT event_type FROM events
+        WHERE is_recurring = 1 AND (recurring_day IS NULL OR recurring_day < 0 OR recurring_day > 6)
+        UNION ALL
+        SELECT event_type FROM events
+        WHERE is_recurring IS NULL OR is_recurring < 0 OR is_recurring > 1 OR (is_recurring > 0 AND is_recurring < 1)
+    ''',
+}
+
+_HYDRATE = f"SELECT {event_db.LIST_COLUMNS} FROM events WHERE id IN (SELECT value FROM json_each(?))"
+
+
+def event_key(event):
+    # گروه و کلید یک سطر Event در ستون‌ها (همان شرط‌های upcoming.single و upcoming.recurring)
+    minute = 0 if event.minute is None else event.minute + 1
+    if event.is_recurring == 0 and event.day_num is not None:
+        return "single", event.day_num * SLOT + minute
+    if event.is_recurring == 1 and 0 <= event.recurring_day < WEEK:
+        return "rule", event.recurring_day * SLOT + minute
+    return "other", None
+
+
+class EventSnapshot:
+    # نمایه ستونی کل جدول events در حافظه برای نصب‌های پرخواندن (کیوسک)
+    # یک بار خوانده و با اعلان‌های EventStore به‌صورت افزایشی اصلاح می‌شود. هر تغییر ستون‌های گروه خودش را
+    # کپی و جایگزین می‌کند، پس رشته کارگر بدون قفل روی ستون‌هایی که برداشته کار می‌کند؛ خود سطرها با یک
+    # پرس‌وجوی id از اتصال خواننده خوانده می‌شوند
+    def __init__(self, conn):
+        self.conn = conn
+        self.types = []
+        self.type_codes = {}
+        self._lock = threading.Lock()
+        self.load()
+
+    def _type_code(self, event_type):
+        code = self.type_codes.get(event_type)
+        if code is None:
+            code = self.type_codes[event_type] = len(self.types)
+            self.types.append(event_type)
+        return code
+
+    def load(self):
+        with self._lock:
+            columns = Columns(*(array("H" if name.endswith("_types") else "q") for name in Columns._fields))
+            for key, event_id, event_type in event_db.execute(self.conn, _LOAD_QUERIES["single"], (SLOT,),
+                                                              name="snapshot.single"):
+                columns.single_keys.append(key)
+                columns.single_ids.append(event_id)
+                columns.single_types.append(self._type_code(event_type))
+            for key, event_id, event_type, end in event_db.execute(self.conn, _LOAD_QUERIES["rule"], (SLOT, NO_END),
+                                                                   name="snapshot.rule"):
+                columns.rule_keys.append(key)
+                columns.rule_ids.append(event_id)
+                columns.rule_ends.append(end)
+                columns.rule_types.append(self._type_code(event_type))
+            for event_type, in event_db.execute(self.conn, _LOAD_QUERIES["other"], name="snapshot.other"):
+                columns.other_types.append(self._type_code(event_type))
+            self.columns = columns
+
+    def __len__(self):
+        columns = self.columns
+        return len(columns.single_ids) + len(columns.rule_ids) + len(columns.other_types)
+
+    def apply(self, change):
+        # شنونده EventStore: سطر قبلی برداشته و سطر جدید در جای مرتبش گذاشته می‌شود
+        if change.kind == RELOADED:
+            self.load()
+            return
+        with self._lock:
+            columns = self.columns
+            if change.old is not None:
+                columns = self._remove(columns, change.old)
+            if change.new is not None:
+                columns = self._insert(columns, change.new)
+            self.columns = columns
+
+    def _remove(self, columns, event):
+        group, key = event_key(event)
+        code = self.type_codes[event.event_type]
+        if group == "other":
+            other = columns.other_types[:]
+            other.remove(code)
+            return columns._replace(other_types=other)
+        keys, ids = getattr(columns, group + "_keys"), getattr(columns, group + "_ids")
+        position = bisect.bisect_left(ids, event.id, bisect.bisect_left(keys, key), bisect.bisect_right(keys, key))
+        if position == len(ids) or ids[position] != event.id:
+            return columns
+        changed = {}
+        for name in self._group_fields(group):
+            column = getattr(columns, name)[:]
+            del column[position]
+            changed[name] = column
+        return columns._replace(**changed)
+
+    def _insert(self, columns, event):
+        group, key = event_key(event)
+        code = self._type_code(event.event_type)
+        if group == "other":
+            other = columns.other_types[:]
+            other.append(code)
+            return columns._replace(other_types=other)
+        keys, ids = getattr(columns, group + "_keys"), getattr(columns, group + "_ids")
+        position = bisect.bisect_left(ids, event.id, bisect.bisect_left(keys, key), bisect.bisect_right(keys, key))
+        values = {group + "_keys": key, group + "_ids": event.id, group + "_types": code,
+                  "rule_ends": NO_END if event.end_day_num is None else event.end_day_num}
+        changed = {}
+        for name in self._group_fields(group):
+            column = getattr(columns, name)[:]
+            column.insert(position, values[name])
+            changed[name] = column
+        return columns._replace(**changed)
+
+    @staticmethod
+    def _group_fields(group):
+        if group == "single":
+            return "single_keys", "single_ids", "single_types"
+        return "rule_keys", "rule_ids", "rule_ends", "rule_types"
+
+    def type_counts(self):
+        # تعداد رویدادهای هر نوع با یک پیمایش روی ستون‌های کد نوع (نه یک پیمایش برای هر نوع)
+        columns = self.columns
+        counts = Counter(chain(columns.single_types, columns.rule_types, columns.other_types))
+        return {self.types[code]: count for code, count in sorted(counts.items())}
+
+    def _single_keys(self, columns, today, current_minute):
+        # یک‌باره‌های امروز بدون ساعت، سپس همه سطرها از ساعت فعلی امروز به بعد (همان شرط upcoming.single)
+        keys, ids = columns.single_keys, columns.single_ids
+        untimed = range(bisect.bisect_left(keys, today * SLOT), bisect.bisect_left(keys, today * SLOT + 1))
+        later = range(bisect.bisect_left(keys, today * SLOT + current_minute + 1), len(keys))
+        for positions in (untimed, later):
+            for position in positions:
+                yield keys[position], ids[position]
+
+    def _rule_keys(self, columns, today, current_minute):
+        # بسط قاعده‌ها روز به روز؛ در هر روز قاعده‌های آن روز هفته از قبل به ترتیب ساعت مرتب هستند
+        keys, ids, ends = columns.rule_keys, columns.rule_ids, columns.rule_ends
+        if not keys:
+            return
+        weekday = jalali_calendar.weekday(today)
+        bounds = [bisect.bisect_left(keys, day * SLOT) for day in range(WEEK + 1)]
+        day, idle = today, 0
+        while idle < WEEK:
+            current = (weekday + day - today) % WEEK
+            positions = range(bounds[current], bounds[current + 1])
+            if day == today:
+                first = bisect.bisect_left(keys, current * SLOT + current_minute + 1, positions.start, positions.stop)
+                untimed = bisect.bisect_left(keys, current * SLOT + 1, positions.start, positions.stop)
+                positions = list(range(positions.start, untimed)) + list(range(first, positions.stop))
+            found = False
+            for position in positions:
+                if ends[position] >= day:
+                    found = True
+                    yield day * SLOT + keys[position] - current * SLOT, ids[position]
+            idle = 0 if found or day == today else idle + 1
+            day += 1
+
+    def upcoming(self, conn, now):
+        # جریان مرتب وقوع‌های آینده مانند recurrence.upcoming؛ ترتیب از ستون‌ها و سطرها دسته‌ای با id خوانده می‌شوند
+        columns = self.columns
+        today, current_minute = now.toordinal(), minute_of_day(now)
+        keys = heapq.merge(self._single_keys(columns, today, current_minute),
+                           self._rule_keys(columns, today, current_minute))
+        size = 1
+        while True:
+            batch = list(islice(keys, size))
+            if not batch:
+                return
+            events = self.fetch(conn, [event_id for _, event_id in batch])
+            for key, event_id in batch:
+                event = events.get(event_id)
+                if event is not None:
+                    yield Occurrence(date_cls.fromordinal(key // SLOT), event.time, event)
+            size = min(size * 10, HYDRATE_BATCH)
+
+    def weekly_schedule(self, conn, now, week_range):
+        # همان خروجی EventStore.weekly_schedule: قاعده‌های تمام‌نشده به ترتیب ستون‌ها و یک‌باره‌های هفته جاری
+        columns = self.columns
+        today = now.toordinal()
+        start_of_week, end_of_week = week_range
+        rule_keys, rule_ids, rule_ends = columns.rule_keys, columns.rule_ids, columns.rule_ends
+        bounds = [bisect.bisect_left(rule_keys, day * SLOT) for day in range(WEEK + 1)]
+        rules = [[rule_ids[position] for position in range(bounds[weekday], bounds[weekday + 1])
+                  if rule_ends[position] >= today] for weekday in range(WEEK)]
+        keys = columns.single_keys
+        singles = range(bisect.bisect_left(keys, start_of_week * SLOT),
+                        bisect.bisect_left(keys, (end_of_week + 1) * SLOT))
+        events = self.fetch(conn, [event_id for day in rules for event_id in day]
+                            + [columns.single_ids[position] for position in singles])
+        days = [[] for _ in range(WEEK)]
+        for weekday, day in enumerate(rules):
+            for event_id in day:
+                if event_id in events:
+                    days[weekday].append((events[event_id], 'recurring'))
+        for position in singles:
+            event = events.get(columns.single_ids[position])
+            if event is not None:
+                days[jalali_calendar.weekday(keys[position] // SLOT)].append((event, 'single'))
+        return days
+
+    @staticmethod
+    def fetch(conn, ids):
+        # سطرهای Event با این idها (با پیش‌نمایش توضیحات)؛ سطرهایی که در این فاصله حذف شده‌اند نیستند
+        if not ids:
+            return {}
+        return {event.id: event for event in event_db.select_events(conn, _HYDRATE, (json.dumps(ids),),
+                                                                    name="snapshot.hydrate")}
@@ -0,0 +1,66 @@
+import importlib.util
+import os
+import sys
+import time
+import pytest
+
+# ماژول‌های برنامه در ریشه مخزن‌اند (بسته نیستند)
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import event_db
+from event_store import EventStore
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "events.db")
+
+
+@pytest.fixture
+def store(db_path):
+    store = EventStore.open(db_path)
+    yield store
+    store.close()
+
+
+def load_app():
+    # نام فایل برنامه کامل فاصله و پرانتز دارد و با import معمولی بارگذاری نمی‌شود
+    spec = importlib.util.spec_from_file_location("event_scheduler_app", os.path.join(ROOT, "event_scheduler (9).py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.EventSchedulerApp
+
+
+def pump(root, done, timeout=5):
+    # اجرای حلقه رویداد Tk تا برقرار شدن done
+    deadline = time.monotonic() + timeout
+    while not done():
+        assert time.monotonic() < deadline, "کار رشته کارگر تمام نشد"
+        root.update()
+        time.sleep(0.005)
+
+
+@pytest.fixture
+def root():
+    tk = pytest.importorskip("tkinter")
+    try:
+        root = tk.Tk()
+    except tk.TclError:
+        pytest.skip("نمایشگری برای Tk در دسترس نیست")
+    root.withdraw()
+    return root
+
+
+@pytest.fixture
+def app(root, db_path, monkeypatch):
+    # برنامه با پنجره نقاشی‌شده و نماهایی که هنوز بارگذاری نشده‌اند (پیش از finish_startup)
+    monkeypatch.setattr(event_db, "DB_PATH", db_path)
+    app = load_app()(root)
+    app.start()
+    yield app
+    app.on_close()
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "benchmark: بنچمارک کوچک با سقف زمان هر عملیات (pytest -m benchmark)")
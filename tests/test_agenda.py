@@ -0,0 +1,72 @@
+import hashlib
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+from datetime import date, timedelta
+import event_db
+import jalali_calendar
+from conftest import ROOT
+from event_store import EventStore
+
+# اجرای agenda در یک مفسر جدا؛ بعد از فرمان هیچ ماژول tkinter نباید بارگذاری شده باشد
+SCRIPT = '''
+import sys
+import agenda
+code = agenda.main(sys.argv[1:])
+loaded = sorted(name for name in sys.modules if name.split(".")[0] in ("tkinter", "_tkinter"))
+assert not loaded, loaded
+sys.exit(code)
+'''
+
+
+def agenda(*argv):
+    return subprocess.run([sys.executable, "-c", SCRIPT, *argv], cwd=ROOT, capture_output=True, text=True,
+                          encoding="utf-8", env=dict(os.environ, PYTHONIOENCODING="utf-8"))
+
+
+def digest(path):
+    with open(path, "rb") as file:
+        return hashlib.sha256(file.read()).hexdigest()
+
+
+def test_cli_reads_without_tkinter_or_writes(db_path):
+    tomorrow = date.today() + timedelta(days=1)
+    store = EventStore.open(db_path)
+    store.add_event("امتحان", "امتحان", tomorrow.isoformat(), "09:30")
+    store.add_event("کلاس", "کلاس", None, "10:00", "", True, jalali_calendar.weekday(tomorrow.toordinal()))
+    store.checkpoint("TRUNCATE")
+    store.close()
+    before = digest(db_path)
+
+    result = agenda("--db", db_path, "--json", "--calendar", "gregorian", "future", "--limit", "2")
+    assert result.returncode == 0, result.stderr
+    assert [(record["title"], record["date"]) for record in json.loads(result.stdout)] == [
+        ("امتحان", tomorrow.isoformat()), ("کلاس", tomorrow.isoformat())]
+
+    result = agenda("--db", db_path, "weekly")
+    assert result.returncode == 0, result.stderr
+    assert "کلاس" in result.stdout
+    assert digest(db_path) == before
+
+
+def test_cli_reports_missing_database(tmp_path):
+    result = agenda("--db", str(tmp_path / "missing.db"), "nearest")
+    assert result.returncode == 2
+    assert not (tmp_path / "missing.db").exists()
+
+
+def test_cli_does_not_migrate(db_path):
+    conn = sqlite3.connect(db_path)
+    event_db.MIGRATIONS[0](conn)
+    conn.execute("PRAGMA user_version = 1")
+    conn.commit()
+    conn.close()
+
+    result = agenda("--db", db_path, "nearest")
+    assert result.returncode == 2
+    assert "(1)" in result.stderr
+    conn = sqlite3.connect(db_path)
+    assert event_db.get_version(conn) == 1
+    conn.close()
@@ -0,0 +1,80 @@
+import math
+import os
+import statistics
+from datetime import datetime
+import pytest
+import benchmark
+from event_store import EventStore
+
+pytestmark = pytest.mark.benchmark
+
+# اندازه‌های دیتابیس مصنوعی؛ در CI دو اندازه کوچک، و BENCHMARK_SIZES=10000,100000,1000000 برای بنچمارک کامل
+SIZES = [int(size) for size in os.environ.get("BENCHMARK_SIZES", "1000,10000").split(",")]
+REPEAT = 5
+
+# عملیاتی که فقط روی ایندکس کار می‌کنند و با ده برابر شدن جدول باید تقریباً ثابت بمانند
+FLAT = ("add", "update", "delete", "nearest")
+FLAT_RATIO = 3
+
+# هر مقایسه از سریع‌ترین اجرای هر اندازه استفاده می‌کند (کمترین اثر بار دستگاه) و این مقدار (میلی‌ثانیه)
+# به سقف اضافه می‌شود تا نوسان عملیات زیر میلی‌ثانیه نسبت را نشکند
+SLACK_MS = 2.0
+
+READS = sorted(benchmark.read_operations(None, None, 0))
+
+
+@pytest.fixture(scope="module")
+def directory(tmp_path_factory):
+    return str(tmp_path_factory.mktemp("benchmark"))
+
+
+@pytest.fixture(scope="module")
+def results(directory):
+    return {size: benchmark.run(size, REPEAT, directory) for size in SIZES}
+
+
+def fastest(results, size, name):
+    return min(results[size][name])
+
+
+def test_every_operation_is_reported(results):
+    names = set(results[SIZES[0]])
+    assert set(READS) <= names
+    for size in SIZES:
+        assert set(results[size]) == names
+        for name, timings in results[size].items():
+            assert len(timings) == (1 if name == "snapshot.load" else REPEAT), name
+            assert all(math.isfinite(value) and value >= 0 for value in timings), name
+
+
+@pytest.mark.parametrize("name", FLAT)
+def test_indexed_operation_stays_flat(results, name):
+    for small, large in zip(SIZES, SIZES[1:]):
+        assert fastest(results, large, name) <= FLAT_RATIO * fastest(results, small, name) + SLACK_MS, (small, large)
+
+
+@pytest.fixture(scope="module", params=SIZES, ids=str)
+def sized_store(request, directory):
+    store = EventStore.open(benchmark.prepared(directory, "events", request.param))
+    yield request.param, store
+    store.close()
+
+
+@pytest.mark.parametrize("name", READS)
+def test_read(sized_store, name, request):
+    # با pytest-benchmark: جدول زمان هر خواندن برای هر اندازه (pytest -m benchmark --benchmark-only)
+    pytest.importorskip("pytest_benchmark")
+    size, store = sized_store
+    request.getfixturevalue("benchmark")(benchmark.read_operations(store, datetime.now(), size)[name])
+
+
+def test_batched_wal_writes_beat_rollback_journal(tmp_path):
+    rates = benchmark.run_writes(200, str(tmp_path))
+    assert set(rates) == {name for name, pragmas, grouped in benchmark.WRITE_MODES}
+    assert rates["wal+batched"] > rates["delete+full"]
+
+
+def test_calendar_table_beats_jdatetime():
+    pytest.importorskip("jdatetime")
+    timings = benchmark.run_calendar(2000, REPEAT)
+    assert statistics.median(timings["table"]) < statistics.median(timings["jdatetime"])
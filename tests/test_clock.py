@@ -0,0 +1,39 @@
+from datetime import datetime, timedelta
+from clock import Clock, format_time
+from reminders import ManualClock
+
+# یک ثانیه و سه‌چهارم پیش از نوروز 1404
+NOW = datetime(2025, 3, 20, 23, 59, 58, 250000)
+
+
+def test_ticks_align_to_seconds_across_midnight():
+    timer = ManualClock(NOW)
+    ticks = []
+
+    def on_tick(now):
+        ticks.append((now, clock.update(now), clock.jalali, clock.weekday))
+        # کار on_tick زمان می‌برد؛ تیک بعدی باز هم در شروع ثانیه است
+        timer.current += timedelta(milliseconds=300)
+
+    clock = Clock(timer, on_tick, timer.now)
+    clock.start()
+    clock.start()
+    timer.advance(timedelta(seconds=4))
+
+    assert [format_time(now) for now, *_ in ticks] == ["23:59:58", "23:59:59", "00:00:00", "00:00:01", "00:00:02"]
+    assert all(now.microsecond == 0 for now, *_ in ticks[1:])
+    assert [changed for _, changed, _, _ in ticks] == [True, False, True, False, False]
+    assert [(jalali, weekday) for _, _, jalali, weekday in ticks] == \
+        [("1403-12-30", 5)] * 2 + [("1404-01-01", 6)] * 3
+
+
+def test_stop_cancels_next_tick():
+    timer = ManualClock(NOW)
+    ticks = []
+    clock = Clock(timer, ticks.append, timer.now)
+    clock.start()
+    timer.advance(timedelta(seconds=1))
+    clock.stop()
+    timer.advance(timedelta(seconds=5))
+    assert len(ticks) == 2
+    assert timer.jobs == {}
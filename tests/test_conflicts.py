@@ -0,0 +1,153 @@
+from datetime import date, datetime, timedelta
+from itertools import combinations
+import pytest
+import conflicts
+import event_db
+import jalali_calendar
+from conflicts import FreeSlot
+
+TODAY = date(2025, 3, 3)
+
+
+def day(offset):
+    return TODAY + timedelta(days=offset)
+
+
+def weekday(offset):
+    return jalali_calendar.weekday(day(offset).toordinal())
+
+
+@pytest.fixture
+def planner(store):
+    store.refresh_occurrences(datetime.combine(TODAY, datetime.min.time()))
+    return store
+
+
+def found(planner, **event):
+    return [row.id for row in conflicts.event_conflicts(planner.conn, TODAY.toordinal(), **event)]
+
+
+def test_single_against_single(planner):
+    exam = planner.add_event("امتحان", "امتحان", day(2).isoformat(), "10:00", end_time="11:00")
+    planner.add_event("بی‌ساعت", "تمرین", day(2).isoformat())
+
+    assert found(planner, date=day(2).isoformat(), time="10:30", end_time="12:00") == [exam]
+    assert found(planner, date=day(2).isoformat(), time="09:00", end_time="10:30") == [exam]
+    # لبه‌های مماس هم‌پوشانی نیستند
+    assert found(planner, date=day(2).isoformat(), time="11:00", end_time="12:00") == []
+    assert found(planner, date=day(2).isoformat(), time="09:00", end_time="10:00") == []
+    # بدون ساعت پایان یک دقیقه است
+    assert found(planner, date=day(2).isoformat(), time="10:59") == [exam]
+    assert found(planner, date=day(3).isoformat(), time="10:30") == []
+    assert found(planner, date=day(2).isoformat()) == []
+    assert found(planner, date=day(2).isoformat(), time="10:30", exclude_id=exam) == []
+
+
+def test_single_against_weekly_rule(planner):
+    rule = planner.add_event("کلاس", "کلاس", None, "10:00", "", True, weekday(2), day(16).isoformat(), "12:00")
+
+    assert found(planner, date=day(2).isoformat(), time="11:00") == [rule]
+    assert found(planner, date=day(16).isoformat(), time="11:00") == [rule]
+    assert found(planner, date=day(23).isoformat(), time="11:00") == []
+    assert found(planner, date=day(3).isoformat(), time="11:00") == []
+    assert found(planner, date=day(2).isoformat(), time="12:00") == []
+
+
+def test_weekly_rule_against_singles_and_rules(planner):
+    past = planner.add_event("گذشته", "امتحان", day(-5).isoformat(), "10:00", end_time="11:00")
+    future = planner.add_event("آینده", "امتحان", day(9).isoformat(), "10:00", end_time="11:00")
+    rule = planner.add_event("کلاس", "کلاس", None, "10:30", "", True, weekday(2), None, "11:30")
+    assert weekday(-5) == weekday(9) == weekday(2)
+
+    # فقط وقوع‌های از امروز به بعد؛ قاعده‌ها (بدون تاریخ) پیش از رویدادهای یک‌باره می‌آیند
+    assert found(planner, is_recurring=True, recurring_day=weekday(2), time="10:00", end_time="10:45") == \
+        [rule, future]
+    assert past not in found(planner, is_recurring=True, recurring_day=weekday(2), time="10:00")
+    # قاعده‌ای که پیش از رویداد آینده تمام می‌شود
+    assert found(planner, is_recurring=True, recurring_day=weekday(2), time="10:00", end_time="10:45",
+                 end_date=day(3).isoformat()) == [rule]
+    assert found(planner, is_recurring=True, recurring_day=weekday(2), time="10:00",
+                 end_date=day(-1).isoformat()) == []
+    assert found(planner, is_recurring=True, recurring_day=weekday(3), time="10:00") == []
+    assert found(planner, is_recurring=True, recurring_day=weekday(2), time="11:30") == []
+
+
+@pytest.fixture
+def mixed(planner):
+    planner.add_event("امتحان", "امتحان", day(2).isoformat(), "10:00", end_time="11:00")
+    planner.add_event("مماس", "تمرین", day(2).isoformat(), "11:00", end_time="12:00")
+    planner.add_event("طولانی", "سایر", day(2).isoformat(), "09:00", end_time="12:30")
+    planner.add_event("بی‌ساعت", "تمرین", day(2).isoformat())
+    planner.add_event("دور", "امتحان", day(300).isoformat(), "10:30", end_time="10:45")
+    planner.add_event("کلاس", "کلاس", None, "10:30", "", True, weekday(2), day(400).isoformat(), "11:30")
+    planner.add_event("ورزش", "سایر", None, "11:15", "", True, weekday(4), None, "13:00")
+    planner.add_event("ورزش صبح", "سایر", None, "12:00", "", True, weekday(4), None, "12:30")
+    return planner
+
+
+def brute_force(store, first, last):
+    # هم‌پوشانی هر جفت وقوع ساعت‌دار در هر روز
+    events = [store.get_event(event_id) for event_id, in store.conn.execute("SELECT id FROM events")]
+    pairs = set()
+    for ordinal in range(first.toordinal(), last.toordinal() + 1):
+        today = [event for event in events if event.minute is not None and (
+            event.day_num == ordinal if not event.is_recurring else
+            event.recurring_day == jalali_calendar.weekday(ordinal)
+            and (event.end_day_num is None or ordinal <= event.end_day_num))]
+        for one, other in combinations(today, 2):
+            if one.minute < other.end_minute and other.minute < one.end_minute:
+                pairs.add((date.fromordinal(ordinal), frozenset((one.id, other.id))))
+    return pairs
+
+
+@pytest.mark.parametrize("first, last", [(0, 20), (-10, 200), (290, 310), (390, 410)])
+def test_range_conflicts_match_brute_force(mixed, first, last):
+    found = conflicts.range_conflicts(mixed.conn, day(first).toordinal(), day(last).toordinal())
+    assert {(conflict.date, frozenset((conflict.first.id, conflict.second.id))) for conflict in found} == \
+        brute_force(mixed, day(first), day(last))
+    assert all(conflict.first.minute <= conflict.second.minute for conflict in found)
+    # هر جفت وقتی برگردانده می‌شود که رویداد دوم شروع شود
+    assert found == sorted(found, key=lambda conflict: (conflict.date, conflict.second.minute))
+
+
+def test_range_conflicts_inside_and_outside_horizon_agree(mixed):
+    first, last = day(0).toordinal(), day(30).toordinal()
+    inside = conflicts.range_conflicts(mixed.conn, first, last)
+    mixed.conn.execute("UPDATE occurrence_horizon SET first_day = 0, last_day = -1")
+    assert conflicts.range_conflicts(mixed.conn, first, last) == inside
+
+
+def slots(store, first, last, duration, **options):
+    return [(slot.date, conflicts.format_minute(slot.start), conflicts.format_minute(slot.end))
+            for slot in conflicts.free_slots(store.conn, day(first).toordinal(), day(last).toordinal(), duration,
+                                             **options)]
+
+
+def test_free_slots_in_working_hours(planner):
+    planner.add_event("یک", "کلاس", day(1).isoformat(), "09:00", end_time="10:00")
+    planner.add_event("مماس", "کلاس", day(1).isoformat(), "10:00", end_time="11:00")
+    planner.add_event("درون", "تمرین", day(1).isoformat(), "10:15", end_time="10:30")
+    planner.add_event("عصر", "امتحان", day(1).isoformat(), "13:00", end_time="13:30")
+    planner.add_event("بی‌ساعت", "تمرین", day(1).isoformat())
+    hours = {"day_start": 8 * 60, "day_end": 18 * 60}
+
+    assert slots(planner, 1, 1, 60, **hours) == [
+        (day(1), "08:00", "09:00"), (day(1), "11:00", "13:00"), (day(1), "13:30", "18:00")]
+    assert slots(planner, 1, 1, 90, **hours) == [(day(1), "11:00", "13:00"), (day(1), "13:30", "18:00")]
+    assert slots(planner, 1, 1, 90, exclude_types=("امتحان",), **hours) == [(day(1), "11:00", "18:00")]
+    assert slots(planner, 1, 2, 60, limit=2, **hours) == [(day(1), "08:00", "09:00"), (day(1), "11:00", "13:00")]
+    assert slots(planner, 1, 1, 60, not_before=day(1).toordinal() * 1440 + 12 * 60, **hours) == [
+        (day(1), "12:00", "13:00"), (day(1), "13:30", "18:00")]
+
+
+def test_free_slots_across_days(planner):
+    planner.add_event("شب", "سایر", day(0).isoformat(), "22:00", end_time="23:59")
+    planner.add_event("کلاس", "کلاس", None, "00:00", "", True, weekday(1), None, "08:00")
+
+    assert slots(planner, 0, 2, 30) == [
+        (day(0), "00:00", "22:00"), (day(1), "08:00", "24:00"), (day(2), "00:00", "24:00")]
+    assert slots(planner, 0, 2, 1) == [
+        (day(0), "00:00", "22:00"), (day(0), "23:59", "24:00"), (day(1), "08:00", "24:00"),
+        (day(2), "00:00", "24:00")]
+    assert slots(planner, 0, 13, 30, weekdays={weekday(1)}) == [
+        (day(1), "08:00", "24:00"), (day(8), "08:00", "24:00")]
@@ -0,0 +1,93 @@
+import sqlite3
+from datetime import date
+import event_db
+from event_db import Event
+
+
+def test_nearest_timed_reads_full_named_row(store):
+    description = "جزوه " * 40
+    store.add_event("کار بدون ساعت", "تمرین", "2025-03-01")
+    timed = store.add_event("امتحان فیزیک", "امتحان", "2025-03-02", "09:30", description)
+    store.add_event("امتحان شیمی", "امتحان", "2025-03-03", "08:00")
+
+    row = event_db.select_events(store.conn, event_db.QUERIES["nearest.timed"],
+                                 (date(2025, 3, 1).toordinal(),)).fetchone()
+    assert isinstance(row, Event)
+    assert (row.id, row.title, row.time) == (timed, "امتحان فیزیک", "09:30")
+    assert row.description == description
+
+
+# جدول نسخه ساده (بدون تکرار، با date و time اجباری) و جدول نسخه 2 (با تکرار، بدون ستون‌های عددی)
+SIMPLE_TABLE = '''
+    CREATE TABLE events (id INTEGER PRIMARY KEY AUTOINCREMENT, title TEXT NOT NULL, event_type TEXT NOT NULL,
+                         date TEXT NOT NULL, time TEXT NOT NULL, description TEXT)
+'''
+VERSION_2_TABLE = '''
+    CREATE TABLE events (id INTEGER PRIMARY KEY AUTOINCREMENT, title TEXT NOT NULL, event_type TEXT NOT NULL,
+                         date TEXT, time TEXT, description TEXT, is_recurring INTEGER DEFAULT 0,
+                         recurring_day INTEGER DEFAULT -1, end_date TEXT)
+'''
+
+
+def legacy(path, table, version, rows):
+    conn = sqlite3.connect(path)
+    conn.execute(table)
+    columns = "id, title, event_type, date, time, description" + (
+        ", is_recurring, recurring_day, end_date" if version else "")
+    conn.executemany(f"INSERT INTO events ({columns}) VALUES ({', '.join('?' * len(rows[0]))})", rows)
+    conn.execute(f"PRAGMA user_version = {version}")
+    conn.commit()
+    conn.close()
+
+
+def numbers(conn):
+    return conn.execute('''
+        SELECT id, day_num, minute, end_day_num, end_minute, weekday FROM events ORDER BY id
+    ''').fetchall()
+
+
+def test_simple_schema_gets_numeric_columns(db_path):
+    legacy(db_path, SIMPLE_TABLE, 0, [
+        (3, "امتحان", "امتحان", "2025-03-02", "09:30", "فصل ۱"),
+        (7, "خراب", "سایر", "نامعتبر", "بدون ساعت", None),
+    ])
+    conn = event_db.connect(db_path)
+    assert event_db.get_version(conn) == event_db.SCHEMA_VERSION
+    day = date(2025, 3, 2).toordinal()
+    assert numbers(conn) == [(3, day, 9 * 60 + 30, None, 9 * 60 + 31, (day + 1) % 7),
+                             (7, None, None, None, None, None)]
+    assert conn.execute("SELECT is_recurring FROM events WHERE id = 3").fetchone() == (0,)
+    assert [row[0] for row in conn.execute("SELECT rowid FROM events_fts WHERE events_fts MATCH 'فصل'")] == [3]
+    conn.close()
+
+
+def test_version_2_schema_gets_numeric_columns(db_path):
+    legacy(db_path, VERSION_2_TABLE, 2, [
+        (1, "امتحان", "امتحان", "2025-03-02", "09:30", "", 0, -1, None),
+        (2, "کلاس", "کلاس", None, "16:00", "", 1, 4, "2025-06-30"),
+        (3, "ورزش", "سایر", None, None, "", 1, 6, None),
+    ])
+    conn = event_db.connect(db_path)
+    day, end = date(2025, 3, 2).toordinal(), date(2025, 6, 30).toordinal()
+    assert numbers(conn) == [(1, day, 9 * 60 + 30, None, 9 * 60 + 31, (day + 1) % 7),
+                             (2, None, 16 * 60, end, 16 * 60 + 1, 4),
+                             (3, None, None, None, None, 6)]
+
+    # ستون‌های محاسبه‌شده: STORED (hidden=3) و VIRTUAL (hidden=2)
+    hidden = {row[1]: row[6] for row in conn.execute("PRAGMA table_xinfo(events)")}
+    assert {name: hidden[name] for name in ("day_num", "minute", "end_day_num", "end_minute", "weekday")} == \
+        {"day_num": 3, "minute": 3, "end_day_num": 3, "end_minute": 2, "weekday": 2}
+    indexes = {row[1] for row in conn.execute("PRAGMA index_list(events)")}
+    assert {"idx_events_day", "idx_events_rule", "idx_events_page", "idx_events_slot"} <= indexes
+    assert not {"idx_events_single", "idx_events_recurring"} & indexes
+
+    # ستون‌ها با هر تغییر متن دوباره محاسبه می‌شوند
+    conn.execute("UPDATE events SET date = '2025-03-03', time = '10:05', end_time = '11:00' WHERE id = 1")
+    assert numbers(conn)[0] == (1, day + 1, 10 * 60 + 5, None, 11 * 60, (day + 2) % 7)
+    conn.commit()
+    conn.close()
+
+    # باز کردن دوباره چیزی را تغییر نمی‌دهد
+    conn = event_db.connect(db_path)
+    assert numbers(conn)[0] == (1, day + 1, 10 * 60 + 5, None, 11 * 60, (day + 2) % 7)
+    conn.close()
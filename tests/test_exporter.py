@@ -0,0 +1,51 @@
+import hashlib
+import io
+import sqlite3
+import sys
+import pytest
+import event_db
+import exporter
+
+
+def test_recurring_row_without_day_is_skipped(store):
+    store.add_event("کلاس", "کلاس", None, "10:00", is_recurring=True, recurring_day=2)
+    # سطر قدیمی تکراری با recurring_day خالی
+    store.conn.execute("INSERT INTO events (title, event_type, is_recurring, recurring_day) VALUES ('ناقص', 'سایر', 1, NULL)")
+    store.conn.commit()
+
+    out = io.StringIO()
+    assert exporter.export_events(store.conn, out, "csv") == 1
+    assert "ناقص" not in out.getvalue()
+
+
+def digest(path):
+    with open(path, "rb") as file:
+        return hashlib.sha256(file.read()).hexdigest()
+
+
+def test_export_does_not_write_to_database(store, db_path, tmp_path, monkeypatch):
+    store.add_event("امتحان", "امتحان", "2025-03-02", "09:30")
+    store.checkpoint("TRUNCATE")
+    store.close()
+    before = digest(db_path)
+
+    output = tmp_path / "backup.csv"
+    monkeypatch.setattr(sys, "argv", ["exporter.py", str(output), "--db", db_path])
+    exporter.main()
+    assert "امتحان" in output.read_text(encoding="utf-8")
+    assert digest(db_path) == before
+
+
+def test_export_does_not_migrate_old_schema(db_path, tmp_path, monkeypatch):
+    conn = sqlite3.connect(db_path)
+    event_db.MIGRATIONS[0](conn)
+    conn.execute("PRAGMA user_version = 1")
+    conn.commit()
+    conn.close()
+
+    monkeypatch.setattr(sys, "argv", ["exporter.py", str(tmp_path / "backup.ics"), "--db", db_path])
+    with pytest.raises(RuntimeError):
+        exporter.main()
+    conn = sqlite3.connect(db_path)
+    assert event_db.get_version(conn) == 1
+    conn.close()
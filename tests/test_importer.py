@@ -0,0 +1,88 @@
+import io
+import pytest
+import exporter
+import importer
+from event_store import EventStore
+
+COLUMNS = "title, event_type, date, time, description, is_recurring, recurring_day, end_date, end_time"
+
+
+def rows(store):
+    return store.conn.execute(f"SELECT {COLUMNS} FROM events ORDER BY title").fetchall()
+
+
+@pytest.fixture
+def target(tmp_path):
+    store = EventStore.open(str(tmp_path / "target.db"))
+    yield store
+    store.close()
+
+
+@pytest.fixture
+def filled(store):
+    store.add_event("امتحان فیزیک", "امتحان", "2025-03-02", "09:30", "فصل ۳، \"حرکت\"\nو تمرین‌ها", end_time="11:00")
+    store.add_event("تمرین بدون ساعت", "تمرین", "2025-03-05")
+    store.add_event("کلاس زبان", "کلاس", None, "16:00", "", True, 2, "2025-06-30", "17:30")
+    store.add_event("ورزش", "سایر", None, None, "", True, 6)
+    return store
+
+
+@pytest.mark.parametrize("fmt, read", [("csv", importer.read_csv), ("ics", importer.read_ics)])
+def test_round_trip(filled, target, fmt, read):
+    out = io.StringIO(newline="")
+    assert exporter.export_events(filled.conn, out, fmt, batch_size=2) == 4
+
+    report = importer.import_records(target, read(io.StringIO(out.getvalue(), newline="")))
+    assert report == (4, [])
+    assert rows(target) == rows(filled)
+
+
+def ics(*lines):
+    return io.StringIO("\r\n".join(["BEGIN:VCALENDAR", "BEGIN:VEVENT", *lines, "END:VEVENT", "END:VCALENDAR"]))
+
+
+def test_rrule_byday_until_maps_to_weekly_rules(target):
+    report = importer.import_records(target, importer.read_ics(ics(
+        "SUMMARY:کلاس", "CATEGORIES:کلاس", "DTSTART:20250303T100000", "DTEND:20250303T113000",
+        "RRULE:FREQ=WEEKLY;BYDAY=MO,WE;UNTIL=20250331")))
+    assert report == (2, [])
+    assert rows(target) == [
+        ("کلاس", "کلاس", None, "10:00", "", 1, 2, "2025-03-31", "11:30"),
+        ("کلاس", "کلاس", None, "10:00", "", 1, 4, "2025-03-31", "11:30"),
+    ]
+
+
+def test_rrule_without_byday_uses_start_weekday_and_count(target):
+    # 2025-03-07 جمعه است؛ COUNT=3 یعنی دو هفته بعد از شروع
+    importer.import_records(target, importer.read_ics(ics(
+        "SUMMARY:ورزش", "DTSTART;VALUE=DATE:20250307", "RRULE:FREQ=WEEKLY;COUNT=3")))
+    assert rows(target) == [("ورزش", "سایر", None, None, "", 1, 6, "2025-03-21", None)]
+
+
+def test_unsupported_rrule_is_reported(target):
+    report = importer.import_records(target, importer.read_ics(ics(
+        "SUMMARY:روزانه", "DTSTART:20250303T100000", "RRULE:FREQ=DAILY")))
+    assert report.imported == 0
+    assert report.errors == [(2, "قاعده تکرار پشتیبانی نمی‌شود: FREQ=DAILY")]
+
+
+def test_errors_are_reported_per_line(target):
+    lines = io.StringIO(
+        "title,event_type,date,time,description,recurring_day,end_date,end_time\n"
+        "امتحان,امتحان,1403-12-12,09:30,,,,\n"
+        "بد,امتحان,1403-13-01,,,,,\n"
+        "\"چند\nخطی\",تمرین,1403-12-14,,\"سطر\nدوم\",,,\n"
+        "ساعت,تمرین,1403-12-15,25:00,,,,\n"
+        ",تمرین,1403-12-16,,,,,\n"
+        "کلاس,کلاس,,10:00,,هشتم,,\n"
+        "پایان,کلاس,,10:00,,دوشنبه,,09:00\n")
+    report = importer.import_records(target, importer.read_csv(lines))
+    assert report.imported == 2
+    assert report.errors == [
+        (3, "فرمت تاریخ نامعتبر است!"),
+        (7, "فرمت ساعت نامعتبر است!"),
+        (8, "عنوان و نوع لازم است!"),
+        (9, "روز تکرار نامعتبر است: هشتم"),
+        (10, "ساعت پایان باید بعد از ساعت شروع باشد!"),
+    ]
+    assert [row[0] for row in rows(target)] == ["امتحان", "چند\nخطی"]
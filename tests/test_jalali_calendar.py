@@ -0,0 +1,76 @@
+from datetime import date
+import jdatetime
+import pytest
+import jalali_calendar
+from jalali_calendar import JalaliCalendar
+
+
+def reference(ordinal):
+    jalali = jdatetime.date.fromgregorian(date=date.fromordinal(ordinal))
+    return jalali.year, jalali.month, jalali.day
+
+
+@pytest.fixture(scope="module")
+def table():
+    return JalaliCalendar(1400, 1402)
+
+
+def test_table_matches_jdatetime_around_bounds(table):
+    first = jdatetime.date(1400, 1, 1).togregorian().toordinal()
+    last = jdatetime.date(1403, 1, 1).togregorian().toordinal() - 1
+    for ordinal in range(first - 40, last + 41):
+        expected = reference(ordinal)
+        assert table.to_jalali(ordinal) == expected, ordinal
+        assert table.from_jalali(*expected) == ordinal, expected
+
+
+def test_default_bounds():
+    calendar = jalali_calendar.get_calendar()
+    first = jdatetime.date(1300, 1, 1).togregorian().toordinal()
+    last = jdatetime.date(1501, 1, 1).togregorian().toordinal() - 1
+    assert calendar.to_jalali(first) == (1300, 1, 1)
+    assert calendar.to_jalali(first - 1) == reference(first - 1)
+    assert calendar.to_jalali(last) == reference(last)
+    assert calendar.to_jalali(last + 1) == (1501, 1, 1)
+    assert calendar.from_jalali(1299, 12, 29) == jdatetime.date(1299, 12, 29).togregorian().toordinal()
+    assert calendar.from_jalali(1501, 1, 1) == last + 1
+
+
+def test_outside_table_goes_through_cache(table):
+    ordinal = date(1990, 5, 17).toordinal()
+    jalali_calendar._fallback_to_jalali.cache_clear()
+    jalali_calendar._fallback_from_jalali.cache_clear()
+
+    assert table.to_jalali(ordinal) == table.to_jalali(ordinal) == reference(ordinal)
+    assert table.from_jalali(1369, 2, 27) == table.from_jalali(1369, 2, 27) == ordinal
+    assert jalali_calendar._fallback_to_jalali.cache_info()[:2] == (1, 1)
+    assert jalali_calendar._fallback_from_jalali.cache_info()[:2] == (1, 1)
+
+    # داخل جدول کش دست نمی‌خورد
+    table.to_jalali(date(2022, 5, 17).toordinal())
+    table.from_jalali(1401, 2, 27)
+    assert jalali_calendar._fallback_to_jalali.cache_info()[:2] == (1, 1)
+    assert jalali_calendar._fallback_from_jalali.cache_info()[:2] == (1, 1)
+
+
+@pytest.mark.parametrize("text, valid", [
+    ("1403-12-30", True),   # کبیسه
+    ("1402-12-30", False),
+    ("1402-12-29", True),
+    ("1403-07-31", False),
+    ("1403-06-31", True),
+    ("1403-13-01", False),
+    ("1403-00-10", False),
+    ("1403-01-00", False),
+    ("1403-1-01", False),
+    ("1250-12-30", False),  # بیرون از جدول: خطای jdatetime
+])
+def test_validate_jalali_date(text, valid):
+    assert jalali_calendar.validate_jalali_date(text) is valid
+
+
+def test_string_helpers():
+    assert jalali_calendar.jalali_to_gregorian("1404-01-01") == "2025-03-21"
+    assert jalali_calendar.gregorian_to_jalali("2025-03-20") == "1403-12-30"
+    # اول فروردین 1404 جمعه است (شنبه=0)
+    assert jalali_calendar.jalali_weekday("1404-01-01") == 6
@@ -0,0 +1,88 @@
+from datetime import date, datetime, timedelta
+import pytest
+import event_db
+import jalali_calendar
+
+TODAY = date(2025, 3, 5)
+
+
+def at(day):
+    return datetime.combine(day, datetime.min.time())
+
+
+@pytest.fixture
+def horizon(store):
+    store.refresh_occurrences(at(TODAY))
+    return store
+
+
+def stored(store, event_id):
+    return store.conn.execute("SELECT day_num, minute FROM occurrences WHERE event_id = ? ORDER BY day_num",
+                              (event_id,)).fetchall()
+
+
+def expected(store, event_id):
+    # شمارش مستقیم روزهای افق
+    event = store.get_event(event_id)
+    if not event.is_recurring:
+        return [(event.day_num, event.minute)]
+    first_day, last_day = event_db.occurrence_horizon(store.conn)
+    return [(day, event.minute) for day in range(first_day, last_day + 1)
+            if jalali_calendar.weekday(day) == event.recurring_day
+            and (event.end_day_num is None or day <= event.end_day_num)]
+
+
+def test_horizon_covers_past_week_and_future_weeks(horizon):
+    today = TODAY.toordinal()
+    assert event_db.occurrence_horizon(horizon.conn) == (today - event_db.HORIZON_PAST_DAYS,
+                                                         today + event_db.HORIZON_WEEKS * 7)
+    assert not horizon.refresh_occurrences(at(TODAY) + timedelta(hours=20))
+
+
+def test_insert_update_delete_rule(horizon):
+    rule = horizon.add_event("کلاس", "کلاس", None, "10:00", "", True, 2)
+    assert stored(horizon, rule) == expected(horizon, rule)
+    assert len(stored(horizon, rule)) == event_db.HORIZON_WEEKS + 1
+
+    horizon.update_event(rule, "کلاس", "کلاس", None, "16:30", "", True, 5)
+    assert stored(horizon, rule) == expected(horizon, rule)
+    assert {minute for _, minute in stored(horizon, rule)} == {16 * 60 + 30}
+
+    # قاعده به رویداد یک‌باره تبدیل می‌شود
+    horizon.update_event(rule, "کلاس", "کلاس", "2025-03-10", "08:00")
+    assert stored(horizon, rule) == [(date(2025, 3, 10).toordinal(), 8 * 60)]
+
+    horizon.update_event(rule, "کلاس", "کلاس", None, None, "", True, 0)
+    assert stored(horizon, rule) == expected(horizon, rule)
+    assert {minute for _, minute in stored(horizon, rule)} == {None}
+
+    horizon.delete_event(rule)
+    assert stored(horizon, rule) == []
+
+
+def test_end_date_truncates_rule(horizon):
+    rule = horizon.add_event("کلاس", "کلاس", None, "10:00", "", True, 2, "2025-03-31")
+    assert stored(horizon, rule) == expected(horizon, rule)
+    assert max(day for day, _ in stored(horizon, rule)) == date(2025, 3, 31).toordinal()
+
+    horizon.update_event(rule, "کلاس", "کلاس", None, "10:00", "", True, 2, "2025-05-05")
+    assert max(day for day, _ in stored(horizon, rule)) == date(2025, 5, 5).toordinal()
+
+    # پایان پیش از افق: هیچ وقوعی
+    horizon.update_event(rule, "کلاس", "کلاس", None, "10:00", "", True, 2, "2025-01-01")
+    assert stored(horizon, rule) == []
+
+
+@pytest.mark.parametrize("days", [1, 10, 400, -3, -400])
+def test_horizon_follows_now(horizon, days):
+    rules = [horizon.add_event("کلاس", "کلاس", None, "10:00", "", True, 2),
+             horizon.add_event("ورزش", "سایر", None, None, "", True, 6, "2025-04-20")]
+    single = horizon.add_event("امتحان", "امتحان", "2025-03-01", "09:00")
+
+    today = TODAY + timedelta(days=days)
+    assert horizon.refresh_occurrences(at(today))
+    assert event_db.occurrence_horizon(horizon.conn)[0] == today.toordinal() - event_db.HORIZON_PAST_DAYS
+    for rule in rules:
+        assert stored(horizon, rule) == expected(horizon, rule)
+    # یک‌باره‌ها به افق بستگی ندارند
+    assert stored(horizon, single) == [(date(2025, 3, 1).toordinal(), 9 * 60)]
@@ -0,0 +1,23 @@
+from datetime import date, timedelta
+import profiling
+
+
+def test_paging_and_lookups_are_recorded(store, monkeypatch):
+    monkeypatch.setattr(profiling, "profiler", profiling.Profiler())
+    day = date.today()
+    event_ids = [store.add_event(f"تمرین {n}", "تمرین", (day + timedelta(days=n)).isoformat(), "10:00")
+                 for n in range(30)]
+    store.add_event("کلاس", "کلاس", None, "08:00", is_recurring=True, recurring_day=0)
+
+    pages = store.all_pages()
+    rows = pages.fetch_after(None, 10)
+    pages.fetch_after(rows[-1][0], 10)
+    pages.fetch_before(None, 5)
+    pages.rows_at(20, 5)
+    pages.locate(store.get_event(event_ids[0]))
+    store.get_description(event_ids[0])
+    store.type_counts()
+
+    names = {stat["name"] for stat in profiling.profiler.snapshot() if stat["category"] == "sql"}
+    assert {"all.count.0", "all.count.1", "all.first.0", "all.first.1", "all.after.1", "all.last.1",
+            "all.skip.1", "all.locate.0", "all.locate.1", "event", "event.description", "type_counts"} <= names
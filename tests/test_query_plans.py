@@ -0,0 +1,65 @@
+import sqlite3
+import pytest
+import event_db
+import snapshot
+from event_store import EventStore, PAGE_QUERIES
+
+# جدول نسخه پایه (پیش از مهاجرت‌ها)
+LEGACY_TABLE = '''
+    CREATE TABLE events (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        title TEXT NOT NULL,
+        event_type TEXT NOT NULL,
+        date TEXT,
+        time TEXT,
+        description TEXT,
+        is_recurring INTEGER DEFAULT 0,
+        recurring_day INTEGER DEFAULT -1,
+        end_date TEXT
+    )
+'''
+
+
+@pytest.fixture(params=["fresh", "legacy"])
+def migrated(request, db_path):
+    # دیتابیس تازه، یا دیتابیس نسخه پایه که هنگام باز شدن همه مهاجرت‌ها رویش اجرا می‌شوند
+    if request.param == "legacy":
+        conn = sqlite3.connect(db_path)
+        conn.execute(LEGACY_TABLE)
+        conn.execute("INSERT INTO events (title, event_type, date, time) VALUES ('قدیمی', 'سایر', '2024-01-01', '10:00')")
+        conn.commit()
+        conn.close()
+    store = EventStore.open(db_path)
+    yield store
+    store.close()
+
+
+def test_view_queries_use_indexes(migrated):
+    assert event_db.get_version(migrated.conn) == event_db.SCHEMA_VERSION
+    assert event_db.check_query_plans(migrated.conn) == {}
+
+
+def test_page_queries_use_indexes_for_every_segment(migrated):
+    pages = migrated.all_pages()
+    queries = pages.queries()
+    assert len(queries) == len(PAGE_QUERIES) * len(pages.segments)
+    assert event_db.check_query_plans(migrated.conn, queries) == {}
+
+
+def test_snapshot_load_queries_use_indexes(migrated):
+    queries = {f"snapshot.{name}": sql for name, sql in snapshot._LOAD_QUERIES.items()}
+    assert event_db.check_query_plans(migrated.conn, queries) == {}
+
+
+def test_full_index_walk_is_reported(store):
+    # پیمایش ایندکس غیرپوشا هم همه سطرها را از جدول می‌خواند
+    problems = event_db.check_query_plans(store.conn, {
+        "walk": "SELECT title FROM events ORDER BY is_recurring DESC, day_num, minute",
+        "covering": "SELECT COUNT(*) FROM events WHERE is_recurring = 1",
+    })
+    assert list(problems) == ["walk"]
+    assert any("USING INDEX" in detail for detail in problems["walk"])
+
+
+def test_full_reads_are_exempt_only_by_name(store):
+    assert event_db.check_query_plans(store.conn, event_db.QUERIES, full_reads=()).keys() == event_db.FULL_READS
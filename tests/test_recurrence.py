@@ -0,0 +1,81 @@
+from datetime import date, datetime, timedelta
+from itertools import islice
+import pytest
+import recurrence
+from recurrence import jalali_weekday
+
+NOW = datetime(2025, 3, 5, 13, 30)
+
+
+def day(offset):
+    return (NOW + timedelta(days=offset)).date().isoformat()
+
+
+@pytest.fixture
+def timeline(store):
+    weekday = jalali_weekday(NOW)
+    # یک‌باره‌ها: امروز گذشته، امروز بدون ساعت، امروز بعداً، و روزهای بعد هم‌ساعت با قاعده‌ها
+    store.add_event("امروز صبح", "کلاس", day(0), "10:00")
+    store.add_event("امروز بدون ساعت", "تمرین", day(0))
+    store.add_event("امروز عصر", "جلسه", day(0), "14:00")
+    store.add_event("فردا", "جلسه", day(1), "15:00")
+    store.add_event("هفته بعد", "امتحان", day(7), "09:00")
+    store.add_event("دیروز", "سایر", day(-1), "15:00")
+    # قاعده‌ها در روزهای مختلف هفته؛ امروزِ گذشته، امروزِ بعداً، بدون ساعت و با تاریخ پایان
+    store.add_event("قاعده امروز صبح", "کلاس", time="09:00", is_recurring=True, recurring_day=weekday)
+    store.add_event("قاعده امروز عصر", "کلاس", time="15:00", is_recurring=True, recurring_day=weekday)
+    store.add_event("قاعده فردا", "کلاس", time="15:00", is_recurring=True, recurring_day=(weekday + 1) % 7)
+    store.add_event("قاعده بدون ساعت", "تمرین", is_recurring=True, recurring_day=(weekday + 3) % 7)
+    store.add_event("قاعده تمام‌شونده", "جلسه", time="09:00", is_recurring=True, recurring_day=(weekday + 2) % 7,
+                    end_date=day(16))
+    store.add_event("قاعده تمام‌شده", "جلسه", time="09:00", is_recurring=True, recurring_day=(weekday + 4) % 7,
+                    end_date=day(-2))
+    return store
+
+
+def expected(store, count):
+    # همه وقوع‌ها روز به روز، مستقل از هر دو مسیر
+    events = store.all_events()
+    today, current = NOW.toordinal(), recurrence.minute_of_day(NOW)
+    found = []
+    for day_num in range(today, today + 400):
+        for event in events:
+            if event.is_recurring:
+                if jalali_weekday(date.fromordinal(day_num)) != event.recurring_day:
+                    continue
+                if event.end_day_num is not None and day_num > event.end_day_num:
+                    continue
+            elif event.day_num != day_num:
+                continue
+            if day_num == today and event.minute is not None and event.minute < current:
+                continue
+            found.append((date.fromordinal(day_num), event.time, event.id))
+    found.sort(key=lambda item: (item[0], item[1] or "", item[2]))
+    return found[:count]
+
+
+def keys(stream, count):
+    return [(occurrence.date, occurrence.time, occurrence.event.id) for occurrence in islice(stream, count)]
+
+
+def test_occurrence_table_and_expansion_agree(timeline):
+    timeline.refresh_occurrences(NOW)
+    assert recurrence.event_db.occurrence_horizon(timeline.conn)[0] <= NOW.toordinal()
+    # بیش از افق جدول occurrences (HORIZON_WEEKS هفته)، تا جایی که مسیر اول هم به بسط قاعده‌ها برسد
+    count = 4 * (recurrence.event_db.HORIZON_WEEKS + 10)
+    table = keys(recurrence.upcoming(timeline.conn, NOW), count)
+    expanded = keys(recurrence.expand_upcoming(timeline.conn, NOW), count)
+    assert table == expanded == expected(timeline, count)
+
+
+def test_first_occurrences_in_order(timeline):
+    titles = [occurrence.event.title for occurrence in islice(recurrence.expand_upcoming(timeline.conn, NOW), 6)]
+    assert titles == ["امروز بدون ساعت", "امروز عصر", "قاعده امروز عصر", "فردا", "قاعده فردا",
+                      "قاعده تمام‌شونده"]
+
+
+def test_ended_rules_stop(timeline):
+    ended = {event.id for event in timeline.all_events() if event.title in ("قاعده تمام‌شونده", "قاعده تمام‌شده")}
+    dates = [occurrence.date.isoformat() for occurrence in islice(recurrence.expand_upcoming(timeline.conn, NOW), 200)
+             if occurrence.event.id in ended]
+    assert dates == [day(2), day(9), day(16)]
@@ -0,0 +1,107 @@
+from datetime import datetime, timedelta
+import pytest
+import reminders
+from event_store import EventStore
+from recurrence import jalali_weekday
+from reminders import ReminderScheduler, ManualClock
+
+NOW = datetime(2020, 3, 7, 9, 0)
+
+
+@pytest.fixture(params=["occurrences", "expand"])
+def timeline(request, store):
+    # دو مسیر جریان upcoming: افق جدول occurrences روی NOW، یا افق روی امروز واقعی (بسط قاعده‌ها)
+    if request.param == "occurrences":
+        store.refresh_occurrences(NOW)
+    return store
+
+
+def day(offset):
+    return (NOW + timedelta(days=offset)).date().isoformat()
+
+
+def start_scheduler(store, clock, fired):
+    scheduler = ReminderScheduler(store, lambda due: fired.extend((clock.now(), occurrence) for occurrence in due),
+                                  clock, now=clock.now)
+    scheduler.start()
+    return scheduler
+
+
+def test_other_connections_writes_are_seen_and_next_add_succeeds(timeline, db_path, monkeypatch):
+    monkeypatch.setattr(reminders, "CHUNK_SIZE", 5)
+    for offset in range(30):
+        timeline.add_event(f"جلسه {offset}", "جلسه", day(offset), "10:00")
+    timeline.add_event("کلاس", "کلاس", time="08:00", is_recurring=True, recurring_day=2)
+    clock = ManualClock(NOW)
+    scheduler = start_scheduler(timeline, clock, [])
+
+    other = EventStore.open(db_path)
+    other.add_event("از اتصال دیگر", "سایر", day(40), "12:00")
+    other.close()
+    assert timeline.conn.execute("SELECT COUNT(*) FROM events").fetchone()[0] == 32
+    timeline.add_event("بعد از نوشتن دیگری", "سایر", day(41), "12:00")
+    scheduler.stop()
+
+
+def test_lead_times_are_honored(timeline):
+    exam = timeline.add_event("امتحان", "امتحان", day(2), "10:00")
+    meeting = timeline.add_event("جلسه", "جلسه", day(1), "10:00")
+    other = timeline.add_event("کار", "سایر", day(1), "11:00")
+    clock = ManualClock(NOW)
+    fired = []
+    start_scheduler(timeline, clock, fired)
+
+    clock.advance(timedelta(days=3))
+    assert [(when, occurrence.event.id) for when, occurrence in fired] == [
+        (datetime(2020, 3, 8, 9, 30), meeting),
+        (datetime(2020, 3, 8, 10, 0), exam),
+        (datetime(2020, 3, 8, 10, 50), other),
+    ]
+
+
+def test_one_timer_and_reschedule_on_mutation(timeline):
+    later = timeline.add_event("جلسه", "جلسه", day(3), "10:00")
+    clock = ManualClock(NOW)
+    scheduler = start_scheduler(timeline, clock, [])
+    assert len(clock.jobs) == 1
+    assert scheduler.pending() == datetime(2020, 3, 10, 9, 30)
+
+    sooner = timeline.add_event("کلاس", "کلاس", day(1), "08:00")
+    assert len(clock.jobs) == 1
+    assert scheduler.pending() == datetime(2020, 3, 8, 7, 45)
+
+    timeline.update_event(sooner, "کلاس", "کلاس", day(2), "08:00")
+    assert scheduler.pending() == datetime(2020, 3, 9, 7, 45)
+    timeline.delete_event(sooner)
+    timeline.delete_event(later)
+    assert scheduler.pending() is None
+    assert not clock.jobs
+
+    scheduler.stop()
+    timeline.add_event("بعد از توقف", "سایر", day(1), "10:00")
+    assert not clock.jobs
+
+
+def test_no_occurrence_fires_twice_across_chunks_and_reschedules(timeline, monkeypatch):
+    monkeypatch.setattr(reminders, "CHUNK_SIZE", 3)
+    for index in range(10):
+        timeline.add_event(f"هم‌زمان {index}", "سایر", day(1), "10:00")
+    for index in range(3):
+        timeline.add_event(f"بدون ساعت {index}", "تمرین", day(0))
+    rule = timeline.add_event("هفتگی", "سایر", time="12:00", is_recurring=True, recurring_day=jalali_weekday(NOW))
+    clock = ManualClock(NOW)
+    fired = []
+    start_scheduler(timeline, clock, fired)
+
+    for step in range(60):
+        clock.advance(timedelta(hours=6))
+        # هر تغییر صف را از نو می‌سازد
+        timeline.add_event(f"دور {step}", "سایر", day(400 + step), "10:00")
+
+    keys = [(occurrence.event.id, occurrence.date) for _, occurrence in fired]
+    assert len(keys) == len(set(keys))
+    end = clock.now()
+    weekly = [(NOW + timedelta(days=offset)).date() for offset in range(0, 16, 7)]
+    weekly = [date for date in weekly if datetime(date.year, date.month, date.day, 11, 50) <= end]
+    assert sorted(date for event_id, date in keys if event_id == rule) == weekly
+    assert len(keys) == 13 + len(weekly)
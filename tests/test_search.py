@@ -0,0 +1,70 @@
+import sqlite3
+import pytest
+import event_db
+
+
+def ids(store, text, event_type=None):
+    return sorted(event.id for event in store.search(text, event_type))
+
+
+def check(store):
+    # خطای SQLite اگر ایندکس با جدول events همگام نباشد (rank = 1: مقایسه با جدول محتوا)
+    store.conn.execute("INSERT INTO events_fts (events_fts, rank) VALUES ('integrity-check', 1)")
+
+
+def test_index_follows_insert_update_delete(store):
+    exam = store.add_event("امتحان فیزیک", "امتحان", "2025-03-02", "09:30", "فصل سوم: حرکت")
+    lab = store.add_event("آزمایشگاه فیزیک", "تمرین", "2025-03-03", None, "گزارش آونگ")
+    check(store)
+    assert ids(store, "فیزیک") == [exam, lab]
+    assert ids(store, "فیز") == [exam, lab]
+    assert ids(store, "فیزیک حرکت") == [exam]
+    assert ids(store, "آونگ") == [lab]
+    assert ids(store, "فیزیک", "تمرین") == [lab]
+
+    store.update_event(exam, "امتحان شیمی", "امتحان", "2025-03-02", "09:30", "فصل سوم: اسید")
+    check(store)
+    assert ids(store, "فیزیک") == [lab]
+    assert ids(store, "شیمی اسید") == [exam]
+    assert ids(store, "حرکت") == []
+
+    # تغییر ستون‌های غیرمتنی ایندکس را دست نمی‌زند
+    store.update_event(lab, "آزمایشگاه فیزیک", "تمرین", "2025-04-01", "14:00", "گزارش آونگ")
+    check(store)
+    assert ids(store, "آونگ") == [lab]
+
+    store.delete_event(lab)
+    check(store)
+    assert ids(store, "فیزیک") == []
+    assert ids(store, "آونگ") == []
+
+
+def test_bulk_insert_is_indexed(store):
+    store.add_events([(f"جلسه {n}", "جلسه", "2025-03-02", None, "صورت‌جلسه", 0, -1, None, None) for n in range(50)])
+    check(store)
+    assert len(store.search("صورت‌جلسه", limit=100)) == 50
+
+
+def test_rebuild_after_manual_changes(store):
+    event = store.add_event("امتحان فیزیک", "امتحان", "2025-03-02", "09:30")
+    # تغییر دستی بدون تریگر
+    store.conn.execute("DROP TRIGGER events_fts_update")
+    store.conn.execute("UPDATE events SET title = 'امتحان شیمی' WHERE id = ?", (event,))
+    store.conn.commit()
+    assert ids(store, "شیمی") == []
+    with pytest.raises(sqlite3.DatabaseError):
+        check(store)
+
+    event_db.rebuild_search_index(store.conn)
+    store.conn.commit()
+    check(store)
+    assert ids(store, "شیمی") == [event]
+    assert ids(store, "فیزیک") == []
+
+
+def test_query_text_is_neutralised(store):
+    event = store.add_event('کتاب "بوف کور"', "تحقیق", "2025-03-02")
+    assert ids(store, '"بوف') == [event]
+    assert ids(store, "کور OR NOT") == []
+    assert ids(store, '"') == []
+    assert ids(store, "   ") == []
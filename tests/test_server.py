@@ -0,0 +1,31 @@
+import asyncio
+import json
+from urllib.parse import quote
+from server import EventServer
+
+DESCRIPTION = " ".join(["فصل سوم جزوه ریاضی و تمرین‌های آخر فصل"] * 10)
+
+
+def request(server, method, target, body=None):
+    async def send():
+        status, payload, etag = await server.respond(
+            method, target, {}, json.dumps(body, ensure_ascii=False).encode() if body is not None else b"")
+        return status, json.loads(payload) if payload else None
+    return asyncio.run(send())
+
+
+def test_search_hit_round_trips_through_put(store, db_path):
+    event_id = store.add_event("امتحان ریاضی", "امتحان", "2025-03-02", "09:00", DESCRIPTION)
+    server = EventServer(db_path, readers=1)
+    try:
+        status, hits = request(server, "GET", "/search?q=" + quote("ریاضی"))
+        assert status == 200
+        hit = next(hit for hit in hits if hit["id"] == event_id)
+        assert hit["description"] == DESCRIPTION
+
+        status, event = request(server, "PUT", f"/events/{event_id}", dict(hit, title="امتحان ریاضی ۲"))
+        assert status == 200
+        assert event["description"] == DESCRIPTION
+    finally:
+        server.close()
+    assert store.get_description(event_id) == DESCRIPTION
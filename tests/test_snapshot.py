@@ -0,0 +1,93 @@
+from datetime import date, datetime, timedelta
+from itertools import islice
+import pytest
+import jalali_calendar
+
+NOW = datetime(2025, 3, 5, 13, 30)
+
+
+def day(offset):
+    return (NOW.date() + timedelta(days=offset)).isoformat()
+
+
+def weekday(offset):
+    return jalali_calendar.weekday(NOW.toordinal() + offset)
+
+
+@pytest.fixture
+def snapped(store):
+    store.refresh_occurrences(NOW)
+    store.add_event("گذشته", "امتحان", day(-1), "09:00")
+    store.add_event("امروز صبح", "امتحان", day(0), "08:00")
+    store.add_event("امروز بی‌ساعت", "تمرین", day(0))
+    store.add_event("امروز عصر", "کلاس", day(0), "17:00", end_time="18:00")
+    store.add_event("هم‌زمان", "جلسه", day(0), "17:00")
+    store.add_event("دور", "ارائه", day(400), "10:00")
+    store.add_event("کلاس", "کلاس", None, "13:00", "", True, weekday(0))
+    store.add_event("کلاس عصر", "کلاس", None, "17:00", "", True, weekday(0), day(20))
+    store.add_event("ورزش", "سایر", None, None, "", True, weekday(3))
+    store.add_event("تمام‌شده", "سایر", None, "10:00", "", True, weekday(1), day(-10))
+    # سطر ناقص که فقط در شمارش نوع‌ها می‌آید
+    store.conn.execute("INSERT INTO events (title, event_type, is_recurring, recurring_day) VALUES ('ناقص', 'تحقیق', 1, NULL)")
+    store.conn.commit()
+    store.enable_snapshot()
+    return store
+
+
+def through_sql(store, read):
+    snapshot, store.snapshot = store.snapshot, None
+    try:
+        return read()
+    finally:
+        store.snapshot = snapshot
+
+
+def upcoming(store, count=200):
+    return [(occurrence.date, occurrence.time, occurrence.event.id)
+            for occurrence in islice(store.upcoming(NOW), count)]
+
+
+def weekly(store):
+    return [[(event.id, kind) for event, kind in day] for day in store.weekly_schedule(NOW)]
+
+
+def assert_same(store):
+    assert upcoming(store) == through_sql(store, lambda: upcoming(store))
+    assert weekly(store) == through_sql(store, lambda: weekly(store))
+    assert store.type_counts() == through_sql(store, store.type_counts)
+
+
+def test_snapshot_matches_sql(snapped):
+    assert_same(snapped)
+    assert snapped.type_counts()["کلاس"] == 3
+    assert snapped.type_counts()["تحقیق"] == 1
+
+
+def test_snapshot_follows_mutations(snapped):
+    added = snapped.add_event("تازه", "جلسه", day(1), "07:00")
+    assert_same(snapped)
+    snapped.update_event(added, "تازه", "جلسه", None, "12:00", "", True, weekday(2))
+    assert_same(snapped)
+    snapped.delete_event(added)
+    assert_same(snapped)
+    snapped.add_events([("گروهی", "تحقیق", day(2), "11:00", "", 0, -1, None, None)] * 3)
+    assert_same(snapped)
+
+
+def test_mutation_copies_columns(snapped):
+    before = snapped.snapshot.columns
+    saved = [column.tolist() for column in before]
+    stream = snapped.snapshot.upcoming(snapped.conn, NOW)
+    assert next(stream).event.title == "امروز بی‌ساعت"
+
+    snapped.add_event("تازه", "جلسه", day(0), "14:00")
+    snapped.delete_event(snapped.conn.execute("SELECT id FROM events WHERE title = 'هم‌زمان'").fetchone()[0])
+    snapped.delete_event(snapped.add_event("موقت", "سایر", None, "15:00", "", True, weekday(0)))
+
+    assert snapped.snapshot.columns is not before
+    assert [column.tolist() for column in before] == saved
+    # جریانی که پیش از تغییرها شروع شده روی ستون‌های قبلی ادامه می‌دهد؛ سطر حذف‌شده فقط جا می‌افتد
+    assert [occurrence.event.title for occurrence in islice(stream, 2)] == ["امروز عصر", "کلاس عصر"]
+    assert [occurrence.event.title for occurrence in islice(snapped.upcoming(NOW), 3)] == \
+        ["امروز بی‌ساعت", "تازه", "امروز عصر"]
+    assert_same(snapped)
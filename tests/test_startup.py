@@ -0,0 +1,16 @@
+from datetime import date, timedelta
+from conftest import pump
+
+
+def test_change_before_finish_startup_is_picked_up_by_deferred_load(app, root):
+    # پنجره نقاشی شده ولی نماهای کارها و جدول هفتگی هنوز بارگذاری نشده‌اند
+    assert app.reminders is None
+    assert app.task_keys is None and app.week is None
+
+    tomorrow = (date.today() + timedelta(days=1)).isoformat()
+    event_id = app.store.add_event("تحویل تمرین", "تمرین", tomorrow)
+    assert app.task_keys is None and app.week is None
+
+    pump(root, lambda: app.task_keys is not None and app.week is not None)
+    assert (tomorrow, event_id) in app.task_keys
+    assert app.tasks_tree.exists(str(event_id))
@@ -0,0 +1,148 @@
+from datetime import datetime
+from itertools import count
+import pytest
+import jalali_calendar
+from conftest import load_app
+from event_store import weekly_slot, weekly_sort_key
+
+# چهارشنبه؛ هفته جاری دوشنبه 2025-03-03 تا یکشنبه 2025-03-09
+NOW = datetime(2025, 3, 5, 13, 30)
+MONDAY = jalali_calendar.weekday(NOW.toordinal() - 2)
+WEDNESDAY = jalali_calendar.weekday(NOW.toordinal())
+
+
+@pytest.fixture
+def week_store(store):
+    store.add_event("دوشنبه صبح", "کلاس", "2025-03-03", "10:00", end_time="11:00")
+    store.add_event("دوشنبه بی‌ساعت", "تمرین", "2025-03-03")
+    store.add_event("چهارشنبه", "امتحان", "2025-03-05", "09:00")
+    store.add_event("یکشنبه", "جلسه", "2025-03-09", "08:00")
+    store.add_event("هفته قبل", "جلسه", "2025-03-02", "08:00")
+    store.add_event("هفته بعد", "جلسه", "2025-03-10", "08:00")
+    store.add_event("کلاس دوشنبه", "کلاس", None, "08:00", "", True, MONDAY)
+    store.add_event("ورزش دوشنبه", "سایر", None, None, "", True, MONDAY)
+    store.add_event("کلاس دوشنبه عصر", "کلاس", None, "16:00", "", True, MONDAY, "2025-03-20")
+    store.add_event("تمام‌شده", "کلاس", None, "12:00", "", True, WEDNESDAY, "2025-03-04")
+    return store
+
+
+def entries(week):
+    return [[(event.id, kind) for event, kind in day] for day in week]
+
+
+def test_weekly_schedule_matches_slots(week_store):
+    events = [week_store.get_event(event_id) for event_id, in week_store.conn.execute("SELECT id FROM events")]
+    expected = [[] for _ in range(7)]
+    for event in events:
+        slot = weekly_slot(event, NOW)
+        if slot is not None:
+            expected[slot[0]].append((event, slot[1]))
+    expected = [sorted(day, key=weekly_sort_key) for day in expected]
+
+    week = week_store.weekly_schedule(NOW)
+    assert entries(week) == entries(expected)
+    assert [event.title for event, _ in week[MONDAY]] == [
+        "ورزش دوشنبه", "کلاس دوشنبه", "کلاس دوشنبه عصر", "دوشنبه بی‌ساعت", "دوشنبه صبح"]
+    assert week[WEDNESDAY] and all(event.title != "تمام‌شده" for event, _ in week[WEDNESDAY])
+
+
+class Tree:
+    # جایگزین Treeview که سطرها و به‌روزرسانی‌های item را نگه می‌دارد
+    def __init__(self):
+        self.rows = {}
+        self.order = []
+        self.updated = []
+        self._ids = count(1)
+
+    def get_children(self):
+        return tuple(self.order)
+
+    def insert(self, parent, index, values=(), tags=()):
+        iid = f"I{next(self._ids)}"
+        self.order.append(iid)
+        self.rows[iid] = (list(values), tuple(tags))
+        return iid
+
+    def item(self, iid, values=(), tags=()):
+        self.rows[iid] = (list(values), tuple(tags))
+        self.updated.append(self.order.index(iid))
+
+    def delete(self, *iids):
+        for iid in iids:
+            self.order.remove(iid)
+            del self.rows[iid]
+
+    def tag_configure(self, *args, **options):
+        pass
+
+    def grid(self):
+        return [self.rows[iid] for iid in self.order]
+
+
+@pytest.fixture(scope="module")
+def app_class():
+    pytest.importorskip("tkinter")
+    return load_app()
+
+
+def grid_view(app_class, week):
+    # فقط متدهای جدول هفتگی، بدون ساختن پنجره
+    app = app_class.__new__(app_class)
+    app.current_datetime = NOW
+    app.schedule_tree = Tree()
+    app.show_weekly_schedule(week)
+    return app
+
+
+def test_grid_rows_hold_nth_entry_of_every_day(week_store, app_class):
+    week = week_store.weekly_schedule(NOW)
+    grid = grid_view(app_class, week).schedule_tree.grid()
+    assert len(grid) == max(len(day) for day in week)
+    for i, (values, tags) in enumerate(grid):
+        assert len(values) == 7
+        for day, value in zip(week, values):
+            if i < len(day):
+                assert value.startswith(day[i][0].title + " (")
+            else:
+                assert value == ("بدون رویداد" if not day and i == 0 else "")
+        kinds = {day[i][1] for day in week if i < len(day)}
+        assert tags == (tuple(kinds) if len(kinds) == 1 else ())
+
+
+def test_patched_grid_matches_fresh_build(week_store, app_class):
+    app = grid_view(app_class, week_store.weekly_schedule(NOW))
+    week_store.subscribe(app.patch_weekly_schedule)
+    items = list(app.week_items)
+
+    def matches_fresh():
+        fresh = grid_view(app_class, week_store.weekly_schedule(NOW))
+        assert app.schedule_tree.grid() == fresh.schedule_tree.grid()
+        assert entries(app.week) == entries(fresh.week)
+        # سطرها فقط از انتها اضافه یا حذف می‌شوند؛ شناسه سطرهای باقی‌مانده عوض نمی‌شود
+        shared = min(len(items), len(app.week_items))
+        assert app.week_items[:shared] == items[:shared]
+
+    # آخر بلندترین ستون: فقط یک سطر به انتها اضافه می‌شود و سطرهای موجود دست نمی‌خورند
+    app.schedule_tree.updated.clear()
+    late = week_store.add_event("دوشنبه شب", "جلسه", "2025-03-03", "21:00")
+    matches_fresh()
+    assert app.schedule_tree.updated == []
+    assert len(app.week_items) == len(items) + 1
+    items = list(app.week_items)
+
+    # خانه دوم ستون چهارشنبه: فقط همان سطر
+    week_store.add_event("چهارشنبه دوم", "امتحان", "2025-03-05", "10:00")
+    matches_fresh()
+    assert app.schedule_tree.updated == [1]
+
+    week_store.update_event(late, "دوشنبه شب", "جلسه", "2025-03-07", "21:00")
+    matches_fresh()
+    rule = week_store.add_event("کلاس چهارشنبه", "کلاس", None, "07:00", "", True, WEDNESDAY)
+    matches_fresh()
+    week_store.update_event(rule, "کلاس چهارشنبه", "کلاس", None, "07:00", "", True, WEDNESDAY, "2025-03-01")
+    matches_fresh()
+    for event, _ in list(app.week[MONDAY]):
+        week_store.delete_event(event.id)
+        matches_fresh()
+    week_store.add_event("هفته بعد", "جلسه", "2025-03-12", "08:00")
+    matches_fresh()
@@ -0,0 +1,172 @@
+import itertools
+import sqlite3
+import threading
+import time
+from datetime import date, datetime, timedelta
+import pytest
+import jalali_calendar
+from conftest import pump
+from db_worker import DBWorker
+from event_store import EventStore, PageSource
+
+
+def test_day_rollover_refreshes_occurrences_on_worker(app, root, monkeypatch):
+    pump(root, lambda: app.reminders is not None)
+    # ساعت واقعی نباید وسط آزمون روز را برگرداند
+    app.clock.stop()
+    threads = []
+    refresh = EventStore.refresh_occurrences
+
+    def recording_refresh(store, now):
+        threads.append(threading.current_thread().name)
+        return refresh(store, now)
+
+    monkeypatch.setattr(EventStore, "refresh_occurrences", recording_refresh)
+    app.update_current_time(app.current_datetime + timedelta(days=1))
+    assert threads == []
+
+    pump(root, lambda: threads and not any(app.db.busy(key) for key in ("occurrences", "events", "tasks", "weekly")))
+    assert threads == ["db-worker"]
+
+
+def test_nearest_event_and_description_come_from_worker(app, root, monkeypatch):
+    pump(root, lambda: app.reminders is not None)
+    tomorrow = (date.today() + timedelta(days=1)).isoformat()
+    event_id = app.store.add_event("جلسه گروه", "جلسه", tomorrow, "10:00", "دستور جلسه " * 20)
+
+    # ویرایش و حذف در نمای «نزدیک‌ترین» همان وقوع نمایش‌داده‌شده را می‌گیرند، بدون پرس‌وجو در رشته Tk
+    monkeypatch.setattr(app.store, "nearest_event", None)
+    monkeypatch.setattr(app.store, "get_description", None)
+    pump(root, lambda: app.nearest is not None)
+    assert app.get_nearest_event().event.id == event_id
+
+
+def record_threads(monkeypatch, cls, name):
+    # نام رشته‌هایی که cls.name در آن‌ها صدا زده می‌شود
+    threads = []
+    original = getattr(cls, name)
+
+    def recording(*args, **kwargs):
+        threads.append(threading.current_thread().name)
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(cls, name, recording)
+    return threads
+
+
+def test_conflict_check_runs_on_worker_before_add(app, root, monkeypatch):
+    from tkinter import messagebox
+
+    pump(root, lambda: app.reminders is not None)
+    messages = []
+    monkeypatch.setattr(messagebox, "showinfo", lambda *args, **kwargs: messages.append(args))
+    threads = record_threads(monkeypatch, EventStore, "conflicts")
+    tomorrow = jalali_calendar.gregorian_to_jalali((date.today() + timedelta(days=1)).isoformat())
+    for name, value in (("title_entry", "جلسه گروه"), ("event_type_combo", "جلسه"), ("date_entry", tomorrow),
+                        ("time_entry", "10:00"), ("end_time_entry", "11:00"), ("desc_entry", ""),
+                        ("recurring_day_combo", "شنبه"), ("end_date_entry", "")):
+        monkeypatch.setattr(getattr(app, name), "get", lambda value=value: value)
+    app.recurring_var.set(False)
+
+    app.add_event()
+    assert threads == []
+    assert app.store.type_counts() == {}
+    pump(root, lambda: messages)
+    assert threads == ["db-worker"]
+    assert app.store.type_counts() == {"جلسه": 1}
+
+
+def test_all_view_pages_on_worker(app, root, monkeypatch):
+    pump(root, lambda: app.reminders is not None)
+    first_day = date.today() + timedelta(days=1)
+    app.store.add_events((f"رویداد {index}", "سایر", (first_day + timedelta(days=index)).isoformat(), "10:00", "",
+                          0, -1, None, None) for index in range(60))
+    threads = record_threads(monkeypatch, PageSource, "_execute")
+
+    app.set_display_mode(2)
+    pump(root, lambda: app.event_list.total == 60 and not app.db.busy("page"))
+    app.event_list.scroll(1, "pages")
+    app.event_list.scroll_to(40)
+    pump(root, lambda: not app.db.busy("page"))
+    assert app.event_list.first == 40
+    titles = [row.title for _, row in app.event_list.window]
+    assert titles[0] == "رویداد 40"
+
+    # حذف سطری بالای پنجره فقط شماره سطر اول را جابه‌جا می‌کند
+    app.store.delete_event(app.store.all_events()[0].id)
+    pump(root, lambda: app.event_list.total == 59 and not app.db.busy("page"))
+    assert app.event_list.first == 39
+    assert [row.title for _, row in app.event_list.window] == titles
+    assert threads and set(threads) == {"db-worker"}
+
+
+def test_edit_and_description_reads_run_on_worker(app, root, monkeypatch):
+    pump(root, lambda: app.reminders is not None)
+    tomorrow = (date.today() + timedelta(days=1)).isoformat()
+    event_id = app.store.add_event("جلسه گروه", "جلسه", tomorrow, "10:00", "دستور جلسه")
+    pump(root, lambda: not app.db.busy("events"))
+    get_event = record_threads(monkeypatch, EventStore, "get_event")
+    get_description = record_threads(monkeypatch, EventStore, "get_description")
+    opened, descriptions = [], []
+    monkeypatch.setattr(app, "show_edit_window", opened.append)
+    monkeypatch.setattr(app, "show_description", descriptions.append)
+    monkeypatch.setattr(app.tree, "selection", lambda: ("row",))
+    monkeypatch.setattr(app.tree, "item", lambda iid: {"values": [event_id]})
+    app.display_mode = 2
+
+    app.open_edit_window(event_id, ())
+    app.show_selected_description()
+    assert get_event == [] and get_description == []
+    pump(root, lambda: opened and descriptions)
+    assert opened[0].id == event_id and descriptions == ["دستور جلسه"]
+    assert get_event == ["db-worker"] and get_description == ["db-worker"]
+
+
+def test_reminders_read_on_worker(app, root, monkeypatch):
+    threads = record_threads(monkeypatch, EventStore, "upcoming")
+    pump(root, lambda: app.reminders is not None and not app.db.busy("reminders"))
+    tomorrow = date.today() + timedelta(days=1)
+    app.store.add_event("جلسه گروه", "جلسه", tomorrow.isoformat(), "10:00")
+    pump(root, lambda: not app.db.busy("reminders"))
+    assert app.reminders.pending() == datetime(tomorrow.year, tomorrow.month, tomorrow.day, 9, 30)
+    assert threads and set(threads) == {"db-worker"}
+
+
+class Loop:
+    # حلقه رویداد ساختگی با after/after_cancel
+    def __init__(self):
+        self.jobs = {}
+        self.ids = itertools.count()
+
+    def after(self, ms, func):
+        job = next(self.ids)
+        self.jobs[job] = func
+        return job
+
+    def after_cancel(self, job):
+        self.jobs.pop(job, None)
+
+    def run_until(self, done, timeout=5):
+        deadline = time.monotonic() + timeout
+        while not done():
+            assert time.monotonic() < deadline, "کار رشته کارگر تمام نشد"
+            for job in list(self.jobs):
+                self.jobs.pop(job)()
+            time.sleep(0.005)
+
+
+def test_open_failure_reaches_tk_thread_and_polling_stops():
+    def broken():
+        raise sqlite3.OperationalError("unable to open database file")
+
+    loop = Loop()
+    worker = DBWorker(loop, broken)
+    results = []
+    worker.submit("events", lambda store: 1, results.append)
+    worker.submit("tasks", lambda store: 2, results.append)
+    with pytest.raises(sqlite3.OperationalError):
+        loop.run_until(lambda: not worker.busy("events") and not worker.busy("tasks"))
+    loop.run_until(lambda: not worker.busy("events") and not worker.busy("tasks"))
+    assert results == []
+    assert not loop.jobs
+    worker.stop()
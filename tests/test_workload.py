@@ -0,0 +1,35 @@
+import subprocess
+import sys
+from datetime import date
+import workload
+from conftest import ROOT
+from event_store import EVENT_TYPES
+
+
+def test_same_seed_gives_same_rows():
+    today = date(2025, 3, 1)
+    first = list(workload.Workload(7, today).rows(200, 20))
+    second = list(workload.Workload(7, today).rows(200, 20))
+    assert first == second
+    assert list(workload.Workload(8, today).rows(200, 20)) != first
+
+
+def test_rows_use_known_types_and_counts():
+    rows = list(workload.Workload(0, date(2025, 3, 1)).rows(500, 50))
+    assert len(rows) == 550
+    assert sum(row[5] for row in rows) == 50
+    assert {row[1] for row in rows} <= set(EVENT_TYPES)
+
+
+def test_fill_inserts_every_row(store):
+    assert workload.fill(store, 90, 10, seed=3, today=date(2025, 3, 1)) == 100
+    assert sum(store.type_counts().values()) == 100
+
+
+def test_unknown_type_weights_fail_with_optimizations():
+    # نوع تازه در EVENT_TYPES بدون وزن؛ با python -O هم باید ValueError بدهد
+    script = "import event_store; event_store.EVENT_TYPES.append('کارگاه'); import workload"
+    result = subprocess.run([sys.executable, "-O", "-c", script], cwd=ROOT, capture_output=True, text=True,
+                            encoding="utf-8")
+    assert result.returncode == 1
+    assert "ValueError" in result.stderr
@@ -0,0 +1,189 @@
+from collections import deque
+from tkinter import ttk
+import profiling
+
+
+class Viewport:
+    # پنجره سطرهای خوانده‌شده از یک منبع (PageSource یا ListSource) و تغییرهایی که هنوز به منبع اعمال نشده‌اند
+    # فقط داخل کارهای submit خوانده و عوض می‌شود؛ PageSource روی اتصال رشته کارگر است و در رشته Tk صدا زده نمی‌شود
+    def __init__(self, source):
+        self.source = source
+        self.changes = deque()  # EventChangeها از رشته Tk
+        self.first = 0
+        self.total = 0
+        self.window = []  # [(مکان‌نما، سطر)] از شماره first به بعد
+
+    def update(self, target, page, size, reload=False, invalidate=False):
+        # اعمال تغییرهای در صف و جابه‌جایی پنجره size سطری به سطر target؛ (total، first، window) برمی‌گرداند
+        source = self.source
+        if invalidate:
+            source.invalidate()
+        refetch = False
+        while self.changes:
+            located = source.apply(self.changes.popleft())
+            if located is None:
+                # منبع نمی‌تواند جای تغییر را مشخص کند؛ پنجره دوباره خوانده می‌شود
+                reload = True
+                continue
+            for cursor, delta in zip(located, (-1, 1)):
+                if cursor is None:
+                    continue
+                if self.window and self.first > 0 and cursor < self.window[0][0]:
+                    # تغییر بالای پنجره: فقط شماره سطر اول (و مقصد) جابه‌جا می‌شود
+                    self.first += delta
+                    target += delta
+                elif not self.window or cursor <= self.window[-1][0] or len(self.window) < size:
+                    refetch = True
+        self.total = source.count()
+        target = max(0, min(target, self.total - page))
+
+        if reload or not self.window:
+            self.window = source.rows_at(target, size)
+        else:
+            if refetch:
+                if self.first > 0:
+                    self.window = source.fetch_from(self.window[0][0], size)
+                else:
+                    self.window = source.rows_at(self.first, size)
+            delta = target - self.first
+            if 0 < delta < len(self.window):
+                # اسکرول کوتاه به پایین: ادامه از آخرین کلید پنجره
+                missing = size - (len(self.window) - delta)
+                self.window = self.window[delta:] + source.fetch_after(self.window[-1][0], missing)
+            elif 0 < -delta < len(self.window):
+                # اسکرول کوتاه به بالا: ادامه از اولین کلید پنجره
+                self.window = source.fetch_before(self.window[0][0], -delta) + self.window[:size + delta]
+            elif delta:
+                self.window = source.rows_at(target, size)
+        self.first = target
+        return self.total, self.first, self.window
+
+
+class VirtualTreeview:
+    # فقط سطرهای قابل مشاهده (به‌علاوه چند سطر اضافه) در Treeview نگه داشته می‌شوند
+    # و بقیه هنگام اسکرول با صفحه‌بندی keyset از PageSource خوانده می‌شوند
+    # submit(func، callback) اجرای func() جای دیگر (رشته کارگر) و callback(نتیجه) در رشته Tk؛ بدون آن همین‌جا
+    OVERSCAN = 5
+
+    def __init__(self, tree, scrollbar, format_row, row_id=lambda row: str(row[0]), name="list", submit=None):
+        self.tree = tree
+        self.name = name  # نام نما در پروفایل
+        self.scrollbar = scrollbar
+        self.format_row = format_row
+        self.row_id = row_id
+        self.submit = submit or (lambda func, callback: callback(func()))
+        self.view = None
+        self.target = 0  # سطر اول آخرین درخواست
+        self.first = 0
+        self.total = 0
+        self.window = []  # [(مکان‌نما، سطر)] از شماره first به بعد
+        self.rendered = {}  # iid -> سطری که الان نمایش داده می‌شود
+        self._requests = 0
+
+        self.scrollbar.configure(command=self.yview)
+        self.tree.configure(yscrollcommand=lambda *args: None)
+        self.tree.bind("<MouseWheel>", lambda e: self.scroll(-1 if e.delta > 0 else 1, "units"))
+        self.tree.bind("<Button-4>", lambda e: self.scroll(-1, "units"))
+        self.tree.bind("<Button-5>", lambda e: self.scroll(1, "units"))
+        self.tree.bind("<Prior>", lambda e: self.scroll(-1, "pages"))
+        self.tree.bind("<Next>", lambda e: self.scroll(1, "pages"))
+        self.tree.bind("<Configure>", lambda e: self.refresh(invalidate=False))
+
+    def page_size(self):
+        row_height = int(ttk.Style().lookup("Treeview", "rowheight") or 20)
+        return max(int(self.tree["height"]), self.tree.winfo_height() // row_height)
+
+    def set_source(self, source, keep_position=False):
+        self.view = Viewport(source)
+        if not keep_position:
+            self.target = 0
+        # منبع تازه چیزی در حافظه ندارد که باطل شود؛ داده‌ای که از قبل به آن داده شده حفظ می‌شود
+        self._request(reload=True)
+
+    def clear(self):
+        self.view = None
+        self._requests += 1
+        self.target = self.first = self.total = 0
+        self.window = []
+        self.render()
+
+    def refresh(self, invalidate=True):
+        # خواندن دوباره پنجره فعلی، بعد از تغییر داده یا تغییر اندازه
+        self._request(reload=True, invalidate=invalidate)
+
+    def apply(self, change):
+        # به‌روزرسانی افزایشی بعد از یک EventChange؛ پنجره فقط اگر تغییر داخل آن باشد دوباره خوانده می‌شود
+        if self.view is None:
+            return
+        self.view.changes.append(change)
+        self._request()
+
+    def _request(self, reload=False, invalidate=False):
+        # فقط نتیجه آخرین درخواست نمایش داده می‌شود؛ درخواستی که اجرا نشده تغییرهای صف را برای بعدی می‌گذارد
+        if self.view is None:
+            return
+        view, target, page = self.view, self.target, self.page_size()
+        self._requests += 1
+        request = self._requests
+        self.submit(lambda: view.update(target, page, page + self.OVERSCAN, reload, invalidate),
+                    lambda result: self._show(view, request, result))
+
+    def _show(self, view, request, result):
+        if view is not self.view or request != self._requests:
+            return
+        self.total, self.first, self.window = result
+        self.target = self.first
+        self.render()
+
+    def yview(self, *args):
+        if args[0] == "moveto":
+            self.scroll_to(int(float(args[1]) * self.total))
+        elif args[0] == "scroll":
+            self.scroll(int(args[1]), args[2])
+
+    def scroll(self, number, what):
+        if what == "pages":
+            number *= self.page_size()
+        self.scroll_to(self.target + number)
+        return "break"
+
+    def scroll_to(self, target):
+        if self.view is None:
+            return
+        target = max(0, min(target, self.total - self.page_size()))
+        if target == self.target:
+            return
+        self.target = target
+        self._request()
+
+    def render(self):
+        # فقط سطرهای تغییرکرده دوباره ساخته می‌شوند؛ بقیه سر جایشان می‌مانند
+        rows = {self.row_id(row): row for _, row in self.window}
+        with profiling.timer("convert", self.name):
+            values = {iid: self.format_row(row) for iid, row in rows.items() if self.rendered.get(iid) != row}
+        with profiling.timer("render", self.name):
+            self._render_rows(rows, values)
+        self.rendered = rows
+
+        if self.total:
+            self.scrollbar.set(self.first / self.total, min(1.0, (self.first + self.page_size()) / self.total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def _render_rows(self, rows, values):
+        # values متن سطرهای تازه یا تغییرکرده است
+        stale = [iid for iid in self.tree.get_children() if iid not in rows]
+        if stale:
+            self.tree.delete(*stale)
+        children = list(self.tree.get_children())
+        for index, iid in enumerate(rows):
+            if iid not in children:
+                self.tree.insert("", index, iid=iid, values=values[iid])
+                children.insert(index, iid)
+                continue
+            if iid in values:
+                self.tree.item(iid, values=values[iid])
+            if children[index] != iid:
+                self.tree.move(iid, "", index)
+                children.remove(iid)
+                children.insert(index, iid)
@@ -0,0 +1,157 @@
+import argparse
+import random
+import sys
+from datetime import date as date_cls
+import jalali_calendar
+from conflicts import format_minute
+from event_store import EventStore, EVENT_TYPES, WEEKDAYS
+
+# python workload.py events.db --single 95000 --recurring 5000 [--seed 0] [--untimed 0.15]
+# دیتابیس را با رویدادهای مصنوعی (با طرح فعلی و از مسیر EventStore.add_events) پر می‌کند؛
+# با seed یکسان خروجی همیشه یکسان است، پس بنچمارک‌های کامیت‌های مختلف روی داده برابر اجرا می‌شوند
+
+# وزن هر نوع رویداد در سطرهای یک‌باره
+TYPE_WEIGHTS = {"امتحان": 1, "تمرین": 4, "کلاس": 2, "جلسه": 3, "تحقیق": 2, "ارائه": 1, "سایر": 3}
+
+# وزن نوع قاعده‌های هفتگی (بیشتر کلاس و جلسه ثابت)
+RULE_TYPE_WEIGHTS = {"امتحان": 0, "تمرین": 1, "کلاس": 6, "جلسه": 3, "تحقیق": 1, "ارائه": 0, "سایر": 1}
+
+# نوعی که به EVENT_TYPES اضافه یا از آن حذف شود باید در هر دو جدول وزن هم بیاید (ValueError، نه assert،
+# تا با python -O هم بررسی شود)
+if not set(TYPE_WEIGHTS) == set(EVENT_TYPES) == set(RULE_TYPE_WEIGHTS):
+    raise ValueError("وزن‌های workload با EVENT_TYPES نمی‌خوانند")
+
+# وزن روزهای هفته شمسی (شنبه=0)؛ پنج‌شنبه و جمعه خلوت‌ترند
+WEEKDAY_WEIGHTS = [1.0, 1.0, 1.0, 1.0, 0.9, 0.5, 0.25]
+
+# ماه‌های امتحان (دی، خرداد و تیر) که امتحان‌ها و ارائه‌ها در آن‌ها چند برابر محتمل‌ترند
+EXAM_MONTHS = {10, 3, 4}
+EXAM_SEASON_WEIGHT = 4
+
+# عنوان‌ها از این درس‌ها و موضوع‌ها ساخته می‌شوند تا جستجوی متنی نتیجه واقعی داشته باشد
+SUBJECTS = ["ریاضی", "فیزیک", "شیمی", "آمار", "برنامه‌نویسی", "پایگاه داده", "ادبیات", "زبان", "اقتصاد",
+            "هوش مصنوعی", "شبکه", "سیستم عامل", "پروژه", "پایان‌نامه", "آزمایشگاه", "کارگاه"]
+WORDS = ["فصل", "جلسه", "تمرین", "مرور", "گزارش", "نسخه", "خلاصه", "جزوه", "ارائه", "سوال", "نمونه", "تحویل"]
+VOCABULARY = WORDS + SUBJECTS
+
+# مدت رویدادهای ساعت‌دار (دقیقه) و شروع کلاس‌ها
+DURATIONS = [15, 30, 45, 60, 90, 120, 180]
+CLASS_STARTS = [8 * 60, 9 * 60 + 30, 10 * 60, 11 * 60 + 30, 13 * 60, 14 * 60 + 30, 16 * 60, 17 * 60 + 30]
+
+
+class Workload:
+    # سازنده سطرهای (title, event_type, date, time, description, is_recurring, recurring_day, end_date, end_time)
+    # برای EventStore.add_events
+    def __init__(self, seed=0, today=None, past_days=365, future_days=365, untimed=0.15, end_times=0.7,
+                 descriptions=0.5):
+        self.rng = random.Random(seed)
+        self.today = (today or date_cls.today()).toordinal()
+        self.first_day = self.today - past_days
+        self.last_day = self.today + future_days
+        self.untimed = untimed
+        self.end_times = end_times
+        self.descriptions = descriptions
+        self.types = list(EVENT_TYPES)
+        self.type_weights = [TYPE_WEIGHTS[event_type] for event_type in self.types]
+        self.rule_type_weights = [RULE_TYPE_WEIGHTS[event_type] for event_type in self.types]
+        self.calendar = jalali_calendar.get_calendar()
+
+    def _weight(self, day, event_type):
+        weight = WEEKDAY_WEIGHTS[jalali_calendar.weekday(day)]
+        if event_type in ("امتحان", "ارائه") and self.calendar.to_jalali(day)[1] in EXAM_MONTHS:
+            weight *= EXAM_SEASON_WEIGHT
+        return weight
+
+    def _day(self, event_type):
+        # روز تصادفی در بازه، با وزن روز هفته و فصل امتحان (نمونه‌برداری رد و پذیرش)
+        ceiling = max(WEEKDAY_WEIGHTS) * (EXAM_SEASON_WEIGHT if event_type in ("امتحان", "ارائه") else 1)
+        while True:
+            day = self.rng.randint(self.first_day, self.last_day)
+            if self.rng.random() * ceiling < self._weight(day, event_type):
+                return day
+
+    def _title(self, event_type):
+        return f"{event_type} {self.rng.choice(SUBJECTS)} {self.rng.randrange(1, 30)}"
+
+    def _description(self):
+        if self.rng.random() >= self.descriptions:
+            return ""
+        return " ".join(self.rng.choices(VOCABULARY, k=self.rng.randrange(2, 60)))
+
+    def _times(self, start):
+        # (ساعت، ساعت پایان) با شروع start دقیقه؛ پایان در همان روز می‌ماند
+        end = None
+        if self.rng.random() < self.end_times:
+            end = format_minute(min(start + self.rng.choice(DURATIONS), 23 * 60 + 59))
+        return format_minute(start), end
+
+    def single(self):
+        event_type = self.rng.choices(self.types, weights=self.type_weights)[0]
+        day = date_cls.fromordinal(self._day(event_type)).isoformat()
+        if self.rng.random() < self.untimed:
+            # کار بدون ساعت (فهرست کارهای آینده)
+            time, end_time = None, None
+        elif event_type in ("کلاس", "امتحان"):
+            time, end_time = self._times(self.rng.choice(CLASS_STARTS))
+        else:
+            time, end_time = self._times(self.rng.randrange(7 * 60, 22 * 60, 5))
+        return (self._title(event_type), event_type, day, time, self._description(), 0, -1, None, end_time)
+
+    def recurring(self):
+        event_type = self.rng.choices(self.types, weights=self.rule_type_weights)[0]
+        weekday = self.rng.choices(range(len(WEEKDAYS)), weights=WEEKDAY_WEIGHTS)[0]
+        time, end_time = self._times(self.rng.choice(CLASS_STARTS))
+        end_date = None
+        if self.rng.random() < 0.7:
+            # بیشتر قاعده‌ها با پایان ترم (تا شش ماه جلوتر یا عقب‌تر) تمام می‌شوند
+            end_date = date_cls.fromordinal(self.today + self.rng.randint(-180, 180)).isoformat()
+        return (self._title(event_type), event_type, None, time, self._description(), 1, weekday, end_date,
+                end_time)
+
+    def rows(self, single, recurring):
+        # سطرهای یک‌باره و تکراری در هم، به نسبت تعدادشان
+        total = single + recurring
+        for _ in range(total):
+            if self.rng.randrange(total) < recurring:
+                recurring -= 1
+                yield self.recurring()
+            else:
+                single -= 1
+                yield self.single()
+            total -= 1
+
+
+def fill(store, single, recurring, seed=0, today=None, progress=None, **options):
+    # درج سطرهای مصنوعی در یک تراکنش؛ تعداد سطرهای درج‌شده
+    workload = Workload(seed, today, **options)
+    return store.add_events(workload.rows(single, recurring), progress=progress)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="پر کردن دیتابیس با رویدادهای مصنوعی")
+    parser.add_argument("db", help="مسیر دیتابیس (سطرها به رویدادهای موجود اضافه می‌شوند)")
+    parser.add_argument("--single", type=int, default=95_000, help="تعداد رویدادهای یک‌باره")
+    parser.add_argument("--recurring", type=int, default=5_000, help="تعداد قاعده‌های هفتگی")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--today", type=date_cls.fromisoformat, help="تاریخ میلادی مرکز بازه (پیش‌فرض امروز)")
+    parser.add_argument("--past-days", type=int, default=365)
+    parser.add_argument("--future-days", type=int, default=365)
+    parser.add_argument("--untimed", type=float, default=0.15, help="سهم یک‌باره‌های بدون ساعت")
+    parser.add_argument("--end-times", type=float, default=0.7, help="سهم رویدادهای ساعت‌دار با ساعت پایان")
+    parser.add_argument("--descriptions", type=float, default=0.5, help="سهم رویدادهای دارای توضیحات")
+    args = parser.parse_args()
+
+    store = EventStore.open(args.db)
+    try:
+        count = fill(store, args.single, args.recurring, args.seed, args.today,
+                     progress=lambda done: print(f"\r{done:,}", end="", file=sys.stderr),
+                     past_days=args.past_days, future_days=args.future_days, untimed=args.untimed,
+                     end_times=args.end_times, descriptions=args.descriptions)
+    finally:
+        store.checkpoint("TRUNCATE")
+        store.close()
+    print(f"\r{count:,} رویداد درج شد", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()